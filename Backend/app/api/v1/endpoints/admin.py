@@ -0,0 +1,53 @@
+from datetime import datetime
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi.responses import PlainTextResponse
+from typing import List, Optional
+from app.models.admin import SlowQueryShape
+from app.services.slow_query_service import slow_query_service
+from app.core.dependencies import get_current_admin
+from app.core.config import settings
+from app.core.profiler import profiler
+
+router = APIRouter()
+
+@router.get("/slow-queries", response_model=List[SlowQueryShape])
+async def get_slow_queries(
+    limit: int = Query(20, ge=1, le=100),
+    since_hours: Optional[int] = Query(None, ge=1),
+    current_user: dict = Depends(get_current_admin)
+):
+    """Get the worst slow query shapes by total time"""
+    try:
+        return await slow_query_service.get_worst_query_shapes(limit, since_hours)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.post("/profile", response_class=PlainTextResponse)
+async def profile_worker(
+    seconds: float = Query(10, gt=0),
+    rate_hz: int = Query(settings.PROFILER_DEFAULT_RATE_HZ, ge=1, le=1000),
+    services_only: bool = False,
+    current_user: dict = Depends(get_current_admin)
+):
+    """Sample this worker's stacks for N seconds and return collapsed stacks (flamegraph input)"""
+    if not settings.PROFILER_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profiler is disabled"
+        )
+    if seconds > settings.PROFILER_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds must be at most {settings.PROFILER_MAX_SECONDS}"
+        )
+    
+    try:
+        stacks = await profiler.profile(seconds, rate_hz, services_only)
+    except RuntimeError as e:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+    
+    filename = f"profile-{datetime.utcnow().strftime('%Y%m%d-%H%M%S')}.folded"
+    return PlainTextResponse(stacks, headers={"Content-Disposition": f'attachment; filename="{filename}"'})
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, HTTPException, Request, status
 from app.models.user import (
     UserCreate, 
     UserLogin, 
@@ -9,6 +9,7 @@ from app.models.user import (
     VerifyOTPRequest
 )
 from app.services.auth_service import auth_service
+from app.core.rate_limit import limit_otp_request, limit_otp_verify
 
 router = APIRouter()
 
@@ -45,10 +46,12 @@ async def login(user_data: UserLogin):
         )
 
 @router.post("/forgot-password")
-async def forgot_password(request: ForgotPasswordRequest):
+async def forgot_password(request: ForgotPasswordRequest, http_request: Request):
     """
     Request OTP for password reset
     """
+    await limit_otp_request(http_request, request.email)
+    
     try:
         await auth_service.generate_password_reset_otp(request.email)
         return {"message": "OTP sent to your email address"}
@@ -61,10 +64,12 @@ async def forgot_password(request: ForgotPasswordRequest):
         )
 
 @router.post("/verify-otp")
-async def verify_otp(request: VerifyOTPRequest):
+async def verify_otp(request: VerifyOTPRequest, http_request: Request):
     """
     Verify OTP for password reset
     """
+    await limit_otp_verify(http_request, request.email)
+    
     try:
         await auth_service.verify_otp(request.email, request.otp)
         return {"message": "OTP verified successfully"}
@@ -77,10 +82,12 @@ async def verify_otp(request: VerifyOTPRequest):
         )
 
 @router.post("/reset-password")
-async def reset_password(request: ResetPasswordRequest):
+async def reset_password(request: ResetPasswordRequest, http_request: Request):
     """
     Reset password using OTP
     """
+    await limit_otp_verify(http_request, request.email)
+    
     try:
         await auth_service.reset_password(request.email, request.otp, request.new_password)
         return {"message": "Password reset successfully"}
@@ -1,6 +1,11 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query, WebSocket, status
+from typing import Optional
+from datetime import date, datetime, timedelta
 from app.services.dashboard_service import dashboard_service, DashboardKPIs
-from app.core.dependencies import get_current_user
+from app.services.stock_rollup_service import stock_rollup_service
+from app.models.stock_trend import StockTrends
+from app.services.kpi_stream_service import kpi_stream_service
+from app.core.dependencies import get_current_user, get_websocket_user
 
 router = APIRouter()
 
@@ -9,3 +14,29 @@ async def get_dashboard_kpis(current_user: dict = Depends(get_current_user)):
     """Get dashboard KPIs"""
     kpis = await dashboard_service.get_dashboard_kpis(current_user["email"])
     return kpis
+
+@router.get("/trends", response_model=StockTrends)
+async def get_stock_trends(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    product_id: Optional[str] = None,
+    location_id: Optional[str] = None,
+    warehouse_id: Optional[str] = None,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get daily stock (opening, inflow, outflow, closing) over a date range, 30 days by default"""
+    end = end or datetime.utcnow().date()
+    start = start or end - timedelta(days=29)
+    return await stock_rollup_service.get_trends(
+        current_user["email"], start, end, product_id, location_id, warehouse_id
+    )
+
+@router.websocket("/ws")
+async def dashboard_kpi_stream(websocket: WebSocket, token: str = Query(...)):
+    """Live dashboard KPIs: a snapshot on connect, then diffs as writes change them, and pings as heartbeat"""
+    user = await get_websocket_user(token)
+    if user is None or not user.get("organization_id"):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+    await websocket.accept()
+    await kpi_stream_service.serve(websocket, user["organization_id"])
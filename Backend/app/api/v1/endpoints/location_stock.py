@@ -1,5 +1,5 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, status, Depends
+from typing import List
 from app.models.location_stock import ProductLocationStock, LocationStockSummary
 from app.services.location_stock_service import location_stock_service
 from app.core.dependencies import get_current_user
@@ -34,8 +34,9 @@ async def get_all_products_location_stock(
 ):
     """Get stock levels for all products across all locations"""
     try:
-        result = await location_stock_service.get_all_products_location_stock(current_user["email"])
-        return result
+        return await location_stock_service.get_all_products_location_stock(current_user["email"])
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -70,8 +71,9 @@ async def get_all_locations_stock_summary(
 ):
     """Get stock summary for all locations"""
     try:
-        result = await location_stock_service.get_all_locations_stock_summary(current_user["email"])
-        return result
+        return await location_stock_service.get_all_locations_stock_summary(current_user["email"])
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -1,8 +1,17 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Request, Response
 from typing import List, Optional
-from app.models.product import ProductCreate, ProductUpdate, ProductResponse
+from app.models.product import (
+    ProductCreate, ProductUpdate, ProductResponse, ProductSuggestion, ProductScan, ProductCategory,
+    ImportFormat, ProductImportResult, ProductBatchGet, ProductBatchGetResult,
+    ProductBatchUpdate, ProductBatchUpdateResult
+)
 from app.services.product_service import product_service
+from app.services.autocomplete_service import autocomplete_service
+from app.services.product_import_service import product_import_service
 from app.core.dependencies import get_current_user
+from app.services.collection_version_service import collection_version_service
+from app.core.fields import parse_fields, sparse_response
+from app.core.etags import conditional, document_etag, etag_headers
 
 router = APIRouter()
 
@@ -23,17 +32,86 @@ async def create_product(
             detail=f"An error occurred: {str(e)}"
         )
 
+@router.post("/import", response_model=ProductImportResult)
+async def import_products(
+    request: Request,
+    format: Optional[ImportFormat] = Query(None, description="Defaults from Content-Type: NDJSON for application/x-ndjson, else CSV"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Bulk create or update products (by SKU) from a streamed CSV or NDJSON body, reporting per-row errors"""
+    if format is None:
+        content_type = request.headers.get("content-type", "")
+        format = ImportFormat.NDJSON if "ndjson" in content_type or "jsonl" in content_type else ImportFormat.CSV
+    try:
+        return await product_import_service.import_products(request.stream(), format, current_user["email"])
+    except HTTPException as e:
+        raise e
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Import file must be UTF-8 encoded"
+        )
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.post("/batch-get", response_model=ProductBatchGetResult)
+async def batch_get_products(
+    batch: ProductBatchGet,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get up to 500 products by id and 500 by SKU in one request"""
+    try:
+        return await product_service.batch_get_products(batch, current_user["email"])
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.patch("/batch", response_model=ProductBatchUpdateResult)
+async def batch_update_products(
+    batch: ProductBatchUpdate,
+    current_user: dict = Depends(get_current_user)
+):
+    """Update up to 500 products in one request, reporting not-found and failed items"""
+    try:
+        return await product_service.batch_update_products(batch, current_user["email"])
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
 @router.get("/", response_model=List[ProductResponse])
 async def get_products(
+    request: Request,
+    response: Response,
     skip: int = Query(0, ge=0),
     limit: int = Query(100, ge=1, le=100),
     category: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,sku,current_stock"),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all products"""
+    """Get all products (304 if If-None-Match has the current ETag)"""
     try:
-        products = await product_service.get_all_products(current_user["email"], skip, limit, category)
-        return products
+        selected = parse_fields(fields, ProductResponse)
+        etag = await collection_version_service.list_etag(
+            current_user.get("organization_id"), "products", skip, limit, category, selected
+        )
+        not_modified = conditional(request, response, etag)
+        if not_modified:
+            return not_modified
+        products = await product_service.get_all_products(current_user["email"], skip, limit, category, selected)
+        return sparse_response(products, etag_headers(etag)) if selected else products
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -43,11 +121,12 @@ async def get_products(
 @router.get("/search", response_model=List[ProductResponse])
 async def search_products(
     q: str = Query(..., min_length=1),
+    limit: int = Query(20, ge=1, le=50),
     current_user: dict = Depends(get_current_user)
 ):
-    """Search products by name or SKU"""
+    """Search products by name or SKU, best matches first"""
     try:
-        products = await product_service.search_products(q, current_user["email"])
+        products = await product_service.search_products(q, current_user["email"], limit)
         return products
     except Exception as e:
         raise HTTPException(
@@ -55,12 +134,93 @@ async def search_products(
             detail=f"An error occurred: {str(e)}"
         )
 
+@router.get("/autocomplete", response_model=List[ProductSuggestion])
+async def autocomplete_products(
+    q: str = Query(..., min_length=1),
+    limit: int = Query(10, ge=1, le=50),
+    current_user: dict = Depends(get_current_user)
+):
+    """Suggest products whose SKU or name starts with q, served from memory"""
+    if not current_user.get("organization_id"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User organization not found"
+        )
+    try:
+        return await autocomplete_service.suggest(current_user["organization_id"], q, limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.get("/categories", response_model=List[ProductCategory])
+async def get_product_categories(
+    current_user: dict = Depends(get_current_user)
+):
+    """Get categories with their product and low-stock counts, for the category filter"""
+    if not current_user.get("organization_id"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User organization not found"
+        )
+    try:
+        return await product_service.get_categories(current_user["organization_id"])
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.get("/by-sku/{sku}", response_model=ProductScan)
+async def get_product_by_sku(
+    sku: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Look up a product by exact SKU (barcode scan), with its stock per location"""
+    if not current_user.get("organization_id"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User organization not found"
+        )
+    try:
+        product = await product_service.get_product_by_sku(sku, current_user["organization_id"])
+        if not product:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        return product
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
 @router.get("/low-stock", response_model=List[ProductResponse])
-async def get_low_stock_products(current_user: dict = Depends(get_current_user)):
-    """Get products with low stock"""
+async def get_low_stock_products(
+    request: Request,
+    response: Response,
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=100),
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,sku,current_stock"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get products with low stock, furthest below their reorder level first (304 if unchanged)"""
     try:
-        products = await product_service.get_low_stock_products(current_user["email"])
-        return products
+        selected = parse_fields(fields, ProductResponse)
+        etag = await collection_version_service.list_etag(
+            current_user.get("organization_id"), "products", "low-stock", skip, limit, selected
+        )
+        not_modified = conditional(request, response, etag)
+        if not_modified:
+            return not_modified
+        products = await product_service.get_low_stock_products(current_user["email"], skip, limit, selected)
+        return sparse_response(products, etag_headers(etag)) if selected else products
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -70,16 +230,18 @@ async def get_low_stock_products(current_user: dict = Depends(get_current_user))
 @router.get("/{product_id}", response_model=ProductResponse)
 async def get_product(
     product_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get product by ID"""
+    """Get product by ID (304 if If-None-Match has the current ETag)"""
     product = await product_service.get_product_by_id(product_id, current_user["email"])
     if not product:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Product not found"
         )
-    return product
+    return conditional(request, response, document_etag(product.id, product.updated_at)) or product
 
 @router.put("/{product_id}", response_model=ProductResponse)
 async def update_product(
@@ -9,6 +9,7 @@ from app.models.stock_movement import (
 )
 from app.services.stock_movement_service import stock_movement_service
 from app.core.dependencies import get_current_user
+from app.core.fields import parse_fields, sparse_response
 
 router = APIRouter()
 
@@ -35,14 +36,18 @@ async def get_movements(
     limit: int = Query(100, ge=1, le=100),
     movement_type: Optional[str] = None,
     status: Optional[str] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated response fields, e.g. id,reference,lines.quantity"),
     current_user: dict = Depends(get_current_user)
 ):
     """Get all stock movements with optional filtering"""
     try:
+        selected = parse_fields(fields, StockMovementResponse)
         movements = await stock_movement_service.get_all_movements(
-            current_user["email"], skip, limit, movement_type, status
+            current_user["email"], skip, limit, movement_type, status, selected
         )
-        return movements
+        return sparse_response(movements) if selected else movements
+    except HTTPException as e:
+        raise e
     except Exception as e:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
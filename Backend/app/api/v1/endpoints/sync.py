@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, status, Depends, Query
+from app.models.sync import SyncChanges
+from app.services.sync_service import sync_service
+from app.core.dependencies import get_current_user
+
+router = APIRouter()
+
+@router.get("/changes", response_model=SyncChanges)
+async def get_changes(
+    since: str = Query("0", description="next_token of the previous call; 0 for a full sync"),
+    limit: int = Query(500, ge=1, le=1000),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get products, warehouses, locations and balances changed since a sync token, oldest change first"""
+    if not current_user.get("organization_id"):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User organization not found"
+        )
+    if not since.isdigit():
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid sync token"
+        )
+    try:
+        return await sync_service.get_changes(current_user["organization_id"], int(since), limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
@@ -0,0 +1,63 @@
+from fastapi import APIRouter, HTTPException, status, Depends
+from app.models.valuation import ProductValuation, LocationValue, OrganizationValuation
+from app.services.valuation_service import valuation_service
+from app.core.dependencies import get_current_user
+
+router = APIRouter()
+
+@router.get("/", response_model=OrganizationValuation)
+async def get_organization_valuation(current_user: dict = Depends(get_current_user)):
+    """Get the total inventory value of the organization"""
+    try:
+        return await valuation_service.get_organization_valuation(current_user["email"])
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.get("/products/{product_id}", response_model=ProductValuation)
+async def get_product_valuation(
+    product_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the inventory value of a product, in total and per location"""
+    try:
+        result = await valuation_service.get_product_valuation(product_id, current_user["email"])
+        if not result:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Product not found"
+            )
+        return result
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
+
+@router.get("/locations/{location_id}", response_model=LocationValue)
+async def get_location_value(
+    location_id: str,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the inventory value held at a location"""
+    try:
+        result = await valuation_service.get_location_value(location_id, current_user["email"])
+        if not result:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Location not found"
+            )
+        return result
+    except HTTPException as e:
+        raise e
+    except Exception as e:
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An error occurred: {str(e)}"
+        )
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, HTTPException, status, Depends
+from fastapi import APIRouter, HTTPException, status, Depends, Request, Response
 from typing import List
 from app.models.warehouse import (
     WarehouseCreate,
@@ -7,7 +7,9 @@ from app.models.warehouse import (
     LocationResponse
 )
 from app.services.warehouse_service import warehouse_service
+from app.services.collection_version_service import collection_version_service
 from app.core.dependencies import get_current_user
+from app.core.etags import conditional, document_etag
 
 router = APIRouter()
 
@@ -30,11 +32,17 @@ async def create_warehouse(
 
 @router.get("/", response_model=List[WarehouseResponse])
 async def get_warehouses(
+    request: Request,
+    response: Response,
     active_only: bool = False,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all warehouses"""
+    """Get all warehouses (304 if If-None-Match has the current ETag)"""
     try:
+        etag = await collection_version_service.list_etag(current_user.get("organization_id"), "warehouses", active_only)
+        not_modified = conditional(request, response, etag)
+        if not_modified:
+            return not_modified
         warehouses = await warehouse_service.get_all_warehouses(current_user["email"], active_only)
         return warehouses
     except Exception as e:
@@ -46,16 +54,19 @@ async def get_warehouses(
 @router.get("/{warehouse_id}", response_model=WarehouseResponse)
 async def get_warehouse(
     warehouse_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get warehouse by ID"""
+    """Get warehouse by ID (304 if If-None-Match has the current ETag)"""
     warehouse = await warehouse_service.get_warehouse_by_id(warehouse_id, current_user["email"])
     if not warehouse:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Warehouse not found"
         )
-    return warehouse
+    etag = document_etag(warehouse.id, warehouse.updated_at or warehouse.created_at)
+    return conditional(request, response, etag) or warehouse
 
 @router.post("/locations", response_model=LocationResponse, status_code=status.HTTP_201_CREATED)
 async def create_location(
@@ -73,9 +84,17 @@ async def create_location(
         )
 
 @router.get("/locations/all", response_model=List[LocationResponse])
-async def get_all_locations(current_user: dict = Depends(get_current_user)):
-    """Get all locations"""
+async def get_all_locations(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
+    """Get all locations (304 if If-None-Match has the current ETag)"""
     try:
+        etag = await collection_version_service.list_etag(current_user.get("organization_id"), "locations")
+        not_modified = conditional(request, response, etag)
+        if not_modified:
+            return not_modified
         locations = await warehouse_service.get_all_locations(current_user["email"])
         return locations
     except Exception as e:
@@ -87,10 +106,16 @@ async def get_all_locations(current_user: dict = Depends(get_current_user)):
 @router.get("/{warehouse_id}/locations", response_model=List[LocationResponse])
 async def get_warehouse_locations(
     warehouse_id: str,
+    request: Request,
+    response: Response,
     current_user: dict = Depends(get_current_user)
 ):
-    """Get all locations for a warehouse"""
+    """Get all locations for a warehouse (304 if If-None-Match has the current ETag)"""
     try:
+        etag = await collection_version_service.list_etag(current_user.get("organization_id"), "locations", warehouse_id)
+        not_modified = conditional(request, response, etag)
+        if not_modified:
+            return not_modified
         locations = await warehouse_service.get_locations_by_warehouse(warehouse_id, current_user["email"])
         return locations
     except Exception as e:
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from app.api.v1.endpoints import auth, products, dashboard, stock_movements, warehouses, location_stock, organizations
+from app.api.v1.endpoints import auth, products, dashboard, stock_movements, warehouses, location_stock, organizations, admin, valuation, sync
 
 api_router = APIRouter()
 
@@ -9,4 +9,7 @@ api_router.include_router(dashboard.router, prefix="/dashboard", tags=["Dashboar
 api_router.include_router(stock_movements.router, prefix="/stock-movements", tags=["Stock Movements"])
 api_router.include_router(warehouses.router, prefix="/warehouses", tags=["Warehouses"])
 api_router.include_router(location_stock.router, prefix="/location-stock", tags=["Location Stock"])
+api_router.include_router(valuation.router, prefix="/valuation", tags=["Valuation"])
+api_router.include_router(sync.router, prefix="/sync", tags=["Sync"])
 api_router.include_router(organizations.router, prefix="/organizations", tags=["Organizations"])
+api_router.include_router(admin.router, prefix="/admin", tags=["Admin"])
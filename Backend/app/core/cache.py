@@ -0,0 +1,69 @@
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+from app.core.metrics import metrics
+
+_MISSING = object()
+
+class TTLCache:
+    """Small in-process cache with per-entry expiry and LRU eviction.
+
+    Entries are per worker process; the TTL bounds how stale another worker's copy can get
+    after a write invalidated ours. A load that read the source before an invalidate of its key
+    passes the generation() it started with to set(), which then drops the stale value.
+    Registered with /metrics under `name`.
+    """
+
+    def __init__(self, name: str, ttl_seconds: float, max_entries: int = 10_000):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        # Invalidations per key; the epoch changes when they are reset, so old tokens never match
+        self._generations: Dict[Hashable, int] = {}
+        self._epoch = 0
+        metrics.register_cache(name, self)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING or entry[0] < time.monotonic():
+            if entry is not _MISSING:
+                del self._entries[key]
+            self.misses += 1
+            return default
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def generation(self, key: Hashable) -> Tuple[int, int]:
+        """Token to take before loading key from the source"""
+        return self._epoch, self._generations.get(key, 0)
+
+    def set(self, key: Hashable, value: Any, ttl_seconds: Optional[float] = None, generation: Optional[Tuple[int, int]] = None):
+        """Store value; skipped if key was invalidated since `generation` was taken"""
+        if generation is not None and generation != self.generation(key):
+            return
+        expires_at = time.monotonic() + (self.ttl_seconds if ttl_seconds is None else ttl_seconds)
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+        self._generations[key] = self._generations.get(key, 0) + 1
+        if len(self._generations) > self.max_entries:
+            self._reset_generations()
+
+    def clear(self):
+        self._entries.clear()
+        self._reset_generations()
+
+    def _reset_generations(self):
+        self._generations.clear()
+        self._epoch += 1
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 class Settings(BaseSettings):
     # MongoDB
@@ -21,6 +21,69 @@ class Settings(BaseSettings):
     
     # OTP
     OTP_EXPIRE_MINUTES: int = 10
+    OTP_MAX_ATTEMPTS: int = 5
+    
+    # Rate limiting ("memory" for a single worker, "mongo" to share buckets across workers)
+    RATE_LIMIT_BACKEND: str = "memory"
+    OTP_REQUEST_LIMIT_PER_EMAIL: int = 3
+    OTP_REQUEST_LIMIT_PER_IP: int = 10
+    OTP_VERIFY_LIMIT_PER_EMAIL: int = 10
+    OTP_VERIFY_LIMIT_PER_IP: int = 30
+    OTP_RATE_LIMIT_WINDOW_SECONDS: int = 900
+    # Reverse proxies (IPs or CIDRs) whose X-Forwarded-For is trusted; empty: the header is ignored
+    TRUSTED_PROXIES: List[str] = []
+    
+    # Request instrumentation (requests over either budget are logged)
+    DB_INSTRUMENTATION_ENABLED: bool = True
+    REQUEST_QUERY_BUDGET: int = 25
+    REQUEST_LATENCY_BUDGET_MS: float = 500.0
+    
+    # Prometheus-style /metrics endpoint, only registered when enabled. Scrapers send
+    # "Authorization: Bearer <METRICS_TOKEN>"; without a token only admins (ADMIN_EMAILS) may read it
+    METRICS_ENABLED: bool = True
+    METRICS_TOKEN: Optional[str] = None
+    
+    # Slow query log (find/aggregate/count over the threshold go to the capped slow_queries collection)
+    SLOW_QUERY_LOG_ENABLED: bool = True
+    SLOW_QUERY_THRESHOLD_MS: float = 100.0
+    SLOW_QUERY_LOG_SIZE_BYTES: int = 64 * 1024 * 1024
+    SLOW_QUERY_EXPLAIN_INTERVAL_MINUTES: float = 10.0  # one explain per query shape per interval
+    
+    # On-demand sampling profiler (/admin/profile), off unless explicitly enabled
+    PROFILER_ENABLED: bool = False
+    PROFILER_MAX_SECONDS: int = 60
+    PROFILER_DEFAULT_RATE_HZ: int = 100
+    
+    # Live dashboard KPIs over WebSocket (/dashboard/ws)
+    KPI_STREAM_HEARTBEAT_SECONDS: float = 25.0
+    KPI_STREAM_POLL_SECONDS: float = 5.0  # picks up writes handled by other workers
+    KPI_STREAM_DEBOUNCE_SECONDS: float = 0.25
+    KPI_STREAM_QUEUE_SIZE: int = 16
+    KPI_STREAM_SEND_TIMEOUT_SECONDS: float = 10.0
+    
+    # In-memory product autocomplete (/products/autocomplete), per worker process
+    AUTOCOMPLETE_MEMORY_BUDGET_BYTES: int = 128 * 1024 * 1024  # ~60 MB per 100k products
+    AUTOCOMPLETE_MAX_AGE_SECONDS: float = 300.0  # reload to pick up writes handled by other workers
+    
+    # Revaluation (revalue_inventory.py) holds an organization lock that rejects stock writes with 409.
+    # After taking it, it waits for writes already past the check; a lock older than the timeout
+    # belongs to a run that died
+    REVALUATION_DRAIN_SECONDS: float = 2.0
+    REVALUATION_LOCK_TIMEOUT_SECONDS: float = 3600.0
+    
+    # Read-through cache behind /products/by-sku (per worker; writes here invalidate it)
+    PRODUCT_SKU_CACHE_TTL_SECONDS: float = 60.0
+    
+    # Cached category facet counts behind /products/categories (per worker; writes here invalidate it,
+    # so this bounds how long writes through other workers go unseen)
+    PRODUCT_CATEGORIES_CACHE_TTL_SECONDS: float = 30.0
+    
+    # /sync/changes stops below sequence numbers still being written; a reservation older than this
+    # belongs to a writer that died mid-way and no longer holds readers back
+    SYNC_ALLOCATION_TIMEOUT_SECONDS: float = 60.0
+    
+    # Users allowed to call /admin endpoints
+    ADMIN_EMAILS: List[str] = []
     
     class Config:
         env_file = ".env"
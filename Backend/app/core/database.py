@@ -1,5 +1,11 @@
+from typing import List, Optional
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import CollectionInvalid
 from app.core.config import settings
+from app.core.query_stats import query_stats_listener
+from app.core.metrics import pool_metrics_listener
+from app.core.slow_queries import slow_query_logger
 
 class Database:
     client: AsyncIOMotorClient = None
@@ -7,11 +13,114 @@ class Database:
 
 db = Database()
 
-async def connect_to_mongo():
-    db.client = AsyncIOMotorClient(settings.MONGO_URL)
+# Name Mongo gives the unique (organization_id, sku) index
+SKU_INDEX_NAME = "organization_id_1_sku_1"
+
+async def connect_to_mongo(create_indexes: bool = True):
+    event_listeners = [query_stats_listener] if settings.DB_INSTRUMENTATION_ENABLED else []
+    if settings.METRICS_ENABLED:
+        event_listeners.append(pool_metrics_listener)
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        event_listeners.append(slow_query_logger)
+    db.client = AsyncIOMotorClient(settings.MONGO_URL, event_listeners=event_listeners)
     db.db = db.client[settings.DB_NAME]
+    if create_indexes:
+        await ensure_indexes()
     print(f"Connected to MongoDB: {settings.DB_NAME}")
 
+async def ensure_indexes():
+    """Create indexes required by the services (no-op if they already exist)"""
+    # One active OTP per email, removed by Mongo once expired
+    await db.db.password_reset_otps.create_index([("email", ASCENDING)], unique=True)
+    await db.db.password_reset_otps.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+    
+    # Shared rate limit buckets (RATE_LIMIT_BACKEND=mongo)
+    await db.db.rate_limits.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+    
+    # Slow query log is capped so it never grows unbounded
+    try:
+        await db.db.create_collection("slow_queries", capped=True, size=settings.SLOW_QUERY_LOG_SIZE_BYTES)
+    except CollectionInvalid:
+        pass
+    await db.db.slow_queries.create_index([("shape_key", ASCENDING), ("created_at", DESCENDING)])
+    
+    # Daily stock buckets: one per product/location/day, range reads per org and per location
+    await db.db.stock_daily.create_index(
+        [("organization_id", ASCENDING), ("product_id", ASCENDING), ("location_id", ASCENDING), ("date", ASCENDING)],
+        unique=True
+    )
+    await db.db.stock_daily.create_index([("organization_id", ASCENDING), ("date", ASCENDING)])
+    await db.db.stock_daily.create_index([("organization_id", ASCENDING), ("location_id", ASCENDING), ("date", ASCENDING)])
+    # Running closing per product/location series (trend openings)
+    await db.db.stock_series.create_index(
+        [("organization_id", ASCENDING), ("product_id", ASCENDING), ("location_id", ASCENDING)],
+        unique=True
+    )
+    
+    # One SKU per organization; also serves SKU lookups (/products/by-sku)
+    await ensure_unique_sku_index()
+    # Low-stock list, most critical first; only low-stock products are in the index
+    await db.db.products.create_index(
+        [("organization_id", ASCENDING), ("stock_gap", ASCENDING), ("_id", ASCENDING)],
+        partialFilterExpression={"is_low_stock": True}
+    )
+    # Category facet counts (/products/categories), answered from the index alone
+    await db.db.products.create_index(
+        [("organization_id", ASCENDING), ("category", ASCENDING), ("is_low_stock", ASCENDING)]
+    )
+    # Product search (see app/core/search.py)
+    await db.db.products.create_index([("organization_id", ASCENDING), ("search_tokens", ASCENDING)])
+    
+    # Delta sync: latest change per entity, read in sequence order
+    await db.db.sync_changes.create_index(
+        [("organization_id", ASCENDING), ("kind", ASCENDING), ("entity_id", ASCENDING)], unique=True
+    )
+    await db.db.sync_changes.create_index([("organization_id", ASCENDING), ("sequence", ASCENDING)])
+    
+    # Inventory valuation: one position per (product, location), FIFO layers still holding stock
+    await db.db.stock_values.create_index(
+        [("organization_id", ASCENDING), ("product_id", ASCENDING), ("location_id", ASCENDING)],
+        unique=True
+    )
+    await db.db.valuation_layers.create_index(
+        [("organization_id", ASCENDING), ("product_id", ASCENDING), ("location_id", ASCENDING), ("received_at", ASCENDING)],
+        partialFilterExpression={"quantity_remaining": {"$gt": 0}}
+    )
+    await db.db.valuation_layers.create_index([("organization_id", ASCENDING)])
+    await db.db.location_values.create_index([("organization_id", ASCENDING)])
+    # Revaluation locks of runs that died are removed once expired
+    await db.db.valuation_locks.create_index([("expires_at", ASCENDING)], expireAfterSeconds=0)
+
+async def find_duplicate_skus(organization_ids: Optional[List[str]] = None, limit: Optional[int] = None) -> List[dict]:
+    """SKUs held by more than one product of an organization, with those products"""
+    pipeline = [{"$match": {"organization_id": {"$in": organization_ids}}}] if organization_ids else []
+    pipeline += [
+        {"$group": {
+            "_id": {"organization_id": "$organization_id", "sku": "$sku"},
+            "products": {"$push": {"_id": "$_id", "name": "$name", "created_at": "$created_at"}},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}},
+        {"$sort": {"_id.organization_id": 1, "_id.sku": 1}}
+    ]
+    if limit:
+        pipeline.append({"$limit": limit})
+    return await db.db.products.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+
+async def ensure_unique_sku_index():
+    """Create the unique SKU index, first reporting duplicates that would make the build fail"""
+    indexes = await db.db.products.index_information()
+    if indexes.get(SKU_INDEX_NAME, {}).get("unique"):
+        return
+    duplicates = await find_duplicate_skus(limit=10)
+    if duplicates:
+        listed = ", ".join(f"{d['_id']['sku']!r} ({d['count']} products, organization {d['_id']['organization_id']})" for d in duplicates)
+        raise RuntimeError(
+            f"Cannot create the unique SKU index, products share SKUs: {listed}. "
+            "Run `python find_duplicate_skus.py` for the full list and rename or merge them first."
+        )
+    await db.db.products.create_index([("organization_id", ASCENDING), ("sku", ASCENDING)], unique=True)
+
 async def close_mongo_connection():
     if db.client:
         db.client.close()
@@ -1,6 +1,9 @@
+import hmac
+from typing import Optional
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from app.core.security import decode_access_token
+from app.core.config import settings
 from app.services.auth_service import auth_service
 
 security = HTTPBearer()
@@ -34,3 +37,30 @@ async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(s
         )
     
     return user
+
+async def get_websocket_user(token: str) -> Optional[dict]:
+    """Authenticate a WebSocket from the access token in its query string (browsers cannot set headers)"""
+    payload = decode_access_token(token)
+    if payload is None or payload.get("sub") is None:
+        return None
+    return await auth_service.get_user_by_email(payload["sub"])
+
+async def get_current_admin(current_user: dict = Depends(get_current_user)):
+    """Get current user if they are a platform admin (ADMIN_EMAILS)"""
+    if current_user["email"] not in settings.ADMIN_EMAILS:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
+    return current_user
+
+async def get_metrics_reader(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Allow /metrics for the configured METRICS_TOKEN, or for admins when none is set"""
+    if settings.METRICS_TOKEN is None:
+        return await get_current_admin(await get_current_user(credentials))
+    if not hmac.compare_digest(credentials.credentials.encode(), settings.METRICS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid metrics token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -0,0 +1,41 @@
+"""
+Conditional GET with weak ETags.
+
+Lists are tagged with their organization's collection version (see collection_version_service),
+single documents with their updated_at. A request whose If-None-Match matches gets an empty 304.
+"""
+import hashlib
+from datetime import datetime
+from typing import Optional
+from fastapi import Request, Response, status
+
+def weak_etag(*parts) -> str:
+    digest = hashlib.blake2b("\x1f".join(map(str, parts)).encode(), digest_size=12).hexdigest()
+    return f'W/"{digest}"'
+
+def document_etag(document_id: str, updated_at: Optional[datetime]) -> str:
+    return weak_etag(document_id, updated_at.isoformat() if updated_at else "")
+
+def etag_headers(etag: Optional[str]) -> dict:
+    # Clients may keep the response but must revalidate it before every use
+    return {"ETag": etag, "Cache-Control": "private, no-cache"} if etag else {}
+
+def _opaque_tag(tag: str) -> str:
+    """Tag without its weak prefix: If-None-Match uses weak comparison"""
+    tag = tag.strip()
+    return tag[2:] if tag.startswith("W/") else tag
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque_tag(tag) == _opaque_tag(etag) for tag in header.split(","))
+
+def conditional(request: Request, response: Response, etag: str) -> Optional[Response]:
+    """304 response if the request already has this version; otherwise tags `response` and returns None"""
+    if etag_matches(request, etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=etag_headers(etag))
+    response.headers.update(etag_headers(etag))
+    return None
@@ -0,0 +1,83 @@
+"""
+Sparse fieldsets for list endpoints (?fields=id,sku,current_stock).
+
+Requested fields are validated against the endpoint's response model. Services push them down as a
+Mongo projection and build plain dicts with only those fields, skipping full response models.
+A dotted field selects part of a nested list ("lines.product_sku,lines.quantity").
+"""
+import typing
+from typing import Any, Callable, Dict, Iterable, List, Optional, Type
+from fastapi import HTTPException, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel
+
+def _nested_model(annotation) -> Optional[Type[BaseModel]]:
+    """The model inside List[Model] / Optional[Model] / Model, if any"""
+    for candidate in (annotation, *typing.get_args(annotation)):
+        if isinstance(candidate, type) and issubclass(candidate, BaseModel):
+            return candidate
+        nested = [arg for arg in typing.get_args(candidate) if isinstance(arg, type) and issubclass(arg, BaseModel)]
+        if nested:
+            return nested[0]
+    return None
+
+def parse_fields(fields: Optional[str], model: Type[BaseModel]) -> Optional[List[str]]:
+    """Validated field list from a comma-separated `fields` parameter; None selects every field"""
+    if not fields:
+        return None
+    selected = []
+    for name in (part.strip() for part in fields.split(",")):
+        if not name:
+            continue
+        top, _, sub = name.partition(".")
+        field = model.model_fields.get(top)
+        nested = _nested_model(field.annotation) if field and sub else None
+        if field is None or (sub and (nested is None or sub not in nested.model_fields)):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown field '{name}'"
+            )
+        selected.append(name)
+    # A whole field wins over parts of it
+    whole = {name for name in selected if "." not in name}
+    selected = [name for name in selected if "." not in name or name.partition(".")[0] not in whole]
+    return list(dict.fromkeys(selected)) or None
+
+def fields_projection(fields: List[str], sources: Dict[str, Iterable[str]]) -> dict:
+    """Mongo projection for the selected response fields.
+
+    `sources` lists the document fields behind response fields that are not stored under their
+    own name (e.g. id -> _id, is_low_stock -> current_stock, reorder_level).
+    """
+    projection = {"_id": 1}
+    for name in fields:
+        top = name.partition(".")[0]
+        for source in sources.get(top, (name,)):
+            projection[source] = 1
+    return projection
+
+def sparse_row(document: dict, fields: List[str], computed: Dict[str, Callable[[dict], Any]]) -> dict:
+    """Response row with only the selected fields; computed fields are derived from the document"""
+    row = {}
+    for name in fields:
+        top = name.partition(".")[0]
+        if top in row:
+            continue
+        row[top] = computed[top](document) if top in computed else document.get(top)
+    return row
+
+def model_include(fields: List[str]) -> dict:
+    """`include` argument for model_dump() selecting the given (possibly dotted) fields"""
+    include: Dict[str, Any] = {}
+    for name in fields:
+        top, _, sub = name.partition(".")
+        if not sub:
+            include[top] = True
+        elif include.get(top) is not True:
+            include.setdefault(top, {"__all__": set()})["__all__"].add(sub)
+    return include
+
+def sparse_response(rows: list, headers: Optional[dict] = None) -> JSONResponse:
+    """Sparse rows bypass the endpoint's response_model, which would fill in the missing fields"""
+    return JSONResponse(content=jsonable_encoder(rows), headers=headers)
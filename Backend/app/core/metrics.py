@@ -0,0 +1,254 @@
+import asyncio
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Tuple
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 1000)
+
+def _format_labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Gauge:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def set(self, *labels, value: float):
+        self._values[labels] = value
+
+    def inc(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount: float = 1.0):
+        self._values[labels] = self._values.get(labels, 0.0) - amount
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge"]
+        for labels, value in list(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, *labels, value: float):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total) in list(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            label_str = _format_labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{label_str} {_format_value(total)}")
+            lines.append(f"{self.name}_count{label_str} {cumulative}")
+        return lines
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = []
+        self._caches: Dict[str, object] = {}
+        self._queues: Dict[str, Callable[[], int]] = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, documentation: str, labelnames: Tuple[str, ...] = ()) -> Gauge:
+        metric = Gauge(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, labelnames: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, name: str, cache):
+        """Expose hit/miss counts of a cache (any object with `hits` and `misses` attributes)"""
+        self._caches[name] = cache
+
+    def register_queue(self, name: str, depth: Callable[[], int]):
+        """Expose the depth of a background queue, read when /metrics is scraped"""
+        self._queues[name] = depth
+
+    def expose(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.expose())
+
+        lines.append("# HELP stockmaster_cache_hits_total Cache lookups served from the cache")
+        lines.append("# TYPE stockmaster_cache_hits_total counter")
+        for name, cache in self._caches.items():
+            lines.append(f'stockmaster_cache_hits_total{{cache="{name}"}} {cache.hits}')
+        lines.append("# HELP stockmaster_cache_misses_total Cache lookups that fell through to the source")
+        lines.append("# TYPE stockmaster_cache_misses_total counter")
+        for name, cache in self._caches.items():
+            lines.append(f'stockmaster_cache_misses_total{{cache="{name}"}} {cache.misses}')
+        lines.append("# HELP stockmaster_cache_hit_ratio Fraction of cache lookups that were hits")
+        lines.append("# TYPE stockmaster_cache_hit_ratio gauge")
+        for name, cache in self._caches.items():
+            lookups = cache.hits + cache.misses
+            ratio = cache.hits / lookups if lookups else 0.0
+            lines.append(f'stockmaster_cache_hit_ratio{{cache="{name}"}} {_format_value(ratio)}')
+
+        lines.append("# HELP stockmaster_background_queue_depth Items waiting in background queues")
+        lines.append("# TYPE stockmaster_background_queue_depth gauge")
+        for name, depth in self._queues.items():
+            lines.append(f'stockmaster_background_queue_depth{{queue="{name}"}} {depth()}')
+
+        return "\n".join(lines) + "\n"
+
+metrics = MetricsRegistry()
+
+http_requests_total = metrics.counter(
+    "stockmaster_http_requests_total", "HTTP requests by route template, method and status code",
+    ("method", "route", "status")
+)
+http_request_duration = metrics.histogram(
+    "stockmaster_http_request_duration_seconds", "HTTP request latency by route template",
+    ("method", "route")
+)
+http_request_db_queries = metrics.histogram(
+    "stockmaster_http_request_db_queries", "Mongo commands issued per HTTP request",
+    ("method", "route"), buckets=COUNT_BUCKETS
+)
+http_requests_in_flight = metrics.gauge(
+    "stockmaster_http_requests_in_flight", "HTTP requests currently being handled"
+)
+event_loop_lag = metrics.gauge(
+    "stockmaster_event_loop_lag_seconds", "Delay between a scheduled event-loop wakeup and when it ran"
+)
+mongo_pool_size = metrics.gauge(
+    "stockmaster_mongo_pool_connections", "Open Mongo connections per server", ("address",)
+)
+mongo_pool_checked_out = metrics.gauge(
+    "stockmaster_mongo_pool_checked_out", "Mongo connections currently checked out per server", ("address",)
+)
+mongo_pool_checkout_wait = metrics.histogram(
+    "stockmaster_mongo_pool_checkout_wait_seconds", "Time spent waiting to check out a Mongo connection",
+    ("address",), buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+)
+
+def route_template(request) -> str:
+    """Route path template (e.g. /api/v1/products/{product_id}) to keep label cardinality bounded"""
+    route = request.scope.get("route")
+    template = getattr(route, "path", None)
+    if template is None:
+        return "unmatched"
+    # Newer FastAPI versions report the included router's own route, without the include prefixes;
+    # those are literal, so they are the request path's leading segments
+    route_segments = [s for s in template.split("/") if s]
+    path_segments = [s for s in request.scope["path"].split("/") if s]
+    prefix = path_segments[:max(0, len(path_segments) - len(route_segments))]
+    return "/" + "/".join(prefix + route_segments)
+
+async def monitor_event_loop_lag(interval: float = 0.5):
+    """Sample event-loop lag until cancelled"""
+    loop = asyncio.get_running_loop()
+    while True:
+        scheduled = loop.time() + interval
+        await asyncio.sleep(interval)
+        event_loop_lag.set(value=max(0.0, loop.time() - scheduled))
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """Feeds Motor/pymongo connection pool events into the pool gauges"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checkout_started = threading.local()
+
+    def _address(self, event) -> str:
+        host, port = event.address
+        return f"{host}:{port}"
+
+    def pool_created(self, event):
+        mongo_pool_size.set(self._address(event), value=0)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            mongo_pool_size.inc(self._address(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            mongo_pool_size.dec(self._address(event))
+
+    def connection_check_out_started(self, event):
+        self._checkout_started.value = time.perf_counter()
+
+    def connection_check_out_failed(self, event):
+        self._checkout_started.value = None
+
+    def connection_checked_out(self, event):
+        started: Optional[float] = getattr(self._checkout_started, "value", None)
+        with self._lock:
+            mongo_pool_checked_out.inc(self._address(event))
+            if started is not None:
+                mongo_pool_checkout_wait.observe(self._address(event), value=time.perf_counter() - started)
+        self._checkout_started.value = None
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            mongo_pool_checked_out.dec(self._address(event))
+
+pool_metrics_listener = PoolMetricsListener()
@@ -0,0 +1,92 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_PROJECT_ROOT = os.path.dirname(_APP_ROOT)
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    if filename.startswith(_PROJECT_ROOT):
+        filename = os.path.relpath(filename, _PROJECT_ROOT)
+    else:
+        filename = os.path.basename(filename)
+    return f"{code.co_name} ({filename}:{frame.f_lineno})"
+
+class SamplingProfiler:
+    """Stack-sampling profiler producing collapsed stacks (flamegraph.pl / speedscope format).
+
+    A daemon thread reads every thread's current frame at `rate_hz`. Samples from the event-loop
+    thread are prefixed with the asyncio task that was running, so time is attributed per task.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._running = False
+
+    @property
+    def running(self) -> bool:
+        return self._running
+
+    async def profile(self, seconds: float, rate_hz: int, services_only: bool = False) -> str:
+        """Sample the current worker for `seconds` and return collapsed stacks"""
+        with self._lock:
+            if self._running:
+                raise RuntimeError("A profile is already running on this worker")
+            self._running = True
+
+        loop = asyncio.get_running_loop()
+        stop = threading.Event()
+        samples: Counter = Counter()
+        sampler = threading.Thread(
+            target=self._sample,
+            args=(loop, threading.get_ident(), 1.0 / rate_hz, stop, samples, services_only),
+            name="stockmaster-profiler",
+            daemon=True
+        )
+        try:
+            sampler.start()
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            await loop.run_in_executor(None, sampler.join)
+            self._running = False
+
+        return "\n".join(f"{stack} {count}" for stack, count in samples.most_common()) + "\n"
+
+    def _sample(self, loop, loop_thread_id: int, interval: float, stop: threading.Event, samples: Counter, services_only: bool):
+        own_id = threading.get_ident()
+        thread_names = {}
+        while not stop.is_set():
+            started = time.perf_counter()
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                touches_services = False
+                while frame is not None:
+                    label = _frame_label(frame)
+                    if label.find("app/services/") != -1 or label.find("app\\services\\") != -1:
+                        touches_services = True
+                    stack.append(label)
+                    frame = frame.f_back
+                if services_only and not touches_services:
+                    continue
+
+                if thread_id == loop_thread_id:
+                    task = asyncio.current_task(loop)
+                    root = f"task:{task.get_name()}" if task else "event-loop"
+                else:
+                    if thread_id not in thread_names:
+                        thread_names = {t.ident: t.name for t in threading.enumerate()}
+                    root = f"thread:{thread_names.get(thread_id, thread_id)}"
+
+                stack.append(root)
+                samples[";".join(reversed(stack))] += 1
+            stop.wait(max(0.0, interval - (time.perf_counter() - started)))
+
+profiler = SamplingProfiler()
@@ -0,0 +1,117 @@
+import threading
+from collections import Counter
+from contextvars import ContextVar
+from typing import List, Optional
+from pymongo import monitoring
+from app.core.slow_queries import current_service_method, command_shape
+
+class QueryRecord:
+    __slots__ = ("command", "collection", "duration_ms", "docs_returned", "failed", "service_method", "shape")
+
+    def __init__(self, command: str, collection: Optional[str], duration_ms: float, docs_returned: int, failed: bool = False,
+                 service_method: Optional[str] = None, shape: Optional[dict] = None):
+        self.command = command
+        self.collection = collection
+        self.duration_ms = duration_ms
+        self.docs_returned = docs_returned
+        self.failed = failed
+        self.service_method = service_method
+        self.shape = shape
+
+    def __repr__(self):
+        text = f"{self.collection}.{self.command} ({self.duration_ms:.1f} ms, {self.docs_returned} docs)"
+        if self.service_method:
+            text += f" from {self.service_method}"
+        if self.shape:
+            text += f" {self.shape}"
+        return text
+
+class RequestQueryStats:
+    """Mongo commands issued while handling a single request.
+
+    With capture_commands=True each record also keeps the issuing service method and the
+    literal-free shape of the command, for query budget failures.
+    """
+
+    def __init__(self, capture_commands: bool = False):
+        self.capture_commands = capture_commands
+        self.queries: List[QueryRecord] = []
+        self.duration_ms = 0.0
+        self.docs_returned = 0
+        self._lock = threading.Lock()
+
+    @property
+    def count(self) -> int:
+        return len(self.queries)
+
+    def record(self, query: QueryRecord):
+        # Motor runs commands on executor threads, so guard the counters
+        with self._lock:
+            self.queries.append(query)
+            self.duration_ms += query.duration_ms
+            self.docs_returned += query.docs_returned
+
+    def summary(self) -> str:
+        """Compact 'collection.command x N' summary, most frequent first"""
+        counts = Counter(f"{q.collection}.{q.command}" for q in self.queries)
+        return ", ".join(f"{name} x{n}" for name, n in counts.most_common())
+
+current_query_stats: ContextVar[Optional[RequestQueryStats]] = ContextVar("current_query_stats", default=None)
+
+_CURSOR_COMMANDS = {"find", "aggregate", "getMore"}
+
+def _docs_returned(reply) -> int:
+    cursor = reply.get("cursor") if isinstance(reply, dict) else None
+    if not cursor:
+        return 0
+    batch = cursor.get("firstBatch", cursor.get("nextBatch"))
+    return len(batch) if batch is not None else 0
+
+class QueryStatsListener(monitoring.CommandListener):
+    """Attributes every Mongo command to the request in current_query_stats"""
+
+    def __init__(self):
+        self._commands = {}
+        self._lock = threading.Lock()
+
+    def started(self, event):
+        stats = current_query_stats.get()
+        if stats is None:
+            return
+        collection = event.command.get(event.command_name)
+        if event.command_name == "getMore":
+            collection = event.command.get("collection")
+        collection = collection if isinstance(collection, str) else None
+        detail = None
+        if stats.capture_commands:
+            detail = (current_service_method.get(), command_shape(event.command_name, event.command))
+        with self._lock:
+            self._commands[(event.connection_id, event.request_id)] = (collection, detail)
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        stats = current_query_stats.get()
+        if stats is None:
+            return
+        with self._lock:
+            collection, detail = self._commands.pop((event.connection_id, event.request_id), (None, None))
+        service_method, shape = detail or (None, None)
+        docs = 0
+        if not failed and event.command_name in _CURSOR_COMMANDS:
+            docs = _docs_returned(event.reply)
+        stats.record(QueryRecord(
+            command=event.command_name,
+            collection=collection,
+            duration_ms=event.duration_micros / 1000.0,
+            docs_returned=docs,
+            failed=failed,
+            service_method=service_method,
+            shape=shape
+        ))
+
+query_stats_listener = QueryStatsListener()
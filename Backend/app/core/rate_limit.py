@@ -0,0 +1,145 @@
+import ipaddress
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Tuple
+from fastapi import HTTPException, Request, status
+from pymongo import ReturnDocument
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.security import normalize_email
+
+class InMemoryTokenBucket:
+    """Token-bucket limiter kept in process memory (one bucket per key)"""
+
+    def __init__(self, name: str, capacity: int, window_seconds: int, max_keys: int = 100_000):
+        self.name = name
+        self.capacity = float(capacity)
+        self.refill_rate = capacity / float(window_seconds)
+        self.max_keys = max_keys
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    async def hit(self, key: str) -> float:
+        """Take one token for key. Returns 0 if allowed, otherwise seconds until a token is available"""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.capacity, now))
+        tokens = min(self.capacity, tokens + (now - updated) * self.refill_rate)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.refill_rate
+
+        self._buckets[key] = (tokens - 1, now)
+        if len(self._buckets) > self.max_keys:
+            self._prune(now)
+        return 0.0
+
+    def _prune(self, now: float):
+        """Drop buckets that have refilled completely - they carry no state"""
+        full_after = self.capacity / self.refill_rate
+        self._buckets = {
+            key: value for key, value in self._buckets.items()
+            if now - value[1] < full_after
+        }
+
+class MongoTokenBucket:
+    """Token-bucket limiter shared by all workers through the rate_limits collection"""
+
+    def __init__(self, name: str, capacity: int, window_seconds: int):
+        self.name = name
+        self.capacity = capacity
+        self.window_seconds = window_seconds
+        self.refill_rate = capacity / float(window_seconds)
+
+    async def hit(self, key: str) -> float:
+        """Take one token for key atomically. Returns 0 if allowed, otherwise seconds to wait"""
+        now = datetime.utcnow()
+        elapsed_seconds = {"$divide": [{"$subtract": [now, {"$ifNull": ["$updated_at", now]}]}, 1000]}
+        refilled = {"$min": [
+            self.capacity,
+            {"$add": [{"$ifNull": ["$tokens", self.capacity]}, {"$multiply": [elapsed_seconds, self.refill_rate]}]}
+        ]}
+        pipeline = [
+            {"$set": {"tokens": refilled, "updated_at": now}},
+            {"$set": {"allowed": {"$gte": ["$tokens", 1]}}},
+            {"$set": {
+                "tokens": {"$cond": ["$allowed", {"$subtract": ["$tokens", 1]}, "$tokens"]},
+                "expires_at": now + timedelta(seconds=self.window_seconds)
+            }}
+        ]
+
+        bucket = await get_database().rate_limits.find_one_and_update(
+            {"_id": f"{self.name}:{key}"},
+            pipeline,
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        if bucket["allowed"]:
+            return 0.0
+        return (1 - bucket["tokens"]) / self.refill_rate
+
+def create_limiter(name: str, capacity: int, window_seconds: int):
+    """Create a token-bucket limiter for the configured backend"""
+    if settings.RATE_LIMIT_BACKEND == "mongo":
+        return MongoTokenBucket(name, capacity, window_seconds)
+    return InMemoryTokenBucket(name, capacity, window_seconds)
+
+def _networks(entries: List[str]) -> list:
+    return [ipaddress.ip_network(entry.strip(), strict=False) for entry in entries if entry.strip()]
+
+_trusted_proxies = _networks(settings.TRUSTED_PROXIES)
+
+def _is_trusted(address: str) -> bool:
+    try:
+        ip = ipaddress.ip_address(address)
+    except ValueError:
+        return False
+    return any(ip in network for network in _trusted_proxies)
+
+def client_ip(request: Request) -> str:
+    """Client address for per-IP limits.
+    
+    X-Forwarded-For is only read when the connection comes from a trusted proxy. Its hops are
+    walked from the right (the ones appended by our proxies) and the first untrusted hop is the
+    client; everything to its left was sent by the client and could be forged.
+    """
+    peer = request.client.host if request.client else "unknown"
+    if not _is_trusted(peer):
+        return peer
+    hops = [hop.strip() for hop in request.headers.get("x-forwarded-for", "").split(",") if hop.strip()]
+    for hop in reversed(hops):
+        if not _is_trusted(hop):
+            return hop
+    return hops[0] if hops else peer
+
+async def enforce(limiter, key: str):
+    """Raise 429 if the bucket for key is empty"""
+    retry_after = await limiter.hit(key)
+    if retry_after > 0:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests. Please try again later.",
+            headers={"Retry-After": str(int(retry_after) + 1)},
+        )
+
+otp_request_email_limiter = create_limiter(
+    "otp_request_email", settings.OTP_REQUEST_LIMIT_PER_EMAIL, settings.OTP_RATE_LIMIT_WINDOW_SECONDS
+)
+otp_request_ip_limiter = create_limiter(
+    "otp_request_ip", settings.OTP_REQUEST_LIMIT_PER_IP, settings.OTP_RATE_LIMIT_WINDOW_SECONDS
+)
+otp_verify_email_limiter = create_limiter(
+    "otp_verify_email", settings.OTP_VERIFY_LIMIT_PER_EMAIL, settings.OTP_RATE_LIMIT_WINDOW_SECONDS
+)
+otp_verify_ip_limiter = create_limiter(
+    "otp_verify_ip", settings.OTP_VERIFY_LIMIT_PER_IP, settings.OTP_RATE_LIMIT_WINDOW_SECONDS
+)
+
+async def limit_otp_request(request: Request, email: str):
+    """Rate limit OTP generation per IP and per email"""
+    await enforce(otp_request_ip_limiter, client_ip(request))
+    await enforce(otp_request_email_limiter, normalize_email(email))
+
+async def limit_otp_verify(request: Request, email: str):
+    """Rate limit OTP verification attempts per IP and per email"""
+    await enforce(otp_verify_ip_limiter, client_ip(request))
+    await enforce(otp_verify_email_limiter, normalize_email(email))
@@ -0,0 +1,104 @@
+"""
+Token index for product search.
+
+Products carry `search_tokens`: the trigrams of their normalized name and SKU, plus "^"-marked
+1-2 character word prefixes for queries too short to have a trigram. A product can match a query
+only if it has every token of the query, which the multikey (organization_id, search_tokens)
+index answers without scanning the catalog. Candidates are then verified and ranked inside MongoDB
+(rank_stages) on the normalized name and SKU stored next to the tokens, so only the best matches
+leave the database however many candidates a query has.
+"""
+import re
+from typing import List, Optional
+
+GRAM_SIZE = 3
+# Long queries are filtered on a sample of their grams; verification makes the result exact
+MAX_QUERY_GRAMS = 8
+
+_WHITESPACE = re.compile(r"\s+")
+_WORD_SEPARATORS = re.compile(r"[^0-9a-z]+")
+
+def normalize(text: Optional[str]) -> str:
+    return _WHITESPACE.sub(" ", (text or "").lower()).strip()
+
+def _grams(text: str) -> List[str]:
+    return [text[i:i + GRAM_SIZE] for i in range(len(text) - GRAM_SIZE + 1)]
+
+def _word_prefixes(text: str) -> set:
+    return {
+        "^" + word[:length]
+        for word in _WORD_SEPARATORS.split(text) if word
+        for length in range(1, GRAM_SIZE)
+    }
+
+def search_tokens(name: Optional[str], sku: Optional[str]) -> List[str]:
+    """Tokens stored on a product for its name and SKU"""
+    tokens = set()
+    for text in (normalize(name), normalize(sku)):
+        tokens.update(_grams(text))
+        tokens.update(_word_prefixes(text))
+    return sorted(tokens)
+
+def search_fields(name: Optional[str], sku: Optional[str]) -> dict:
+    """Search fields stored on a product: its tokens and normalized name and SKU"""
+    return {
+        "search_tokens": search_tokens(name, sku),
+        "search_name": normalize(name),
+        "search_sku": normalize(sku)
+    }
+
+def query_tokens(query: str) -> List[str]:
+    """Tokens a product must all have to possibly match the query"""
+    text = normalize(query)
+    if len(text) >= GRAM_SIZE:
+        grams = list(dict.fromkeys(_grams(text)))
+        if len(grams) > MAX_QUERY_GRAMS:
+            step = len(grams) / MAX_QUERY_GRAMS
+            grams = [grams[int(i * step)] for i in range(MAX_QUERY_GRAMS - 1)] + [grams[-1]]
+        return grams
+    words = [word for word in _WORD_SEPARATORS.split(text) if word]
+    return ["^" + words[0]] if words else []
+
+def _normalized(field: str, source: str) -> dict:
+    # Products not backfilled yet: $toLower only folds ASCII, close enough until they are
+    return {"$ifNull": [f"${field}", {"$toLower": {"$trim": {"input": {"$ifNull": [f"${source}", ""]}}}}]}
+
+def _contains(haystack, needle: str) -> dict:
+    return {"$gte": [{"$indexOfCP": [haystack, needle]}, 0]}
+
+def _starts_with(haystack, needle: str) -> dict:
+    return {"$eq": [{"$indexOfCP": [haystack, needle]}, 0]}
+
+def rank_stages(query: str, limit: int) -> List[dict]:
+    """Aggregation stages keeping the `limit` best candidates of the query (then by _id).
+    
+    Exact SKU, then SKU prefix, exact name, name prefix, name word prefix, then substring matches
+    (queries shorter than a trigram only match at word starts); shorter names first within a tier.
+    """
+    text = normalize(query)
+    branches = [
+        ({"$eq": ["$$sku", text]}, 0),
+        (_starts_with("$$sku", text), 1),
+        ({"$eq": ["$$name", text]}, 2),
+        (_starts_with("$$name", text), 3),
+        (_contains({"$concat": [" ", "$$name"]}, f" {text}"), 4)
+    ]
+    if len(text) < GRAM_SIZE:
+        if not _WORD_SEPARATORS.search(text):
+            regex = "(^|[^0-9a-z])" + re.escape(text)
+            branches.append(({"$regexMatch": {"input": {"$concat": ["$$sku", " ", "$$name"]}, "regex": regex}}, 5))
+    else:
+        branches += [(_contains("$$sku", text), 5), (_contains("$$name", text), 6)]
+    return [
+        {"$addFields": {"_search_rank": {"$let": {
+            "vars": {"name": _normalized("search_name", "name"), "sku": _normalized("search_sku", "sku")},
+            "in": {
+                "tier": {"$switch": {"branches": [{"case": case, "then": tier} for case, tier in branches], "default": None}},
+                "length": {"$strLenCP": "$$name"}
+            }
+        }}}},
+        {"$match": {"_search_rank.tier": {"$ne": None}}},
+        {"$sort": {"_search_rank.tier": 1, "_search_rank.length": 1, "_id": 1}},
+        {"$limit": limit},
+        {"$project": {"_search_rank": 0, "search_tokens": 0}}
+    ]
@@ -5,6 +5,8 @@ from passlib.context import CryptContext
 from app.core.config import settings
 import secrets
 import string
+import hmac
+import hashlib
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=12, bcrypt__ident="2b")
 
@@ -49,3 +51,15 @@ def decode_access_token(token: str) -> Optional[dict]:
 def generate_otp(length: int = 6) -> str:
     """Generate a numeric OTP"""
     return ''.join(secrets.choice(string.digits) for _ in range(length))
+
+def normalize_email(email: str) -> str:
+    """Canonical form of an email for OTP records and rate-limit keys"""
+    return email.strip().lower()
+
+def hash_otp(email: str, otp: str) -> str:
+    """Keyed hash of an OTP, bound to the email it was issued for"""
+    message = f"{normalize_email(email)}:{otp}".encode("utf-8")
+    return hmac.new(settings.JWT_SECRET_KEY.encode("utf-8"), message, hashlib.sha256).hexdigest()
+
+def verify_otp_hash(email: str, otp: str, otp_hash: str) -> bool:
+    return hmac.compare_digest(hash_otp(email, otp), otp_hash)
@@ -0,0 +1,46 @@
+import asyncio
+import functools
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from app.core.metrics import metrics
+
+singleflight_requests_total = metrics.counter(
+    "stockmaster_singleflight_requests_total",
+    "Calls to coalesced reads; role=leader computed the result, role=coalesced shared one already in flight",
+    ("name", "role")
+)
+singleflight_in_flight = metrics.gauge(
+    "stockmaster_singleflight_in_flight", "Coalesced computations currently running", ("name",)
+)
+
+class SingleFlight:
+    """Concurrent identical calls share one in-flight computation.
+
+    The computation runs in its own task and every caller (the leader included) awaits it through
+    asyncio.shield, so a caller that disconnects or times out does not cancel it for the others.
+    """
+
+    def __init__(self):
+        self._in_flight: Dict[Tuple[str, Hashable], asyncio.Task] = {}
+
+    async def do(self, name: str, key: Hashable, compute: Callable[[], Awaitable[Any]]) -> Any:
+        flight_key = (name, key)
+        task = self._in_flight.get(flight_key)
+        if task is None:
+            task = asyncio.ensure_future(compute())
+            self._in_flight[flight_key] = task
+            singleflight_in_flight.inc(name)
+            task.add_done_callback(functools.partial(self._finished, flight_key))
+            singleflight_requests_total.inc(name, "leader")
+        else:
+            singleflight_requests_total.inc(name, "coalesced")
+        return await asyncio.shield(task)
+
+    def _finished(self, flight_key: Tuple[str, Hashable], task: asyncio.Task):
+        if self._in_flight.get(flight_key) is task:
+            del self._in_flight[flight_key]
+        singleflight_in_flight.dec(flight_key[0])
+        if not task.cancelled():
+            # Mark the exception retrieved even if every caller went away
+            task.exception()
+
+single_flight = SingleFlight()
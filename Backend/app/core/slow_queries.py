@@ -0,0 +1,209 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import threading
+from contextvars import ContextVar
+from datetime import datetime, timedelta
+from typing import Optional
+from pymongo import monitoring
+from app.core.config import settings
+from app.core.metrics import metrics
+
+SLOW_QUERY_COMMANDS = {"find", "aggregate", "count"}
+
+# Command fields that belong to the wire protocol rather than the query itself
+_SESSION_FIELDS = {"lsid", "$db", "$clusterTime", "$readPreference", "txnNumber", "autocommit", "startTransaction"}
+
+current_service_method: ContextVar[Optional[str]] = ContextVar("current_service_method", default=None)
+
+def instrument_service(cls):
+    """Class decorator: record which service method issued each Mongo command"""
+    for name, member in list(vars(cls).items()):
+        if inspect.iscoroutinefunction(member):
+            setattr(cls, name, _traced(f"{cls.__name__}.{name}", member))
+    return cls
+
+def _traced(qualname: str, method):
+    @functools.wraps(method)
+    async def wrapper(*args, **kwargs):
+        token = current_service_method.set(qualname)
+        try:
+            return await method(*args, **kwargs)
+        finally:
+            current_service_method.reset(token)
+    return wrapper
+
+def query_shape(value):
+    """Replace literal values with '?' so queries that differ only by parameters group together"""
+    if isinstance(value, dict):
+        return {key: query_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        shapes = []
+        for item in value:
+            shape = query_shape(item)
+            if shape not in shapes:
+                shapes.append(shape)
+        return shapes
+    if isinstance(value, str) and value.startswith("$"):
+        # Field paths ("$current_stock") are part of the shape, not parameters
+        return value
+    return "?"
+
+def command_shape(command_name: str, command: dict) -> dict:
+    """Literal-free shape of a command's filter (or pipeline)"""
+    if command_name == "aggregate":
+        return {"pipeline": query_shape(command.get("pipeline", []))}
+    if command_name in ("update", "delete"):
+        return {"filter": query_shape([op.get("q", {}) for op in command.get(command_name + "s", [])])}
+    if command_name == "findAndModify":
+        return {"filter": query_shape(command.get("query", {}))}
+    shape = {"filter": query_shape(command.get("filter" if command_name == "find" else "query", {}))}
+    if command.get("sort"):
+        shape["sort"] = dict(command["sort"])
+    return shape
+
+class SlowQueryLogger(monitoring.CommandListener):
+    """Records find/aggregate/count commands over SLOW_QUERY_THRESHOLD_MS to the capped slow_queries collection.
+
+    Listener callbacks run on Motor's executor threads, so slow commands are handed to the event loop
+    and a background task captures explain("executionStats") and writes the record. A shape is
+    explained at most once per SLOW_QUERY_EXPLAIN_INTERVAL_MINUTES; later occurrences in that
+    interval are only counted ($inc) on the interval's record.
+    """
+
+    def __init__(self, max_pending: int = 1000):
+        self.max_pending = max_pending
+        self.dropped = 0
+        self._pending_commands = {}
+        self._lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._worker = asyncio.create_task(self._run())
+        metrics.register_queue("slow_query_explain", self._queue.qsize)
+
+    def stop(self):
+        if self._worker:
+            self._worker.cancel()
+        self._loop = None
+
+    def started(self, event):
+        if self._loop is None or event.command_name not in SLOW_QUERY_COMMANDS:
+            return
+        with self._lock:
+            self._pending_commands[(event.connection_id, event.request_id)] = (event.command, current_service_method.get())
+
+    def succeeded(self, event):
+        if event.command_name not in SLOW_QUERY_COMMANDS:
+            return
+        with self._lock:
+            pending = self._pending_commands.pop((event.connection_id, event.request_id), None)
+        if pending is None or self._loop is None:
+            return
+        duration_ms = event.duration_micros / 1000.0
+        if duration_ms < settings.SLOW_QUERY_THRESHOLD_MS:
+            return
+        command, service_method = pending
+        self._loop.call_soon_threadsafe(self._enqueue, event.command_name, event.database_name, command, service_method, duration_ms)
+
+    def failed(self, event):
+        with self._lock:
+            self._pending_commands.pop((event.connection_id, event.request_id), None)
+
+    def _enqueue(self, command_name: str, database_name: str, command: dict, service_method: Optional[str], duration_ms: float):
+        if self._queue is None or self._queue.full():
+            self.dropped += 1
+            return
+        self._queue.put_nowait((command_name, database_name, command, service_method, duration_ms, datetime.utcnow()))
+
+    async def _run(self):
+        from app.core.database import db
+        while True:
+            command_name, database_name, command, service_method, duration_ms, occurred_at = await self._queue.get()
+            try:
+                await self._record(db.client[database_name], command_name, command, service_method, duration_ms, occurred_at)
+            except Exception as e:
+                print(f"Failed to record slow query: {e}")
+
+    async def _record(self, database, command_name: str, command: dict, service_method: Optional[str], duration_ms: float, occurred_at: datetime):
+        query = {key: value for key, value in command.items() if key not in _SESSION_FIELDS}
+        collection = query.get(command_name)
+        shape = command_shape(command_name, query)
+        shape_key = hashlib.sha1(
+            json.dumps([collection, command_name, shape], sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+
+        service_method = service_method or "unknown"
+        duration_ms = float(duration_ms)
+
+        # Capped collection: updates must keep the document size, so only fixed-size fields change
+        interval_start = occurred_at - timedelta(minutes=settings.SLOW_QUERY_EXPLAIN_INTERVAL_MINUTES)
+        window = {"shape_key": shape_key, "created_at": {"$gte": interval_start}}
+        result = await database.slow_queries.update_one(
+            {**window, "service_method": service_method},
+            {
+                "$inc": {"count": 1, "total_ms": duration_ms},
+                "$max": {"max_ms": duration_ms, "last_seen_at": occurred_at}
+            }
+        )
+        if result.matched_count:
+            return
+
+        # First occurrence for this service method in the interval; explain unless the shape already was
+        explained = await database.slow_queries.find_one(window, {"explain": 1}, sort=[("created_at", -1)])
+        if explained:
+            explain = explained["explain"]
+        else:
+            try:
+                explain = _summarize_explain(await database.command({"explain": query, "verbosity": "executionStats"}))
+            except Exception as e:
+                explain = {"error": str(e)}
+
+        await database.slow_queries.insert_one({
+            "shape_key": shape_key,
+            "collection": collection,
+            "command": command_name,
+            "shape": shape,
+            "service_method": service_method,
+            "duration_ms": duration_ms,
+            "count": 1,
+            "total_ms": duration_ms,
+            "max_ms": duration_ms,
+            "explain": explain,
+            "created_at": occurred_at,
+            "last_seen_at": occurred_at
+        })
+
+def _summarize_explain(explain: dict) -> dict:
+    """Keep the parts of an explain result that matter for diagnosis"""
+    if "error" in explain:
+        return explain
+    stats = explain.get("executionStats")
+    planner = explain.get("queryPlanner")
+    if stats is None:
+        # Aggregations report the $cursor stage separately
+        for stage in explain.get("stages", []):
+            cursor = stage.get("$cursor")
+            if cursor:
+                stats = cursor.get("executionStats")
+                planner = cursor.get("queryPlanner")
+                break
+    summary = {}
+    if stats:
+        summary.update({
+            "execution_time_ms": stats.get("executionTimeMillis"),
+            "n_returned": stats.get("nReturned"),
+            "keys_examined": stats.get("totalKeysExamined"),
+            "docs_examined": stats.get("totalDocsExamined")
+        })
+    if planner:
+        summary["winning_plan"] = planner.get("winningPlan")
+    return summary
+
+slow_query_logger = SlowQueryLogger()
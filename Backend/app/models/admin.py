@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import datetime
+
+class SlowQueryShape(BaseModel):
+    shape_key: str
+    collection: Optional[str] = None
+    command: str
+    shape: dict
+    service_methods: List[str]
+    count: int
+    total_ms: float
+    avg_ms: float
+    max_ms: float
+    last_seen: datetime
+    last_explain: Optional[dict] = None
@@ -1,7 +1,10 @@
 from pydantic import BaseModel, Field
 from typing import Optional, List
 from datetime import datetime
+from enum import Enum
 from bson import ObjectId
+from app.models.valuation import CostingMethod
+from app.models.location_stock import LocationStock
 
 class PyObjectId(ObjectId):
     @classmethod
@@ -26,10 +29,12 @@ class ProductBase(BaseModel):
     description: Optional[str] = None
     reorder_level: int = 10
     initial_stock: Optional[int] = 0
+    costing_method: CostingMethod = CostingMethod.AVERAGE
 
 class ProductCreate(ProductBase):
     warehouse_id: Optional[str] = None
     location_id: Optional[str] = None
+    unit_cost: Optional[float] = Field(default=None, ge=0)  # cost per unit of initial_stock
 
 class ProductUpdate(BaseModel):
     name: Optional[str] = None
@@ -38,10 +43,13 @@ class ProductUpdate(BaseModel):
     unit_of_measure: Optional[str] = None
     description: Optional[str] = None
     reorder_level: Optional[int] = None
+    costing_method: Optional[CostingMethod] = None  # takes effect for existing stock after a revaluation
 
 class ProductInDB(ProductBase):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     current_stock: int = 0
+    stock_value: float = 0
+    last_unit_cost: Optional[float] = None
     organization_id: str  # Multi-tenant support
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
@@ -61,9 +69,72 @@ class ProductResponse(BaseModel):
     description: Optional[str] = None
     current_stock: int
     reorder_level: int
+    costing_method: CostingMethod = CostingMethod.AVERAGE
+    stock_value: float = 0
     created_at: datetime
     updated_at: datetime
     is_low_stock: bool = False
 
     class Config:
         from_attributes = True
+
+class ProductSuggestion(BaseModel):
+    id: str
+    sku: str
+    name: str
+
+class ProductCategory(BaseModel):
+    category: str
+    product_count: int
+    low_stock_count: int
+
+class ProductScan(BaseModel):
+    id: str
+    name: str
+    sku: str
+    category: str
+    unit_of_measure: str
+    reorder_level: int
+    total_stock: int
+    locations: List[LocationStock]
+
+class ImportFormat(str, Enum):
+    CSV = "csv"
+    NDJSON = "ndjson"
+
+class ProductImportError(BaseModel):
+    line: int
+    sku: Optional[str] = None
+    error: str
+
+class ProductImportResult(BaseModel):
+    rows: int
+    created: int
+    updated: int
+    failed: int
+    errors: List[ProductImportError]  # capped; `failed` has the full count
+    duration_seconds: float
+    rows_per_second: float
+
+class ProductBatchGet(BaseModel):
+    ids: List[str] = Field(default_factory=list, max_length=500)
+    skus: List[str] = Field(default_factory=list, max_length=500)
+
+class ProductBatchGetResult(BaseModel):
+    products: List[ProductResponse]
+    not_found: List[str]  # requested ids and SKUs without a product
+
+class ProductBatchUpdateItem(ProductUpdate):
+    id: str
+
+class ProductBatchUpdate(BaseModel):
+    items: List[ProductBatchUpdateItem] = Field(..., min_length=1, max_length=500)
+
+class ProductBatchItemError(BaseModel):
+    id: str
+    error: str
+
+class ProductBatchUpdateResult(BaseModel):
+    updated: List[ProductResponse]
+    not_found: List[str]
+    errors: List[ProductBatchItemError]
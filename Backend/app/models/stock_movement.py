@@ -38,6 +38,7 @@ class StockMovementLine(BaseModel):
     product_sku: str
     quantity: int
     unit_of_measure: str
+    unit_cost: Optional[float] = Field(default=None, ge=0)  # receipts: purchase cost per unit
 
 class StockMovementBase(BaseModel):
     type: MovementType
@@ -110,5 +111,7 @@ class StockLedgerEntry(BaseModel):
     quantity: int
     quantity_change: int  # Signed quantity change (+/-)
     balance_after: int
+    unit_cost: Optional[float] = None
+    value_change: Optional[float] = None  # Signed inventory value change
     timestamp: datetime
     created_by: str
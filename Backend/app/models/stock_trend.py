@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from datetime import date
+
+class StockTrendPoint(BaseModel):
+    date: date
+    opening: int
+    inflow: int
+    outflow: int
+    closing: int
+
+class StockTrends(BaseModel):
+    product_id: Optional[str] = None
+    location_id: Optional[str] = None
+    warehouse_id: Optional[str] = None
+    start: date
+    end: date
+    points: List[StockTrendPoint]
@@ -0,0 +1,32 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from enum import Enum
+from app.models.product import ProductResponse
+from app.models.warehouse import WarehouseResponse, LocationResponse
+
+class SyncKind(str, Enum):
+    PRODUCT = "product"
+    WAREHOUSE = "warehouse"
+    LOCATION = "location"
+    BALANCE = "balance"  # quantity of one product at one location; id is "<product_id>:<location_id>"
+
+class SyncBalance(BaseModel):
+    product_id: str
+    location_id: str
+    quantity: int
+
+class SyncChange(BaseModel):
+    sequence: int
+    kind: SyncKind
+    id: str
+    deleted: bool = False  # tombstone: the client should drop its copy
+    # Current state of the entity (the one matching `kind`); none for tombstones
+    product: Optional[ProductResponse] = None
+    warehouse: Optional[WarehouseResponse] = None
+    location: Optional[LocationResponse] = None
+    balance: Optional[SyncBalance] = None
+
+class SyncChanges(BaseModel):
+    changes: List[SyncChange]
+    next_token: str  # pass as `since` on the next call
+    has_more: bool
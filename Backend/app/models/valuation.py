@@ -0,0 +1,36 @@
+from pydantic import BaseModel
+from typing import List, Optional
+from enum import Enum
+
+class CostingMethod(str, Enum):
+    AVERAGE = "average"  # weighted-average cost per product and location
+    FIFO = "fifo"        # cost layers consumed oldest first
+
+class LocationValuation(BaseModel):
+    location_id: str
+    quantity: int
+    value: float
+    average_cost: float
+
+class ProductValuation(BaseModel):
+    product_id: str
+    product_name: str
+    product_sku: str
+    costing_method: CostingMethod
+    quantity: int
+    value: float
+    average_cost: float
+    last_unit_cost: Optional[float] = None
+    locations: List[LocationValuation]
+
+class LocationValue(BaseModel):
+    location_id: str
+    value: float
+
+class OrganizationValuation(BaseModel):
+    total_value: float
+
+class RevaluationResult(BaseModel):
+    products: int
+    ledger_entries: int
+    total_value: float
@@ -51,6 +51,7 @@ class WarehouseResponse(BaseModel):
     address: Optional[str] = None
     is_active: bool
     created_at: datetime
+    updated_at: Optional[datetime] = None
 
 class LocationBase(BaseModel):
     name: str
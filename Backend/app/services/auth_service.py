@@ -1,12 +1,24 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from fastapi import HTTPException, status
+from pymongo import ReturnDocument
 from app.core.database import get_database
-from app.core.security import verify_password, get_password_hash, create_access_token, generate_otp
+from app.core.slow_queries import instrument_service
+from app.core.security import (
+    verify_password,
+    get_password_hash,
+    create_access_token,
+    generate_otp,
+    hash_otp,
+    verify_otp_hash,
+    normalize_email
+)
 from app.core.config import settings
 from app.models.user import UserCreate, UserInDB, UserResponse
+from app.services.dashboard_service import dashboard_service
 from app.services.email_service import send_otp_email, send_welcome_email
 
+@instrument_service
 class AuthService:
     @property
     def db(self):
@@ -62,6 +74,7 @@ class AuthService:
         
         org_result = await self.db.organizations.insert_one(org_dict)
         org_id = str(org_result.inserted_id)
+        await dashboard_service.create_counters(org_id)
         
         # Update user with organization_id
         await self.db.users.update_one(
@@ -138,18 +151,21 @@ class AuthService:
         
         # Generate OTP
         otp = generate_otp()
-        otp_expiry = datetime.utcnow() + timedelta(minutes=settings.OTP_EXPIRE_MINUTES)
+        now = datetime.utcnow()
         
-        # Store OTP in database
-        await self.db.users.update_one(
-            {"email": email},
+        # Store hashed OTP in its own collection (TTL index removes it after expiry),
+        # replacing any previous OTP for this email
+        await self.db.password_reset_otps.update_one(
+            {"email": normalize_email(email)},
             {
                 "$set": {
-                    "reset_otp": otp,
-                    "reset_otp_expiry": otp_expiry,
-                    "updated_at": datetime.utcnow()
+                    "otp_hash": hash_otp(email, otp),
+                    "expires_at": now + timedelta(minutes=settings.OTP_EXPIRE_MINUTES),
+                    "attempts": 0,
+                    "created_at": now
                 }
-            }
+            },
+            upsert=True
         )
         
         # Send OTP email
@@ -164,29 +180,35 @@ class AuthService:
     
     async def verify_otp(self, email: str, otp: str) -> bool:
         """Verify OTP"""
-        user = await self.get_user_by_email(email)
-        if not user:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND,
-                detail="User not found"
-            )
-        
-        stored_otp = user.get("reset_otp")
-        otp_expiry = user.get("reset_otp_expiry")
+        # Count the attempt up front so concurrent guesses cannot bypass the limit
+        otp_doc = await self.db.password_reset_otps.find_one_and_update(
+            {"email": normalize_email(email)},
+            {"$inc": {"attempts": 1}},
+            return_document=ReturnDocument.AFTER
+        )
         
-        if not stored_otp or not otp_expiry:
+        if not otp_doc:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="No OTP found. Please request a new one."
             )
         
-        if datetime.utcnow() > otp_expiry:
+        # TTL deletion runs periodically, so expiry is still checked here
+        if datetime.utcnow() > otp_doc["expires_at"]:
+            await self.db.password_reset_otps.delete_one({"_id": otp_doc["_id"]})
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="OTP has expired. Please request a new one."
             )
         
-        if stored_otp != otp:
+        if otp_doc["attempts"] > settings.OTP_MAX_ATTEMPTS:
+            await self.db.password_reset_otps.delete_one({"_id": otp_doc["_id"]})
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Too many invalid attempts. Please request a new OTP."
+            )
+        
+        if not verify_otp_hash(email, otp, otp_doc["otp_hash"]):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid OTP"
@@ -214,6 +236,9 @@ class AuthService:
             }
         )
         
+        # OTPs are single use
+        await self.db.password_reset_otps.delete_one({"email": normalize_email(email)})
+        
         return True
 
 auth_service = AuthService()
@@ -0,0 +1,210 @@
+import asyncio
+import logging
+import sys
+import time
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.metrics import metrics
+from app.core.search import normalize
+from app.core.single_flight import single_flight
+from app.models.product import ProductSuggestion
+
+logger = logging.getLogger("stockmaster.autocomplete")
+
+# Name keys start at each of the first few words, so "42" finds "Widget 42"
+MAX_NAME_WORDS = 4
+# Keys are truncated; longer prefixes are verified against the product itself
+MAX_KEY_LENGTH = 24
+# Separates key and product slot inside an entry; sorts before any printable character
+_SEP = "\x00"
+
+autocomplete_indexes = metrics.gauge(
+    "stockmaster_autocomplete_indexes", "Organizations with an autocomplete index in memory"
+)
+autocomplete_bytes = metrics.gauge(
+    "stockmaster_autocomplete_bytes", "Estimated memory held by autocomplete indexes"
+)
+autocomplete_evictions_total = metrics.counter(
+    "stockmaster_autocomplete_evictions_total", "Autocomplete indexes evicted to stay within the memory budget"
+)
+
+def _name_keys(name: str) -> List[str]:
+    words = name.split(" ")
+    return [" ".join(words[i:]) for i in range(min(len(words), MAX_NAME_WORDS))]
+
+def _entry_size(entry: str) -> int:
+    return sys.getsizeof(entry) + 8  # the string plus its list slot
+
+def _product_size(product: Tuple[str, str, str]) -> int:
+    return sum(map(sys.getsizeof, product)) + 64 + 8  # strings, tuple, list slot
+
+class PrefixIndex:
+    """Sorted "key\\0slot" entries for one organization, searched with bisect.
+    
+    A slot is the position of (product_id, sku, name) in `products`; slots of deleted products
+    are reused. Keys are normalized SKUs and names, so matching is case-insensitive.
+    """
+    
+    def __init__(self):
+        self.sku_entries: List[str] = []
+        self.name_entries: List[str] = []
+        self.products: List[Optional[Tuple[str, str, str]]] = []
+        self.slots: Dict[str, int] = {}
+        self.free_slots: List[int] = []
+        self.size_bytes = 0
+        self.loaded_at = time.monotonic()
+    
+    @classmethod
+    def build(cls, products) -> "PrefixIndex":
+        index = cls()
+        for product in products:
+            slot = len(index.products)
+            entry = (str(product["_id"]), product["sku"], product["name"])
+            index.products.append(entry)
+            index.slots[entry[0]] = slot
+            index.size_bytes += _product_size(entry)
+            for entries, key in index._entries_of(slot, entry):
+                entries.append(key)
+                index.size_bytes += _entry_size(key)
+        index.sku_entries.sort()
+        index.name_entries.sort()
+        return index
+    
+    def _entries_of(self, slot: int, product: Tuple[str, str, str]):
+        _, sku, name = product
+        yield self.sku_entries, f"{normalize(sku)[:MAX_KEY_LENGTH]}{_SEP}{slot}"
+        for key in _name_keys(normalize(name)):
+            yield self.name_entries, f"{key[:MAX_KEY_LENGTH]}{_SEP}{slot}"
+    
+    def add(self, product_id: str, sku: str, name: str):
+        self.remove(product_id)
+        product = (product_id, sku, name)
+        if self.free_slots:
+            slot = self.free_slots.pop()
+            self.products[slot] = product
+        else:
+            slot = len(self.products)
+            self.products.append(product)
+        self.slots[product_id] = slot
+        self.size_bytes += _product_size(product)
+        for entries, entry in self._entries_of(slot, product):
+            insort(entries, entry)
+            self.size_bytes += _entry_size(entry)
+    
+    def remove(self, product_id: str):
+        slot = self.slots.pop(product_id, None)
+        if slot is None:
+            return
+        product = self.products[slot]
+        for entries, entry in self._entries_of(slot, product):
+            position = bisect_left(entries, entry)
+            if position < len(entries) and entries[position] == entry:
+                del entries[position]
+                self.size_bytes -= _entry_size(entry)
+        self.products[slot] = None
+        self.free_slots.append(slot)
+        self.size_bytes -= _product_size(product)
+    
+    def suggest(self, prefix: str, limit: int) -> List[ProductSuggestion]:
+        """SKU matches first, then name matches, each in key order"""
+        prefix = normalize(prefix)
+        key_prefix = prefix[:MAX_KEY_LENGTH]
+        matches = []
+        for entries in (self.sku_entries, self.name_entries):
+            position = bisect_left(entries, key_prefix)
+            while position < len(entries) and len(matches) < limit:
+                entry = entries[position]
+                if not entry.startswith(key_prefix):
+                    break
+                slot = int(entry[entry.rindex(_SEP) + 1:])
+                if slot not in matches and (len(prefix) <= MAX_KEY_LENGTH or self._matches(slot, prefix)):
+                    matches.append(slot)
+                position += 1
+        return [
+            ProductSuggestion(id=self.products[slot][0], sku=self.products[slot][1], name=self.products[slot][2])
+            for slot in matches
+        ]
+    
+    def _matches(self, slot: int, prefix: str) -> bool:
+        _, sku, name = self.products[slot]
+        return normalize(sku).startswith(prefix) or any(key.startswith(prefix) for key in _name_keys(normalize(name)))
+
+class AutocompleteService:
+    """Per-organization in-memory prefix indexes over product SKUs and names.
+    
+    An index is loaded on an organization's first autocomplete request and then kept current by
+    the product writes of this process. Writes handled by other workers are picked up by a
+    background reload once the index is older than AUTOCOMPLETE_MAX_AGE_SECONDS. Least recently
+    used indexes are evicted to stay within AUTOCOMPLETE_MEMORY_BUDGET_BYTES.
+    """
+    
+    def __init__(self):
+        self._indexes: "OrderedDict[str, PrefixIndex]" = OrderedDict()
+        self._refreshing = set()
+    
+    @property
+    def db(self):
+        return get_database()
+    
+    async def suggest(self, org_id: str, prefix: str, limit: int = 10) -> List[ProductSuggestion]:
+        index = self._indexes.get(org_id)
+        if index is None:
+            index = await single_flight.do("autocomplete_load", org_id, lambda: self._load(org_id))
+        else:
+            self._indexes.move_to_end(org_id)
+            if time.monotonic() - index.loaded_at > settings.AUTOCOMPLETE_MAX_AGE_SECONDS:
+                self._schedule_refresh(org_id)
+        return index.suggest(prefix, limit)
+    
+    async def _load(self, org_id: str) -> PrefixIndex:
+        cursor = self.db.products.find({"organization_id": org_id}, {"sku": 1, "name": 1})
+        index = PrefixIndex.build(await cursor.to_list(length=None))
+        self._indexes[org_id] = index
+        self._indexes.move_to_end(org_id)
+        self._evict()
+        return index
+    
+    def _schedule_refresh(self, org_id: str):
+        if org_id in self._refreshing:
+            return
+        self._refreshing.add(org_id)
+        
+        async def refresh():
+            try:
+                await single_flight.do("autocomplete_load", org_id, lambda: self._load(org_id))
+            except Exception:
+                logger.exception("Could not reload autocomplete index of organization %s", org_id)
+            finally:
+                self._refreshing.discard(org_id)
+        asyncio.ensure_future(refresh())
+    
+    def _evict(self):
+        total = sum(index.size_bytes for index in self._indexes.values())
+        # Always keep the most recently used index, even if it alone exceeds the budget
+        while total > settings.AUTOCOMPLETE_MEMORY_BUDGET_BYTES and len(self._indexes) > 1:
+            _, evicted = self._indexes.popitem(last=False)
+            total -= evicted.size_bytes
+            autocomplete_evictions_total.inc()
+        autocomplete_indexes.set(value=len(self._indexes))
+        autocomplete_bytes.set(value=total)
+    
+    def invalidate(self, org_id: str):
+        """Drop an organization's index after bulk changes; it is reloaded on next use"""
+        if self._indexes.pop(org_id, None) is not None:
+            self._evict()
+    
+    def record_product_change(self, org_id: str, before: Optional[dict], after: Optional[dict]):
+        """Apply a product create (before=None), update or delete (after=None) to a loaded index"""
+        index = self._indexes.get(org_id)
+        if index is None:
+            return
+        if after is None:
+            index.remove(str(before["_id"]))
+        elif before is None or before.get("sku") != after.get("sku") or before.get("name") != after.get("name"):
+            index.add(str(after["_id"]), after["sku"], after["name"])
+        self._evict()
+
+autocomplete_service = AutocompleteService()
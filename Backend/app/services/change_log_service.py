@@ -0,0 +1,107 @@
+from datetime import datetime, timedelta
+from typing import Iterable, List, Tuple
+from pymongo import ReturnDocument, UpdateOne
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.slow_queries import instrument_service
+from app.models.sync import SyncKind
+
+CHANGE_BATCH_SIZE = 1000
+
+def balance_id(product_id: str, location_id: str) -> str:
+    return f"{product_id}:{location_id}"
+
+@instrument_service
+class ChangeLogService:
+    """Per-organization change log behind /sync/changes.
+    
+    Every write to a product, warehouse, location or per-location balance records the entity
+    under the next value of the organization's change sequence. Only the latest change of each
+    entity is kept (one document per organization, kind and id, moved forward on every write),
+    so reading the log from a sequence number costs O(entities changed since). Deletes leave a
+    tombstone.
+    
+    The organization's sequence document also lists the reservations still being written
+    (`pending`); readers never go past the lowest of them, so a change that lands late under an
+    earlier number cannot be skipped.
+    """
+    
+    @property
+    def db(self):
+        return get_database()
+    
+    async def _allocate(self, org_id: str, count: int) -> int:
+        """Reserve `count` sequence numbers and mark them pending; returns the first"""
+        expired = {"$subtract": ["$$NOW", int(settings.SYNC_ALLOCATION_TIMEOUT_SECONDS * 1000)]}
+        counter = await self.db.sync_sequences.find_one_and_update(
+            {"_id": org_id},
+            [
+                {"$set": {"sequence": {"$add": [{"$ifNull": ["$sequence", 0]}, count]}}},
+                {"$set": {"pending": {"$concatArrays": [
+                    # Drop reservations of writers that died before releasing them
+                    {"$filter": {"input": {"$ifNull": ["$pending", []]}, "cond": {"$gt": ["$$this.at", expired]}}},
+                    [{"first": {"$subtract": ["$sequence", count - 1]}, "at": "$$NOW"}]
+                ]}}}
+            ],
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["sequence"] - count + 1
+    
+    async def _release(self, org_id: str, first: int):
+        await self.db.sync_sequences.update_one({"_id": org_id}, {"$pull": {"pending": {"first": first}}})
+    
+    async def _readable_sequence(self, org_id: str) -> int:
+        """Highest sequence number below every reservation that is still being written"""
+        counter = await self.db.sync_sequences.find_one({"_id": org_id})
+        if counter is None:
+            return 0
+        expired = datetime.utcnow() - timedelta(seconds=settings.SYNC_ALLOCATION_TIMEOUT_SECONDS)
+        pending = [p["first"] for p in counter.get("pending", []) if p["at"] > expired]
+        return min(pending) - 1 if pending else counter["sequence"]
+    
+    async def record(self, org_id: str, entities: Iterable[Tuple[SyncKind, str]], deleted: bool = False):
+        """Record a write (or delete) of the given (kind, id) entities; call after the write itself"""
+        entities = list(dict.fromkeys(entities))
+        if not entities:
+            return
+        first = await self._allocate(org_id, len(entities))
+        try:
+            await self._write(org_id, entities, first, deleted)
+        finally:
+            await self._release(org_id, first)
+    
+    async def _write(self, org_id: str, entities: List[Tuple[SyncKind, str]], first: int, deleted: bool):
+        operations = []
+        for offset, (kind, entity_id) in enumerate(entities):
+            sequence = first + offset
+            # Concurrent writers may land out of order; an older change never replaces a newer one
+            newer = {"$gt": [sequence, {"$ifNull": ["$sequence", 0]}]}
+            operations.append(UpdateOne(
+                {"organization_id": org_id, "kind": kind.value, "entity_id": entity_id},
+                [{"$set": {
+                    "deleted": {"$cond": [newer, deleted, "$deleted"]},
+                    "recorded_at": {"$cond": [newer, "$$NOW", "$recorded_at"]},
+                    "sequence": {"$cond": [newer, sequence, "$sequence"]}
+                }}],
+                upsert=True
+            ))
+        for start in range(0, len(operations), CHANGE_BATCH_SIZE):
+            await self.db.sync_changes.bulk_write(operations[start:start + CHANGE_BATCH_SIZE], ordered=False)
+    
+    async def get_changes(self, org_id: str, since: int, limit: int) -> Tuple[List[dict], bool]:
+        """Changes after sequence `since` in sequence order, and whether more are ready.
+        
+        A sequence number is reserved just before its change is written, so a change with a lower
+        number can still land after a higher one has been read. The page therefore stops below the
+        lowest reservation still being written; those changes are returned by a later call instead.
+        """
+        readable = await self._readable_sequence(org_id)
+        if readable <= since:
+            return [], False
+        rows = await self.db.sync_changes.find(
+            {"organization_id": org_id, "sequence": {"$gt": since, "$lte": readable}}
+        ).sort("sequence", 1).limit(limit + 1).to_list(length=limit + 1)
+        return rows[:limit], len(rows) > limit
+
+change_log_service = ChangeLogService()
@@ -0,0 +1,35 @@
+from app.core.database import get_database
+from app.core.etags import weak_etag
+from app.core.slow_queries import instrument_service
+
+@instrument_service
+class CollectionVersionService:
+    """Per-organization write counters for the products, warehouses and locations collections.
+    
+    One document per organization ({_id: org_id, products: n, ...}) is incremented after every
+    write to one of those collections. List ETags are derived from it, so a conditional GET of
+    an unchanged list costs a single _id lookup instead of the list query.
+    """
+    
+    @property
+    def db(self):
+        return get_database()
+    
+    async def bump(self, org_id: str, *collections: str):
+        """Record a write to the given collections"""
+        await self.db.collection_versions.update_one(
+            {"_id": org_id},
+            {"$inc": {collection: 1 for collection in collections}},
+            upsert=True
+        )
+    
+    async def get_version(self, org_id: str, collection: str) -> int:
+        document = await self.db.collection_versions.find_one({"_id": org_id}, {collection: 1})
+        return (document or {}).get(collection, 0)
+    
+    async def list_etag(self, org_id: str, collection: str, *params) -> str:
+        """Weak ETag for a list read from `collection` with the given query parameters"""
+        version = await self.get_version(org_id, collection)
+        return weak_etag(collection, org_id, version, *params)
+
+collection_version_service = CollectionVersionService()
@@ -1,5 +1,11 @@
+import asyncio
+from datetime import datetime
 from pydantic import BaseModel
-from typing import List
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+from typing import Callable, List, Optional, Tuple
+from app.core.single_flight import single_flight
+from app.core.slow_queries import instrument_service
 
 class DashboardKPIs(BaseModel):
     total_products: int
@@ -9,8 +15,50 @@ class DashboardKPIs(BaseModel):
     pending_receipts: int = 0
     pending_deliveries: int = 0
     internal_transfers: int = 0
+    total_inventory_value: float = 0
 
+PENDING_STATUSES = ["draft", "waiting", "ready"]
+REBUILD_ATTEMPTS = 5
+
+# Movement type -> counter of its pending movements
+_PENDING_COUNTERS = {
+    "receipt": "pending_receipts",
+    "delivery": "pending_deliveries",
+    "internal": "internal_transfers"
+}
+
+COUNTER_FIELDS = list(DashboardKPIs.model_fields)
+
+def _product_counters(product: Optional[dict]) -> dict:
+    """What a single product contributes to the counters"""
+    if not product:
+        return {}
+    stock = product.get("current_stock", 0)
+    return {
+        "total_products": 1,
+        "low_stock_items": int(stock <= product.get("reorder_level", 0)),
+        "out_of_stock_items": int(stock == 0),
+        "total_stock_value": stock,
+        "total_inventory_value": product.get("stock_value", 0)
+    }
+
+def _movement_counters(movement: Optional[dict]) -> dict:
+    """What a single movement contributes to the counters"""
+    if not movement or movement.get("status") not in PENDING_STATUSES:
+        return {}
+    field = _PENDING_COUNTERS.get(movement.get("type"))
+    return {field: 1} if field else {}
+
+def _delta(before: dict, after: dict) -> dict:
+    keys = set(before) | set(after)
+    delta = {key: after.get(key, 0) - before.get(key, 0) for key in keys}
+    return {key: value for key, value in delta.items() if value}
+
+@instrument_service
 class DashboardService:
+    def __init__(self):
+        self._change_listeners: List[Callable[[str], None]] = []
+    
     @property
     def db(self):
         from app.core.database import get_database
@@ -26,59 +74,149 @@ class DashboardService:
     async def get_dashboard_kpis(self, user_email: str) -> DashboardKPIs:
         """Get dashboard KPIs for user's organization"""
         org_id = await self._get_user_org_id(user_email)
+        return await self.get_organization_kpis(org_id)
+    
+    async def get_organization_kpis(self, org_id: str) -> DashboardKPIs:
+        """Get dashboard KPIs of an organization"""
+        # Dashboards of the same organization poll together; share one read
+        return await single_flight.do("dashboard_kpis", org_id, lambda: self._load_kpis(org_id))
+    
+    async def _load_kpis(self, org_id: str) -> DashboardKPIs:
+        counters = await self.db.dashboard_counters.find_one({"_id": org_id})
+        if counters is None or "built_at" not in counters:
+            # Organization from before the counters (or only deltas so far): build them once
+            counters = await self.rebuild_counters(org_id, overwrite=False)
+        return DashboardKPIs(**{field: counters.get(field, 0) for field in COUNTER_FIELDS})
+    
+    async def record_product_change(self, org_id: str, before: Optional[dict], after: Optional[dict]):
+        """Apply a product create (before=None), update or delete (after=None) to the counters"""
+        await self._inc(org_id, _delta(_product_counters(before), _product_counters(after)))
+    
+    async def record_product_changes(self, org_id: str, changes: List[Tuple[Optional[dict], Optional[dict]]]):
+        """Apply many (before, after) product changes with a single counter update"""
+        total = {}
+        for before, after in changes:
+            for key, value in _delta(_product_counters(before), _product_counters(after)).items():
+                total[key] = total.get(key, 0) + value
+        await self._inc(org_id, {key: value for key, value in total.items() if value})
+    
+    async def record_movement_change(self, org_id: str, before: Optional[dict], after: Optional[dict]):
+        """Apply a movement create (before=None) or status change to the counters"""
+        await self._inc(org_id, _delta(_movement_counters(before), _movement_counters(after)))
+    
+    async def record_value_change(self, org_id: str, value: float):
+        """Apply a change of inventory value (from the valuation service) to the counters"""
+        await self._inc(org_id, {"total_inventory_value": value} if value else {})
+    
+    async def create_counters(self, org_id: str):
+        """Zero counters for a new, empty organization, so every later write only has to $inc them"""
+        now = datetime.utcnow()
+        await self.db.dashboard_counters.update_one(
+            {"_id": org_id},
+            {"$setOnInsert": {**{field: 0 for field in COUNTER_FIELDS}, "version": 0, "built_at": now, "updated_at": now}},
+            upsert=True
+        )
+    
+    async def _inc(self, org_id: str, delta: dict):
+        if not delta:
+            return
+        # Upsert: a delta is never dropped, even before the counters were built. The version tells
+        # rebuild_counters that a delta landed while it was counting
+        await self.db.dashboard_counters.update_one(
+            {"_id": org_id},
+            {"$inc": {**delta, "version": 1}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        self._notify(org_id)
+    
+    def add_change_listener(self, listener: Callable[[str], None]):
+        """Call listener(org_id) whenever an organization's counters change"""
+        self._change_listeners.append(listener)
+    
+    def _notify(self, org_id: str):
+        for listener in self._change_listeners:
+            listener(org_id)
+    
+    async def compute_counters(self, org_id: str) -> dict:
+        """Counters computed from the products and movements themselves"""
+        product_kpis, pending = await asyncio.gather(
+            self._product_kpis(org_id),
+            self._pending_movement_counts(org_id)
+        )
+        counters = dict(product_kpis)
+        for movement_type, field in _PENDING_COUNTERS.items():
+            counters[field] = pending.get(movement_type, 0)
+        return counters
+    
+    async def rebuild_counters(self, org_id: str, overwrite: bool = True) -> dict:
+        """Recompute an organization's counters. Without overwrite, counters already built are kept.
         
-        # Total products
-        total_products = await self.db.products.count_documents({"organization_id": org_id})
-        
-        # Low stock items (stock <= reorder level)
-        low_stock_items = await self.db.products.count_documents({
-            "organization_id": org_id,
-            "$expr": {"$lte": ["$current_stock", "$reorder_level"]}
-        })
-        
-        # Out of stock items
-        out_of_stock_items = await self.db.products.count_documents({
-            "organization_id": org_id,
-            "current_stock": 0
-        })
-        
-        # Total stock value (sum of all stock)
+        The difference between the counted and the stored values is applied only if the counters'
+        version is still the one read before counting; a delta that landed meanwhile may already be
+        in the count, so the rebuild starts over instead. After REBUILD_ATTEMPTS busy rounds the last
+        one is applied anyway, and such deltas can be counted twice (reconcile_dashboard_counters.py
+        repairs that). A write whose $inc lands only after the correction is never double counted
+        unless its own write and $inc straddle the whole rebuild.
+        """
+        for attempt in range(REBUILD_ATTEMPTS):
+            stored = await self.db.dashboard_counters.find_one({"_id": org_id}) or {}
+            if not overwrite and "built_at" in stored:
+                return stored
+            computed = await self.compute_counters(org_id)
+            correction = {field: computed.get(field, 0) - stored.get(field, 0) for field in COUNTER_FIELDS}
+            now = datetime.utcnow()
+            update = {"$set": {"built_at": now, "updated_at": now}, "$inc": {"version": 1}}
+            update["$inc"].update({field: value for field, value in correction.items() if value})
+            query = {"_id": org_id}
+            if attempt < REBUILD_ATTEMPTS - 1:
+                version = stored.get("version")
+                query["version"] = {"$exists": False} if version is None else version
+            try:
+                counters = await self.db.dashboard_counters.find_one_and_update(
+                    query, update, upsert=True, return_document=ReturnDocument.AFTER
+                )
+            except DuplicateKeyError:
+                # The counters changed (or were built by another worker) since they were read
+                continue
+            self._notify(org_id)
+            return counters
+    
+    async def _product_kpis(self, org_id: str) -> dict:
+        """Product counts and total stock in one pass over the org's products"""
         pipeline = [
             {"$match": {"organization_id": org_id}},
-            {"$group": {"_id": None, "total": {"$sum": "$current_stock"}}}
+            {"$group": {
+                "_id": None,
+                "total_products": {"$sum": 1},
+                # Low stock: stock <= reorder level
+                "low_stock_items": {"$sum": {"$cond": [{"$lte": ["$current_stock", "$reorder_level"]}, 1, 0]}},
+                "out_of_stock_items": {"$sum": {"$cond": [{"$eq": ["$current_stock", 0]}, 1, 0]}},
+                "total_stock_value": {"$sum": "$current_stock"},
+                "total_inventory_value": {"$sum": {"$ifNull": ["$stock_value", 0]}}
+            }},
+            {"$project": {"_id": 0}}
         ]
         result = await self.db.products.aggregate(pipeline).to_list(1)
-        total_stock_value = result[0]["total"] if result else 0
-        
-        # Pending receipts (receipts not yet done)
-        pending_receipts = await self.db.stock_movements.count_documents({
-            "organization_id": org_id,
-            "type": "receipt",
-            "status": {"$in": ["draft", "waiting", "ready"]}
-        })
-        
-        # Pending deliveries (deliveries not yet done)
-        pending_deliveries = await self.db.stock_movements.count_documents({
-            "organization_id": org_id,
-            "type": "delivery",
-            "status": {"$in": ["draft", "waiting", "ready"]}
-        })
-        
-        # Internal transfers (transfers not yet done)
-        internal_transfers = await self.db.stock_movements.count_documents({
-            "organization_id": org_id,
-            "type": "internal",
-            "status": {"$in": ["draft", "waiting", "ready"]}
-        })
-        
-        return DashboardKPIs(
-            total_products=total_products,
-            low_stock_items=low_stock_items,
-            out_of_stock_items=out_of_stock_items,
-            total_stock_value=total_stock_value,
-            pending_receipts=pending_receipts,
-            pending_deliveries=pending_deliveries,
-            internal_transfers=internal_transfers
-        )
+        if not result:
+            return {
+                "total_products": 0,
+                "low_stock_items": 0,
+                "out_of_stock_items": 0,
+                "total_stock_value": 0,
+                "total_inventory_value": 0
+            }
+        return result[0]
+    
+    async def _pending_movement_counts(self, org_id: str) -> dict:
+        """Movements not yet done, counted per type"""
+        pipeline = [
+            {"$match": {
+                "organization_id": org_id,
+                "type": {"$in": list(_PENDING_COUNTERS)},
+                "status": {"$in": PENDING_STATUSES}
+            }},
+            {"$group": {"_id": "$type", "count": {"$sum": 1}}}
+        ]
+        return {row["_id"]: row["count"] async for row in self.db.stock_movements.aggregate(pipeline)}
 
 dashboard_service = DashboardService()
@@ -0,0 +1,152 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+from fastapi import WebSocket, WebSocketDisconnect
+from starlette.websockets import WebSocketState
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.dashboard_service import dashboard_service
+
+logger = logging.getLogger("stockmaster.kpi_stream")
+
+kpi_stream_subscribers = metrics.gauge(
+    "stockmaster_kpi_stream_subscribers", "Open dashboard KPI WebSocket connections"
+)
+kpi_stream_messages_total = metrics.counter(
+    "stockmaster_kpi_stream_messages_total", "Messages sent to KPI WebSocket subscribers", ("type",)
+)
+kpi_stream_resyncs_total = metrics.counter(
+    "stockmaster_kpi_stream_resyncs_total", "Slow subscribers whose pending diffs were replaced by a snapshot"
+)
+
+class Subscriber:
+    """One WebSocket connection: a bounded queue of messages waiting to be sent"""
+    
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+    
+    def offer(self, message: dict, snapshot: dict):
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            # Slow consumer: drop the diffs it has not read yet and resync it with one snapshot
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait({"type": "snapshot", "data": snapshot})
+            kpi_stream_resyncs_total.inc()
+
+class OrganizationChannel:
+    def __init__(self):
+        self.subscribers: Set[Subscriber] = set()
+        self.snapshot: Optional[dict] = None
+        self.changed = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+class KPIStreamService:
+    """Pushes dashboard KPIs to WebSocket subscribers.
+    
+    Each organization with subscribers has one task that re-reads the KPIs when counters change
+    (or every KPI_STREAM_POLL_SECONDS, for writes handled by other workers), computes the diff
+    against the last snapshot once and fans it out to every subscriber's queue.
+    """
+    
+    def __init__(self):
+        self._channels: Dict[str, OrganizationChannel] = {}
+        dashboard_service.add_change_listener(self.notify)
+    
+    def notify(self, org_id: str):
+        """Counters of an organization changed"""
+        channel = self._channels.get(org_id)
+        if channel:
+            channel.changed.set()
+    
+    def subscribe(self, org_id: str) -> Subscriber:
+        subscriber = Subscriber(settings.KPI_STREAM_QUEUE_SIZE)
+        channel = self._channels.get(org_id)
+        if channel is None:
+            channel = self._channels[org_id] = OrganizationChannel()
+            channel.task = asyncio.create_task(self._publish(org_id, channel))
+        elif channel.snapshot is not None:
+            subscriber.offer({"type": "snapshot", "data": channel.snapshot}, channel.snapshot)
+        channel.subscribers.add(subscriber)
+        kpi_stream_subscribers.inc()
+        return subscriber
+    
+    def unsubscribe(self, org_id: str, subscriber: Subscriber):
+        channel = self._channels.get(org_id)
+        if not channel or subscriber not in channel.subscribers:
+            return
+        channel.subscribers.discard(subscriber)
+        kpi_stream_subscribers.dec()
+        if not channel.subscribers:
+            del self._channels[org_id]
+            channel.task.cancel()
+    
+    async def _publish(self, org_id: str, channel: OrganizationChannel):
+        first = True
+        while True:
+            if not first:
+                try:
+                    await asyncio.wait_for(channel.changed.wait(), timeout=settings.KPI_STREAM_POLL_SECONDS)
+                    # Let a burst of writes (e.g. a multi-line movement) settle into one diff
+                    await asyncio.sleep(settings.KPI_STREAM_DEBOUNCE_SECONDS)
+                except asyncio.TimeoutError:
+                    pass
+            first = False
+            channel.changed.clear()
+            
+            try:
+                kpis = (await dashboard_service.get_organization_kpis(org_id)).model_dump()
+            except Exception:
+                logger.exception("Could not read dashboard KPIs of organization %s", org_id)
+                continue
+            
+            if channel.snapshot is None:
+                message = {"type": "snapshot", "data": kpis}
+            else:
+                diff = {field: value for field, value in kpis.items() if channel.snapshot.get(field) != value}
+                if not diff:
+                    continue
+                message = {"type": "diff", "data": diff}
+            channel.snapshot = kpis
+            for subscriber in list(channel.subscribers):
+                subscriber.offer(message, kpis)
+    
+    async def serve(self, websocket: WebSocket, org_id: str):
+        """Stream KPIs to an accepted WebSocket until it disconnects"""
+        subscriber = self.subscribe(org_id)
+        sender = asyncio.create_task(self._send(websocket, subscriber))
+        receiver = asyncio.create_task(self._receive(websocket))
+        try:
+            done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if not task.cancelled() and task.exception() and not isinstance(task.exception(), WebSocketDisconnect):
+                    logger.info("KPI stream for organization %s closed: %r", org_id, task.exception())
+        finally:
+            sender.cancel()
+            receiver.cancel()
+            self.unsubscribe(org_id, subscriber)
+            if websocket.client_state == WebSocketState.CONNECTED:
+                try:
+                    await websocket.close()
+                except RuntimeError:
+                    pass
+    
+    async def _send(self, websocket: WebSocket, subscriber: Subscriber):
+        while True:
+            try:
+                message = await asyncio.wait_for(subscriber.queue.get(), timeout=settings.KPI_STREAM_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                message = {"type": "ping"}
+            # A client that stops reading fills its socket buffer; give up on it instead of piling up
+            await asyncio.wait_for(websocket.send_json(message), timeout=settings.KPI_STREAM_SEND_TIMEOUT_SECONDS)
+            kpi_stream_messages_total.inc(message["type"])
+    
+    async def _receive(self, websocket: WebSocket):
+        # Clients only send pongs/keepalives; reading is how a disconnect is noticed
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                return
+
+kpi_stream_service = KPIStreamService()
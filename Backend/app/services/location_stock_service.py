@@ -1,9 +1,13 @@
+from collections import defaultdict
 from typing import List, Optional
 from bson import ObjectId
 from fastapi import HTTPException, status
 from app.core.database import get_database
+from app.core.single_flight import single_flight
+from app.core.slow_queries import instrument_service
 from app.models.location_stock import ProductLocationStock, LocationStock, LocationStockSummary
 
+@instrument_service
 class LocationStockService:
     @property
     def db(self):
@@ -47,21 +51,24 @@ class LocationStockService:
             {"$match": {"quantity": {"$gt": 0}}}  # Only locations with stock
         ]
         
+        quantities = await self.db.stock_ledger.aggregate(pipeline).to_list(length=None)
+        
+        # Location details for every stocked location in one query
+        cursor = self.db.locations.find({
+            "_id": {"$in": [ObjectId(loc["_id"]) for loc in quantities if loc["_id"] and ObjectId.is_valid(loc["_id"])]},
+            "organization_id": org_id
+        }, {"name": 1})
+        locations_by_id = {str(l["_id"]): l async for l in cursor}
+        
         location_stocks = []
-        async for loc in self.db.stock_ledger.aggregate(pipeline):
-            location_id = loc["_id"]
-            if location_id:
-                # Get location details
-                location = await self.db.locations.find_one({
-                    "_id": ObjectId(location_id),
-                    "organization_id": org_id
-                })
-                if location:
-                    location_stocks.append(LocationStock(
-                        location_id=str(location["_id"]),
-                        location_name=location["name"],
-                        quantity=loc["quantity"]
-                    ))
+        for loc in quantities:
+            location = locations_by_id.get(loc["_id"])
+            if location:
+                location_stocks.append(LocationStock(
+                    location_id=str(location["_id"]),
+                    location_name=location["name"],
+                    quantity=loc["quantity"]
+                ))
         
         total_stock = sum(loc.quantity for loc in location_stocks)
         
@@ -76,16 +83,58 @@ class LocationStockService:
     async def get_all_products_location_stock(self, user_email: str) -> List[ProductLocationStock]:
         """Get stock levels for all products across all locations"""
         org_id = await self._get_user_org_id(user_email)
+        # Tenant-wide: concurrent requests from the same organization share one computation
+        return await single_flight.do(
+            "location_stock_products", org_id, lambda: self._all_products_location_stock(org_id)
+        )
+    
+    async def _all_products_location_stock(self, org_id: str) -> List[ProductLocationStock]:
+        """Three queries regardless of size: products, one grouped ledger aggregation, locations"""
+        products = await self.db.products.find(
+            {"organization_id": org_id}, {"name": 1, "sku": 1}
+        ).to_list(length=1000)
+        product_ids = [str(p["_id"]) for p in products]
         
-        products = await self.db.products.find({"organization_id": org_id}).to_list(length=1000)
+        pipeline = [
+            {"$match": {
+                "organization_id": org_id,
+                "product_id": {"$in": product_ids}
+            }},
+            {"$group": {
+                "_id": {"product_id": "$product_id", "location_id": "$location_id"},
+                "quantity": {"$sum": "$quantity_change"}
+            }},
+            {"$match": {"quantity": {"$gt": 0}}}  # Only locations with stock
+        ]
+        quantities = await self.db.stock_ledger.aggregate(pipeline).to_list(length=None)
         
-        result = []
-        for product in products:
-            product_stock = await self.get_product_location_stock(str(product["_id"]), user_email)
-            if product_stock:
-                result.append(product_stock)
+        location_ids = {q["_id"]["location_id"] for q in quantities}
+        cursor = self.db.locations.find({
+            "_id": {"$in": [ObjectId(l) for l in location_ids if l and ObjectId.is_valid(l)]},
+            "organization_id": org_id
+        }, {"name": 1})
+        locations_by_id = {str(l["_id"]): l async for l in cursor}
         
-        return result
+        stocks_by_product = defaultdict(list)
+        for q in quantities:
+            location = locations_by_id.get(q["_id"]["location_id"])
+            if location:
+                stocks_by_product[q["_id"]["product_id"]].append(LocationStock(
+                    location_id=str(location["_id"]),
+                    location_name=location["name"],
+                    quantity=q["quantity"]
+                ))
+        
+        return [
+            ProductLocationStock(
+                product_id=str(product["_id"]),
+                product_name=product["name"],
+                product_sku=product["sku"],
+                total_stock=sum(loc.quantity for loc in stocks_by_product[str(product["_id"])]),
+                locations=stocks_by_product[str(product["_id"])]
+            )
+            for product in products
+        ]
     
     async def get_location_stock_summary(self, location_id: str, user_email: str) -> Optional[LocationStockSummary]:
         """Get all products and their quantities in a specific location"""
@@ -121,13 +170,18 @@ class LocationStockService:
             {"$match": {"quantity": {"$gt": 0}}}
         ]
         
+        quantities = await self.db.stock_ledger.aggregate(pipeline).to_list(length=None)
+        
+        # Product details for every product in the location in one query
+        cursor = self.db.products.find({
+            "_id": {"$in": [ObjectId(item["_id"]) for item in quantities if ObjectId.is_valid(item["_id"])]},
+            "organization_id": org_id
+        }, {"name": 1, "sku": 1})
+        products_by_id = {str(p["_id"]): p async for p in cursor}
+        
         products = []
-        async for item in self.db.stock_ledger.aggregate(pipeline):
-            product_id = item["_id"]
-            product = await self.db.products.find_one({
-                "_id": ObjectId(product_id),
-                "organization_id": org_id
-            })
+        for item in quantities:
+            product = products_by_id.get(item["_id"])
             if product:
                 products.append({
                     "product_id": str(product["_id"]),
@@ -148,15 +202,67 @@ class LocationStockService:
     async def get_all_locations_stock_summary(self, user_email: str) -> List[LocationStockSummary]:
         """Get stock summary for all locations"""
         org_id = await self._get_user_org_id(user_email)
+        return await single_flight.do(
+            "location_stock_locations", org_id, lambda: self._all_locations_stock_summary(org_id)
+        )
+    
+    async def _all_locations_stock_summary(self, org_id: str) -> List[LocationStockSummary]:
+        """Four queries regardless of size: locations, warehouses, one grouped ledger aggregation, products"""
+        locations = await self.db.locations.find(
+            {"organization_id": org_id}, {"name": 1, "warehouse_id": 1}
+        ).to_list(length=1000)
+        location_ids = [str(l["_id"]) for l in locations]
+        
+        warehouse_ids = {l["warehouse_id"] for l in locations if ObjectId.is_valid(l.get("warehouse_id"))}
+        cursor = self.db.warehouses.find({
+            "_id": {"$in": [ObjectId(w) for w in warehouse_ids]},
+            "organization_id": org_id
+        }, {"name": 1})
+        warehouses_by_id = {str(w["_id"]): w async for w in cursor}
+        
+        pipeline = [
+            {"$match": {
+                "organization_id": org_id,
+                "location_id": {"$in": location_ids}
+            }},
+            {"$group": {
+                "_id": {"location_id": "$location_id", "product_id": "$product_id"},
+                "quantity": {"$sum": "$quantity_change"}
+            }},
+            {"$match": {"quantity": {"$gt": 0}}}
+        ]
+        quantities = await self.db.stock_ledger.aggregate(pipeline).to_list(length=None)
         
-        locations = await self.db.locations.find({"organization_id": org_id}).to_list(length=1000)
+        product_ids = {q["_id"]["product_id"] for q in quantities}
+        cursor = self.db.products.find({
+            "_id": {"$in": [ObjectId(p) for p in product_ids if p and ObjectId.is_valid(p)]},
+            "organization_id": org_id
+        }, {"name": 1, "sku": 1})
+        products_by_id = {str(p["_id"]): p async for p in cursor}
+        
+        products_by_location = defaultdict(list)
+        for q in quantities:
+            product = products_by_id.get(q["_id"]["product_id"])
+            if product:
+                products_by_location[q["_id"]["location_id"]].append({
+                    "product_id": str(product["_id"]),
+                    "product_name": product["name"],
+                    "product_sku": product["sku"],
+                    "quantity": q["quantity"]
+                })
         
         result = []
         for location in locations:
-            summary = await self.get_location_stock_summary(str(location["_id"]), user_email)
-            if summary:
-                result.append(summary)
-        
+            warehouse = warehouses_by_id.get(str(location["warehouse_id"]))
+            products = products_by_location[str(location["_id"])]
+            result.append(LocationStockSummary(
+                location_id=str(location["_id"]),
+                location_name=location["name"],
+                warehouse_id=str(location["warehouse_id"]),
+                warehouse_name=warehouse["name"] if warehouse else "Unknown",
+                products=products,
+                total_products=len(products)
+            ))
         return result
 
 location_stock_service = LocationStockService()
@@ -3,6 +3,8 @@ from datetime import datetime
 from fastapi import HTTPException, status
 from bson import ObjectId
 from app.core.database import get_database
+from app.core.slow_queries import instrument_service
+from app.services.dashboard_service import dashboard_service
 from app.models.organization import (
     OrganizationCreate,
     OrganizationResponse,
@@ -10,6 +12,7 @@ from app.models.organization import (
     AddMemberRequest
 )
 
+@instrument_service
 class OrganizationService:
     @property
     def db(self):
@@ -43,6 +46,7 @@ class OrganizationService:
         
         result = await self.db.organizations.insert_one(org_dict)
         org_dict["_id"] = result.inserted_id
+        await dashboard_service.create_counters(str(result.inserted_id))
         
         return self._to_response(org_dict)
     
@@ -0,0 +1,332 @@
+import codecs
+import csv
+import json
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from datetime import datetime
+from fastapi import HTTPException, status
+from bson import ObjectId
+from pydantic import ValidationError
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from app.core.database import get_database
+from app.core.slow_queries import instrument_service
+from app.core.search import search_fields
+from app.models.product import ProductCreate, ImportFormat, ProductImportError, ProductImportResult
+from app.models.sync import SyncKind
+from app.models.valuation import CostingMethod
+from app.services.product_service import STOCK_FLAGS_STAGE, product_by_sku_cache, product_categories_cache
+from app.services.dashboard_service import dashboard_service
+from app.services.stock_rollup_service import stock_rollup_service
+from app.services.valuation_service import valuation_service
+from app.services.autocomplete_service import autocomplete_service
+from app.services.collection_version_service import collection_version_service
+from app.services.change_log_service import change_log_service
+
+IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 1000
+# Catalog columns a row may leave out: an update keeps the stored value, an insert gets the default
+OPTIONAL_CATALOG_FIELDS = ("unit_of_measure", "description", "reorder_level")
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    """Decode a UTF-8 byte stream (optionally with BOM) into lines"""
+    decoder = codecs.getincrementaldecoder("utf-8-sig")()
+    buffer = ""
+    async for chunk in chunks:
+        buffer += decoder.decode(chunk)
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    buffer += decoder.decode(b"", final=True)
+    if buffer:
+        yield buffer.rstrip("\r")
+
+async def _csv_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    """(line number, row dict) per CSV record; the first record is the header"""
+    header = None
+    record, first_line, number = None, 0, 0
+    async for line in lines:
+        number += 1
+        if record is None:
+            record, first_line = line, number
+        else:
+            record += "\n" + line
+        # An odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            continue
+        text, record = record, None
+        if not text.strip():
+            continue
+        try:
+            values = next(csv.reader([text]))
+        except csv.Error as e:
+            yield first_line, f"Invalid CSV: {e}"
+            continue
+        if header is None:
+            header = [name.strip() for name in values]
+            continue
+        yield first_line, dict(zip(header, values))
+    if record is not None:
+        yield first_line, "Invalid CSV: unterminated quoted field"
+
+async def _ndjson_rows(lines: AsyncIterator[str]) -> AsyncIterator[Tuple[int, object]]:
+    number = 0
+    async for line in lines:
+        number += 1
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield number, f"Invalid JSON: {e}"
+            continue
+        yield number, row if isinstance(row, dict) else "Each line must be a JSON object"
+
+def _validation_message(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in e['loc'])}: {e['msg']}" if e["loc"] else e["msg"]
+        for e in error.errors()
+    )
+
+class _ImportRun:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.rows = 0
+        self.created = 0
+        self.updated = 0
+        self.failed = 0
+        self.errors: List[ProductImportError] = []
+        self.first_line_of_sku: Dict[str, int] = {}
+    
+    def fail(self, line: int, sku: Optional[str], error: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append(ProductImportError(line=line, sku=sku, error=error))
+    
+    def result(self) -> ProductImportResult:
+        duration = time.perf_counter() - self.started
+        return ProductImportResult(
+            rows=self.rows,
+            created=self.created,
+            updated=self.updated,
+            failed=self.failed,
+            errors=self.errors,
+            duration_seconds=round(duration, 3),
+            rows_per_second=round(self.rows / duration, 1) if duration > 0 else 0.0
+        )
+
+@instrument_service
+class ProductImportService:
+    """Streaming bulk import: products are upserted by SKU, IMPORT_BATCH_SIZE rows per bulk_write.
+    
+    Rows that create a product with initial stock at a location also get their ledger entry,
+    daily rollup and valuation position, written in bulk per batch. Existing products are updated
+    (only the catalog columns present in the row; their stock is left alone). An import never
+    changes an existing product's costing_method, which needs a revaluation of its stock.
+    """
+    
+    @property
+    def db(self):
+        return get_database()
+    
+    async def _get_user_org_id(self, user_email: str) -> str:
+        """Get organization_id for a user"""
+        user = await self.db.users.find_one({"email": user_email})
+        if not user or not user.get("organization_id"):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="User organization not found"
+            )
+        return user["organization_id"]
+    
+    async def import_products(
+        self,
+        chunks: AsyncIterator[bytes],
+        import_format: ImportFormat,
+        user_email: str
+    ) -> ProductImportResult:
+        """Import products from a CSV (with header) or NDJSON byte stream"""
+        org_id = await self._get_user_org_id(user_email)
+        run = _ImportRun()
+        parse = _ndjson_rows if import_format == ImportFormat.NDJSON else _csv_rows
+        
+        batch: List[Tuple[int, ProductCreate]] = []
+        async for line, row in parse(_lines(chunks)):
+            run.rows += 1
+            if isinstance(row, str):
+                run.fail(line, None, row)
+                continue
+            row = {key.strip(): value for key, value in row.items() if key and value not in ("", None)}
+            try:
+                product = ProductCreate.model_validate(row)
+            except ValidationError as e:
+                run.fail(line, row.get("sku"), _validation_message(e))
+                continue
+            first_line = run.first_line_of_sku.setdefault(product.sku, line)
+            if first_line != line:
+                run.fail(line, product.sku, f"SKU appears more than once in this import (first on line {first_line})")
+                continue
+            batch.append((line, product))
+            if len(batch) == IMPORT_BATCH_SIZE:
+                await self._write_batch(org_id, user_email, batch, run)
+                batch = []
+        if batch:
+            await self._write_batch(org_id, user_email, batch, run)
+        
+        if run.created or run.updated:
+            # One recount is cheaper than a counter delta per row
+            await dashboard_service.rebuild_counters(org_id)
+            autocomplete_service.invalidate(org_id)
+            product_categories_cache.invalidate(org_id)
+            await collection_version_service.bump(org_id, "products")
+        return run.result()
+    
+    async def _valid_locations(self, org_id: str, batch: List[Tuple[int, ProductCreate]]) -> set:
+        ids = {product.location_id for _, product in batch if product.location_id and ObjectId.is_valid(product.location_id)}
+        if not ids:
+            return set()
+        cursor = self.db.locations.find(
+            {"_id": {"$in": [ObjectId(i) for i in ids]}, "organization_id": org_id}, {"_id": 1}
+        )
+        return {str(location["_id"]) async for location in cursor}
+    
+    async def _costing_conflicts(self, org_id: str, batch: List[Tuple[int, ProductCreate]]) -> Dict[str, str]:
+        """Stored costing_method of existing products whose row asks for a different one"""
+        requested = {product.sku: product.costing_method.value for _, product in batch if "costing_method" in product.model_fields_set}
+        if not requested:
+            return {}
+        cursor = self.db.products.find(
+            {"organization_id": org_id, "sku": {"$in": list(requested)}}, {"sku": 1, "costing_method": 1}
+        )
+        conflicts = {}
+        async for existing in cursor:
+            stored = existing.get("costing_method", CostingMethod.AVERAGE.value)
+            if stored != requested[existing["sku"]]:
+                conflicts[existing["sku"]] = stored
+        return conflicts
+    
+    def _upsert(self, org_id: str, user_email: str, product: ProductCreate, stocked: bool, now: datetime) -> list:
+        """Update pipeline: catalog columns present in the row are set, everything else only on insert"""
+        initial_stock = product.initial_stock or 0
+        value = round(initial_stock * product.unit_cost, 4) if stocked and product.unit_cost is not None else 0.0
+        catalog = {
+            "name": product.name,
+            "category": product.category,
+            **search_fields(product.name, product.sku),
+            "updated_at": now
+        }
+        on_insert = {
+            "costing_method": product.costing_method.value,
+            "current_stock": initial_stock,
+            "stock_value": value,
+            "last_unit_cost": product.unit_cost,
+            "created_at": now,
+            "created_by": user_email
+        }
+        for field in OPTIONAL_CATALOG_FIELDS:
+            target = catalog if field in product.model_fields_set else on_insert
+            target[field] = getattr(product, field)
+        return [
+            {"$set": {
+                **{field: {"$literal": v} for field, v in catalog.items()},
+                **{field: {"$ifNull": [f"${field}", {"$literal": v}]} for field, v in on_insert.items()}
+            }},
+            STOCK_FLAGS_STAGE
+        ]
+    
+    async def _write_batch(self, org_id: str, user_email: str, batch: List[Tuple[int, ProductCreate]], run: _ImportRun):
+        valid_locations = await self._valid_locations(org_id, batch)
+        costing_conflicts = await self._costing_conflicts(org_id, batch)
+        now = datetime.utcnow()
+        
+        rows: List[Tuple[int, ProductCreate, bool]] = []
+        operations = []
+        for line, product in batch:
+            if product.location_id and product.location_id not in valid_locations:
+                run.fail(line, product.sku, "Location not found in your organization")
+                continue
+            if product.sku in costing_conflicts:
+                run.fail(
+                    line, product.sku,
+                    f"costing_method cannot be changed by an import (currently {costing_conflicts[product.sku]}); "
+                    "update the product and revalue its stock instead"
+                )
+                continue
+            stocked = bool(product.initial_stock and product.initial_stock > 0 and product.location_id)
+            rows.append((line, product, stocked))
+            operations.append(UpdateOne(
+                {"organization_id": org_id, "sku": product.sku},
+                self._upsert(org_id, user_email, product, stocked, now),
+                upsert=True
+            ))
+        if not operations:
+            return
+        if any(stocked for _, _, stocked in rows):
+            await valuation_service.ensure_not_revaluing(org_id)
+        
+        # Unordered: one bad row does not stop the rest; the unique (organization_id, sku) index
+        # replaces a per-row existence check
+        try:
+            result = await self.db.products.bulk_write(operations, ordered=False)
+            upserted, failed = result.upserted_ids, {}
+        except BulkWriteError as e:
+            upserted = {u["index"]: u["_id"] for u in e.details.get("upserted", [])}
+            failed = {error["index"]: error.get("errmsg", "Write failed") for error in e.details.get("writeErrors", [])}
+        
+        ledger_entries, receipts = [], []
+        changed_ids, updated_skus = [], []
+        for index, (line, product, stocked) in enumerate(rows):
+            if index in failed:
+                run.fail(line, product.sku, failed[index])
+                continue
+            if index not in upserted:
+                run.updated += 1
+                updated_skus.append(product.sku)
+                product_by_sku_cache.invalidate((org_id, product.sku))
+                continue
+            run.created += 1
+            changed_ids.append(str(upserted[index]))
+            if not stocked:
+                continue
+            product_id = str(upserted[index])
+            reference = f"Initial Stock - {product.sku}"
+            unit_cost = product.unit_cost or 0.0
+            value = round(product.initial_stock * unit_cost, 4)
+            ledger_entries.append({
+                "product_id": product_id,
+                "product_name": product.name,
+                "product_sku": product.sku,
+                "location_id": product.location_id,
+                "warehouse_id": product.warehouse_id,
+                "movement_type": "receipt",
+                "reference": reference,
+                "quantity_change": product.initial_stock,
+                "balance": product.initial_stock,
+                "unit_cost": unit_cost,
+                "value_change": value,
+                "organization_id": org_id,
+                "created_at": now,
+                "created_by": user_email
+            })
+            receipts.append({
+                "product_id": product_id,
+                "location_id": product.location_id,
+                "quantity": product.initial_stock,
+                "unit_cost": unit_cost,
+                "value": value,
+                "costing_method": product.costing_method,
+                "reference": reference
+            })
+        
+        if ledger_entries:
+            await self.db.stock_ledger.insert_many(ledger_entries, ordered=False)
+            await stock_rollup_service.record_opening_entries(ledger_entries)
+            await valuation_service.record_initial_stock(org_id, receipts)
+        
+        # bulk_write only reports the ids of inserted products
+        if updated_skus:
+            cursor = self.db.products.find({"organization_id": org_id, "sku": {"$in": updated_skus}}, {"_id": 1})
+            changed_ids += [str(p["_id"]) async for p in cursor]
+        await change_log_service.record(org_id, [(SyncKind.PRODUCT, product_id) for product_id in changed_ids])
+
+product_import_service = ProductImportService()
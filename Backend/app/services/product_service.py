@@ -1,10 +1,85 @@
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
 from fastapi import HTTPException, status
 from bson import ObjectId
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
 from app.core.database import get_database
-from app.models.product import ProductCreate, ProductUpdate, ProductResponse
+from app.core.slow_queries import instrument_service
+from app.core.cache import TTLCache
+from app.core.single_flight import single_flight
+from app.core.config import settings
+from app.core.search import search_fields, query_tokens, rank_stages
+from app.core.fields import fields_projection, sparse_row
+from app.models.product import (
+    ProductCreate,
+    ProductUpdate,
+    ProductResponse,
+    ProductScan,
+    ProductCategory,
+    ProductBatchGet,
+    ProductBatchGetResult,
+    ProductBatchUpdate,
+    ProductBatchUpdateResult,
+    ProductBatchItemError
+)
+from app.models.location_stock import LocationStock
+from app.models.sync import SyncKind
+from app.services.dashboard_service import dashboard_service
+from app.services.stock_rollup_service import stock_rollup_service
+from app.services.valuation_service import valuation_service
+from app.services.autocomplete_service import autocomplete_service
+from app.services.collection_version_service import collection_version_service
+from app.services.change_log_service import change_log_service, balance_id
 
+def stock_flags(current_stock: int, reorder_level: int) -> dict:
+    """Low-stock fields stored next to current_stock and reorder_level"""
+    return {"stock_gap": current_stock - reorder_level, "is_low_stock": current_stock <= reorder_level}
+
+# Recomputes the low-stock fields inside an update pipeline, after current_stock or reorder_level changed
+STOCK_FLAGS_STAGE = {"$set": {
+    "stock_gap": {"$subtract": ["$current_stock", {"$ifNull": ["$reorder_level", 0]}]},
+    "is_low_stock": {"$lte": ["$current_stock", {"$ifNull": ["$reorder_level", 0]}]}
+}}
+
+def stock_change_update(change: int) -> list:
+    """Update pipeline adding change to current_stock, keeping the low-stock fields in step"""
+    return [
+        {"$set": {"current_stock": {"$add": [{"$ifNull": ["$current_stock", 0]}, change]}, "updated_at": datetime.utcnow()}},
+        STOCK_FLAGS_STAGE
+    ]
+
+def _product_update(update_data: dict):
+    """Update document for the given field values"""
+    if "reorder_level" not in update_data:
+        return {"$set": update_data}
+    # Pipeline update so the low-stock fields are recomputed atomically; $literal keeps
+    # values such as "$name" from being read as field paths
+    return [{"$set": {k: {"$literal": v} for k, v in update_data.items()}}, STOCK_FLAGS_STAGE]
+
+# Scanner lookups: (org_id, sku) -> product fields that do not change with stock
+product_by_sku_cache = TTLCache("product_by_sku", settings.PRODUCT_SKU_CACHE_TTL_SECONDS)
+# (org_id, location_id) -> location name; locations cannot be renamed through the API
+location_name_cache = TTLCache("location_names", 600, max_entries=50_000)
+SCAN_PROJECTION = {"name": 1, "sku": 1, "category": 1, "unit_of_measure": 1, "reorder_level": 1}
+# org_id -> category facet counts; invalidated by every product and stock write of this worker
+product_categories_cache = TTLCache("product_categories", settings.PRODUCT_CATEGORIES_CACHE_TTL_SECONDS)
+
+# ?fields= support: response fields not stored under their own name, and fields derived per document
+PRODUCT_FIELD_SOURCES = {"id": ("_id",), "is_low_stock": ("current_stock", "reorder_level")}
+PRODUCT_COMPUTED_FIELDS = {
+    "id": lambda p: str(p["_id"]),
+    "current_stock": lambda p: p.get("current_stock", 0),
+    "reorder_level": lambda p: p.get("reorder_level", 10),
+    "costing_method": lambda p: p.get("costing_method", "average"),
+    "stock_value": lambda p: round(p.get("stock_value", 0.0), 4),
+    "is_low_stock": lambda p: p.get("current_stock", 0) <= p.get("reorder_level", 0),
+}
+
+def _list_projection(fields: Optional[List[str]]) -> dict:
+    return fields_projection(fields, PRODUCT_FIELD_SOURCES) if fields else {"search_tokens": 0}
+
+@instrument_service
 class ProductService:
     @property
     def db(self):
@@ -24,16 +99,26 @@ class ProductService:
         """Create a new product"""
         org_id = await self._get_user_org_id(user_email)
         
-        # Check if SKU already exists within organization
-        existing_product = await self.db.products.find_one({
-            "sku": product_data.sku,
-            "organization_id": org_id
-        })
-        if existing_product:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Product with this SKU already exists in your organization"
+        # Validate the location before anything is written, so a bad one leaves no product behind
+        if product_data.location_id:
+            if not ObjectId.is_valid(product_data.location_id):
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid location_id"
+                )
+            
+            location = await self.db.locations.find_one(
+                {"_id": ObjectId(product_data.location_id), "organization_id": org_id},
+                {"_id": 1}
             )
+            
+            if not location:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Location not found in your organization"
+                )
+        if product_data.initial_stock and product_data.initial_stock > 0 and product_data.location_id:
+            await valuation_service.ensure_not_revaluing(org_id)
         
         product_dict = {
             "name": product_data.name,
@@ -41,36 +126,36 @@ class ProductService:
             "category": product_data.category,
             "unit_of_measure": product_data.unit_of_measure,
             "description": product_data.description,
+            **search_fields(product_data.name, product_data.sku),
             "current_stock": product_data.initial_stock or 0,
             "reorder_level": product_data.reorder_level,
+            **stock_flags(product_data.initial_stock or 0, product_data.reorder_level),
+            "costing_method": product_data.costing_method,
+            "stock_value": 0.0,
+            "last_unit_cost": product_data.unit_cost,
             "organization_id": org_id,
             "created_at": datetime.utcnow(),
             "updated_at": datetime.utcnow(),
             "created_by": user_email
         }
         
-        result = await self.db.products.insert_one(product_dict)
+        try:
+            result = await self.db.products.insert_one(product_dict)
+        except DuplicateKeyError:
+            # SKUs are unique per organization (unique index)
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Product with this SKU already exists in your organization"
+            )
         product_dict["_id"] = result.inserted_id
         
         # Create initial stock ledger entry if initial_stock > 0 and location is provided
         if product_data.initial_stock and product_data.initial_stock > 0 and product_data.location_id:
-            # Validate location and warehouse
-            if not ObjectId.is_valid(product_data.location_id):
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Invalid location_id"
-                )
-            
-            location = await self.db.locations.find_one({
-                "_id": ObjectId(product_data.location_id),
-                "organization_id": org_id
-            })
-            
-            if not location:
-                raise HTTPException(
-                    status_code=status.HTTP_400_BAD_REQUEST,
-                    detail="Location not found in your organization"
-                )
+            value = await valuation_service.receive(
+                org_id, product_dict, product_data.location_id, product_data.initial_stock,
+                product_data.unit_cost, f"Initial Stock - {product_data.sku}"
+            )
+            product_dict["stock_value"] = value
             
             # Create stock ledger entry for initial stock
             ledger_entry = {
@@ -81,13 +166,22 @@ class ProductService:
                 "reference": f"Initial Stock - {product_data.sku}",
                 "quantity_change": product_data.initial_stock,
                 "balance": product_data.initial_stock,
+                "unit_cost": round(value / product_data.initial_stock, 4),
+                "value_change": value,
                 "organization_id": org_id,
                 "created_at": datetime.utcnow(),
                 "created_by": user_email
             }
             
             await self.db.stock_ledger.insert_one(ledger_entry)
+            await stock_rollup_service.record_ledger_entry(ledger_entry)
         
+        # The initial stock's value was already counted by the valuation service
+        await dashboard_service.record_product_change(org_id, None, {**product_dict, "stock_value": 0.0})
+        autocomplete_service.record_product_change(org_id, None, product_dict)
+        product_categories_cache.invalidate(org_id)
+        await collection_version_service.bump(org_id, "products")
+        await change_log_service.record(org_id, [(SyncKind.PRODUCT, str(product_dict["_id"]))])
         return self._to_response(product_dict)
     
     async def get_product_by_id(self, product_id: str, user_email: str) -> Optional[ProductResponse]:
@@ -105,18 +199,107 @@ class ProductService:
         
         return self._to_response(product)
     
-    async def get_all_products(self, user_email: str, skip: int = 0, limit: int = 100, category: Optional[str] = None) -> List[ProductResponse]:
-        """Get all products within user's organization"""
+    async def get_products_by_ids(self, org_id: str, product_ids: List[str]) -> List[ProductResponse]:
+        """Products with the given ids (within the organization); unknown ids are skipped"""
+        ids = [ObjectId(product_id) for product_id in product_ids if ObjectId.is_valid(product_id)]
+        cursor = self.db.products.find({"_id": {"$in": ids}, "organization_id": org_id}, {"search_tokens": 0})
+        return [self._to_response(p) async for p in cursor]
+    
+    async def get_product_by_sku(self, sku: str, org_id: str) -> Optional[ProductScan]:
+        """Resolve a scanned SKU to its product and per-location balances"""
+        key = (org_id, sku)
+        product = product_by_sku_cache.get(key)
+        if product is None:
+            product = await self.db.products.find_one({"organization_id": org_id, "sku": sku}, SCAN_PROJECTION)
+            if product is None:
+                return None
+            product_by_sku_cache.set(key, product)
+        
+        # Balances are maintained per (product, location) by the valuation service
+        balances = await self.db.stock_values.find(
+            {"organization_id": org_id, "product_id": str(product["_id"]), "quantity": {"$ne": 0}},
+            {"location_id": 1, "quantity": 1}
+        ).to_list(length=None)
+        names = await self._location_names(org_id, [b["location_id"] for b in balances])
+        locations = [
+            LocationStock(location_id=b["location_id"], location_name=names[b["location_id"]], quantity=b["quantity"])
+            for b in balances if b["location_id"] in names
+        ]
+        
+        return ProductScan(
+            id=str(product["_id"]),
+            name=product["name"],
+            sku=product["sku"],
+            category=product["category"],
+            unit_of_measure=product["unit_of_measure"],
+            reorder_level=product.get("reorder_level", 10),
+            total_stock=sum(location.quantity for location in locations),
+            locations=locations
+        )
+    
+    async def _location_names(self, org_id: str, location_ids: List[str]) -> dict:
+        """Names of the given locations, fetching the uncached ones in one query"""
+        names = {}
+        missing = []
+        for location_id in location_ids:
+            name = location_name_cache.get((org_id, location_id))
+            if name is None:
+                missing.append(location_id)
+            else:
+                names[location_id] = name
+        valid = [ObjectId(location_id) for location_id in missing if ObjectId.is_valid(location_id)]
+        if valid:
+            async for location in self.db.locations.find({"_id": {"$in": valid}, "organization_id": org_id}, {"name": 1}):
+                names[str(location["_id"])] = location["name"]
+                location_name_cache.set((org_id, str(location["_id"])), location["name"])
+        return names
+    
+    async def get_categories(self, org_id: str) -> List[ProductCategory]:
+        """Categories with product and low-stock counts, from one grouped aggregation"""
+        categories = product_categories_cache.get(org_id)
+        if categories is None:
+            categories = await single_flight.do("product_categories", org_id, lambda: self._load_categories(org_id))
+        return categories
+    
+    async def _load_categories(self, org_id: str) -> List[ProductCategory]:
+        # A write invalidating the cache while this aggregation runs may not be in its result
+        generation = product_categories_cache.generation(org_id)
+        pipeline = [
+            {"$match": {"organization_id": org_id}},
+            {"$group": {
+                "_id": "$category",
+                "product_count": {"$sum": 1},
+                "low_stock_count": {"$sum": {"$cond": ["$is_low_stock", 1, 0]}}
+            }},
+            {"$sort": {"_id": 1}}
+        ]
+        rows = await self.db.products.aggregate(pipeline).to_list(length=None)
+        categories = [
+            ProductCategory(category=row["_id"], product_count=row["product_count"], low_stock_count=row["low_stock_count"])
+            for row in rows if row["_id"] is not None
+        ]
+        product_categories_cache.set(org_id, categories, generation=generation)
+        return categories
+    
+    async def get_all_products(
+        self,
+        user_email: str,
+        skip: int = 0,
+        limit: int = 100,
+        category: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Union[ProductResponse, dict]]:
+        """Get all products within user's organization (only `fields` of each, if given)"""
         org_id = await self._get_user_org_id(user_email)
         
         query = {"organization_id": org_id}
         if category:
             query["category"] = category
         
-        cursor = self.db.products.find(query).skip(skip).limit(limit).sort("name", 1)
+        cursor = self.db.products.find(query, _list_projection(fields)).skip(skip).limit(limit).sort("name", 1)
         products = await cursor.to_list(length=limit)
         
-        return [self._to_response(p) for p in products]
+        return self._to_responses(products, fields)
     
     async def update_product(self, product_id: str, product_data: ProductUpdate, user_email: str) -> Optional[ProductResponse]:
         """Update a product (within user's organization)"""
@@ -129,51 +312,201 @@ class ProductService:
         if not update_data:
             return await self.get_product_by_id(product_id, user_email)
         
+        if "name" in update_data or "sku" in update_data:
+            current = {}
+            if "name" not in update_data or "sku" not in update_data:
+                current = await self.db.products.find_one(
+                    {"_id": ObjectId(product_id), "organization_id": org_id}, {"name": 1, "sku": 1}
+                ) or {}
+            update_data.update(search_fields(
+                update_data.get("name", current.get("name")),
+                update_data.get("sku", current.get("sku"))
+            ))
+        
         update_data["updated_at"] = datetime.utcnow()
         
-        result = await self.db.products.update_one(
-            {"_id": ObjectId(product_id), "organization_id": org_id},
-            {"$set": update_data}
-        )
+        try:
+            before = await self.db.products.find_one_and_update(
+                {"_id": ObjectId(product_id), "organization_id": org_id},
+                _product_update(update_data),
+                return_document=ReturnDocument.BEFORE
+            )
+        except DuplicateKeyError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Product with this SKU already exists in your organization"
+            )
         
-        if result.matched_count == 0:
+        if before is None:
             return None
         
+        await dashboard_service.record_product_change(org_id, before, {**before, **update_data})
+        autocomplete_service.record_product_change(org_id, before, {**before, **update_data})
+        product_by_sku_cache.invalidate((org_id, before["sku"]))
+        product_categories_cache.invalidate(org_id)
+        await collection_version_service.bump(org_id, "products")
+        await change_log_service.record(org_id, [(SyncKind.PRODUCT, str(before["_id"]))])
         return await self.get_product_by_id(product_id, user_email)
     
+    async def batch_get_products(self, batch: ProductBatchGet, user_email: str) -> ProductBatchGetResult:
+        """Get many products by id and/or SKU with one query (within user's organization)"""
+        org_id = await self._get_user_org_id(user_email)
+        object_ids = [ObjectId(i) for i in batch.ids if ObjectId.is_valid(i)]
+        clauses = []
+        if object_ids:
+            clauses.append({"_id": {"$in": object_ids}})
+        if batch.skus:
+            clauses.append({"sku": {"$in": batch.skus}})
+        
+        products = []
+        if clauses:
+            cursor = self.db.products.find({"organization_id": org_id, "$or": clauses}, {"search_tokens": 0})
+            products = await cursor.to_list(length=None)
+        by_id = {str(p["_id"]): p for p in products}
+        by_sku = {p["sku"]: p for p in products}
+        
+        # Requested order: ids first, then SKUs; a product requested both ways is returned once
+        found, returned, not_found = [], set(), []
+        for key, lookup in [(i, by_id) for i in batch.ids] + [(sku, by_sku) for sku in batch.skus]:
+            product = lookup.get(key)
+            if product is None:
+                not_found.append(key)
+            elif product["_id"] not in returned:
+                returned.add(product["_id"])
+                found.append(self._to_response(product))
+        return ProductBatchGetResult(products=found, not_found=not_found)
+    
+    async def batch_update_products(self, batch: ProductBatchUpdate, user_email: str) -> ProductBatchUpdateResult:
+        """Apply many product updates with one bulk write (within user's organization)"""
+        org_id = await self._get_user_org_id(user_email)
+        valid_ids = [ObjectId(item.id) for item in batch.items if ObjectId.is_valid(item.id)]
+        cursor = self.db.products.find({"_id": {"$in": valid_ids}, "organization_id": org_id}, {"search_tokens": 0})
+        befores = {str(p["_id"]): p async for p in cursor}
+        
+        not_found, errors = [], []
+        items, operations = [], []
+        now = datetime.utcnow()
+        for item in batch.items:
+            before = befores.get(item.id)
+            if before is None:
+                not_found.append(item.id)
+                continue
+            update_data = {
+                k: v for k, v in item.model_dump(exclude_unset=True, exclude={"id"}).items() if v is not None
+            }
+            if not update_data:
+                continue
+            if "name" in update_data or "sku" in update_data:
+                update_data.update(search_fields(
+                    update_data.get("name", before["name"]), update_data.get("sku", before["sku"])
+                ))
+            update_data["updated_at"] = now
+            items.append((before, update_data))
+            operations.append(UpdateOne(
+                {"_id": before["_id"], "organization_id": org_id},
+                _product_update(update_data)
+            ))
+        
+        failed = {}
+        if operations:
+            try:
+                await self.db.products.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                for error in e.details.get("writeErrors", []):
+                    duplicate = error.get("code") == 11000
+                    failed[error["index"]] = (
+                        "Product with this SKU already exists in your organization" if duplicate
+                        else error.get("errmsg", "Update failed")
+                    )
+        
+        changes = []
+        for index, (before, update_data) in enumerate(items):
+            if index in failed:
+                errors.append(ProductBatchItemError(id=str(before["_id"]), error=failed[index]))
+                continue
+            after = {**before, **update_data}
+            changes.append((before, after))
+            autocomplete_service.record_product_change(org_id, before, after)
+            product_by_sku_cache.invalidate((org_id, before["sku"]))
+        await dashboard_service.record_product_changes(org_id, changes)
+        if changes:
+            product_categories_cache.invalidate(org_id)
+            await collection_version_service.bump(org_id, "products")
+            await change_log_service.record(org_id, [(SyncKind.PRODUCT, str(before["_id"])) for before, _ in changes])
+        
+        updated_ids = [before["_id"] for before, _ in changes]
+        updated = []
+        if updated_ids:
+            cursor = self.db.products.find({"_id": {"$in": updated_ids}}, {"search_tokens": 0})
+            updated = [self._to_response(p) async for p in cursor]
+        return ProductBatchUpdateResult(updated=updated, not_found=not_found, errors=errors)
+    
     async def delete_product(self, product_id: str, user_email: str) -> bool:
         """Delete a product (within user's organization)"""
         if not ObjectId.is_valid(product_id):
             return False
         
         org_id = await self._get_user_org_id(user_email)
-        result = await self.db.products.delete_one({
+        await valuation_service.ensure_not_revaluing(org_id)
+        deleted = await self.db.products.find_one_and_delete({
             "_id": ObjectId(product_id),
             "organization_id": org_id
         })
-        return result.deleted_count > 0
+        if deleted is None:
+            return False
+        
+        await dashboard_service.record_product_change(org_id, deleted, None)
+        autocomplete_service.record_product_change(org_id, deleted, None)
+        product_by_sku_cache.invalidate((org_id, deleted["sku"]))
+        product_categories_cache.invalidate(org_id)
+        await collection_version_service.bump(org_id, "products")
+        # Its valuation positions go with it (the total above already lost its stock_value);
+        # clients drop its per-location balances too
+        location_ids = await valuation_service.remove_product(org_id, product_id)
+        await change_log_service.record(
+            org_id,
+            [(SyncKind.PRODUCT, product_id)]
+            + [(SyncKind.BALANCE, balance_id(product_id, location_id)) for location_id in location_ids],
+            deleted=True
+        )
+        return True
     
-    async def get_low_stock_products(self, user_email: str) -> List[ProductResponse]:
-        """Get products with stock below reorder level (within user's organization)"""
+    async def get_low_stock_products(
+        self,
+        user_email: str,
+        skip: int = 0,
+        limit: int = 100,
+        fields: Optional[List[str]] = None
+    ) -> List[Union[ProductResponse, dict]]:
+        """Get products at or below their reorder level (within user's organization), most critical first"""
         org_id = await self._get_user_org_id(user_email)
-        cursor = self.db.products.find({
-            "organization_id": org_id,
-            "$expr": {"$lte": ["$current_stock", "$reorder_level"]}
-        })
-        products = await cursor.to_list(length=None)
-        return [self._to_response(p) for p in products]
+        # Served by the partial (organization_id, stock_gap) index over low-stock products only
+        cursor = self.db.products.find(
+            {"organization_id": org_id, "is_low_stock": True},
+            _list_projection(fields)
+        ).sort([("stock_gap", 1), ("_id", 1)]).skip(skip).limit(limit)
+        products = await cursor.to_list(length=limit)
+        return self._to_responses(products, fields)
     
-    async def search_products(self, query: str, user_email: str) -> List[ProductResponse]:
-        """Search products by name or SKU (within user's organization)"""
+    async def search_products(self, query: str, user_email: str, limit: int = 20) -> List[ProductResponse]:
+        """Search products by name or SKU (within user's organization), best matches first"""
         org_id = await self._get_user_org_id(user_email)
-        cursor = self.db.products.find({
-            "organization_id": org_id,
-            "$or": [
-                {"name": {"$regex": query, "$options": "i"}},
-                {"sku": {"$regex": query, "$options": "i"}}
-            ]
-        })
-        products = await cursor.to_list(length=50)
+        tokens = query_tokens(query)
+        if not tokens:
+            return []
+        
+        # Candidates come from the (organization_id, search_tokens) index and are verified and
+        # ranked in the pipeline, so only the best `limit` are returned whatever their number
+        pipeline = [
+            {"$match": {"organization_id": org_id, "search_tokens": {"$all": tokens}}},
+            *rank_stages(query, limit)
+        ]
+        products = await self.db.products.aggregate(pipeline).to_list(length=limit)
+        return [self._to_response(product) for product in products]
+    
+    def _to_responses(self, products: List[dict], fields: Optional[List[str]]) -> List[Union[ProductResponse, dict]]:
+        if fields:
+            return [sparse_row(p, fields, PRODUCT_COMPUTED_FIELDS) for p in products]
         return [self._to_response(p) for p in products]
     
     def _to_response(self, product: dict) -> ProductResponse:
@@ -189,6 +522,8 @@ class ProductService:
             description=product.get("description"),
             current_stock=product.get("current_stock", 0),
             reorder_level=product.get("reorder_level", 10),
+            costing_method=product.get("costing_method", "average"),
+            stock_value=round(product.get("stock_value", 0.0), 4),
             created_at=product["created_at"],
             updated_at=product["updated_at"],
             is_low_stock=is_low_stock
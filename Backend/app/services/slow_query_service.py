@@ -0,0 +1,42 @@
+from typing import List, Optional
+from datetime import datetime, timedelta
+from app.core.database import get_database
+from app.models.admin import SlowQueryShape
+
+class SlowQueryService:
+    @property
+    def db(self):
+        return get_database()
+    
+    async def get_worst_query_shapes(self, limit: int = 20, since_hours: Optional[int] = None) -> List[SlowQueryShape]:
+        """Slow query shapes ordered by total time spent"""
+        match = {}
+        if since_hours:
+            since = datetime.utcnow() - timedelta(hours=since_hours)
+            match["$or"] = [{"last_seen_at": {"$gte": since}}, {"created_at": {"$gte": since}}]
+        
+        pipeline = [
+            {"$match": match},
+            {"$sort": {"created_at": -1}},
+            {"$group": {
+                "_id": "$shape_key",
+                "collection": {"$first": "$collection"},
+                "command": {"$first": "$command"},
+                "shape": {"$first": "$shape"},
+                "service_methods": {"$addToSet": "$service_method"},
+                # One record per shape and interval; records from before the counts held one occurrence
+                "count": {"$sum": {"$ifNull": ["$count", 1]}},
+                "total_ms": {"$sum": {"$ifNull": ["$total_ms", "$duration_ms"]}},
+                "max_ms": {"$max": {"$ifNull": ["$max_ms", "$duration_ms"]}},
+                "last_seen": {"$max": {"$ifNull": ["$last_seen_at", "$created_at"]}},
+                "last_explain": {"$first": "$explain"}
+            }},
+            {"$addFields": {"avg_ms": {"$divide": ["$total_ms", "$count"]}}},
+            {"$sort": {"total_ms": -1}},
+            {"$limit": limit}
+        ]
+        
+        shapes = await self.db.slow_queries.aggregate(pipeline).to_list(length=limit)
+        return [SlowQueryShape(shape_key=s.pop("_id"), **s) for s in shapes]
+
+slow_query_service = SlowQueryService()
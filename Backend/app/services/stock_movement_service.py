@@ -1,8 +1,11 @@
-from typing import Optional, List
+from typing import Optional, List, Union
 from datetime import datetime
 from fastapi import HTTPException, status
 from bson import ObjectId
+from pymongo import ReturnDocument
 from app.core.database import get_database
+from app.core.slow_queries import instrument_service
+from app.core.fields import fields_projection, sparse_row
 from app.models.stock_movement import (
     StockMovementCreate,
     StockMovementUpdate,
@@ -12,7 +15,26 @@ from app.models.stock_movement import (
     MovementType,
     MovementStatus
 )
+from app.models.sync import SyncKind
+from app.services.dashboard_service import dashboard_service
+from app.services.stock_rollup_service import stock_rollup_service
+from app.services.valuation_service import valuation_service
+from app.services.product_service import stock_change_update, product_categories_cache
+from app.services.collection_version_service import collection_version_service
+from app.services.change_log_service import change_log_service
 
+# ?fields= support: response fields not stored under their own name
+MOVEMENT_FIELD_SOURCES = {
+    "id": ("_id",),
+    "source_location_name": ("source_location_id",),
+    "dest_location_name": ("destination_location_id",)
+}
+
+def _unit_cost(value_change: float, quantity: int) -> Optional[float]:
+    """Per-unit cost a ledger entry moved stock at"""
+    return round(abs(value_change) / abs(quantity), 4) if quantity else None
+
+@instrument_service
 class StockMovementService:
     @property
     def db(self):
@@ -51,6 +73,7 @@ class StockMovementService:
         
         result = await self.db.stock_movements.insert_one(movement_dict)
         movement_dict["_id"] = result.inserted_id
+        await dashboard_service.record_movement_change(org_id, None, movement_dict)
         
         return await self._to_response(movement_dict)
     
@@ -76,9 +99,10 @@ class StockMovementService:
         skip: int = 0,
         limit: int = 100,
         movement_type: Optional[str] = None,
-        status: Optional[str] = None
-    ) -> List[StockMovementResponse]:
-        """Get all movements with optional filtering"""
+        status: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> List[Union[StockMovementResponse, dict]]:
+        """Get all movements with optional filtering (only `fields` of each, if given)"""
         org_id = await self._get_user_org_id(user_email)
         
         query = {"organization_id": org_id}
@@ -87,15 +111,23 @@ class StockMovementService:
         if status:
             query["status"] = status
         
-        cursor = self.db.stock_movements.find(query).skip(skip).limit(limit).sort("created_at", -1)
+        projection = fields_projection(fields, MOVEMENT_FIELD_SOURCES) if fields else None
+        cursor = self.db.stock_movements.find(query, projection).skip(skip).limit(limit).sort("created_at", -1)
         movements = await cursor.to_list(length=limit)
         
-        # Use async comprehension to handle location lookups
-        results = []
-        for m in movements:
-            result = await self._to_response(m)
-            results.append(result)
-        return results
+        location_names = {}
+        if not fields or {"source_location_name", "dest_location_name"} & set(fields):
+            location_names = await self._location_names(
+                id_ for m in movements for id_ in (m.get("source_location_id"), m.get("destination_location_id"))
+            )
+        if fields:
+            computed = {
+                "id": lambda m: str(m["_id"]),
+                "source_location_name": lambda m: location_names.get(m.get("source_location_id")),
+                "dest_location_name": lambda m: location_names.get(m.get("destination_location_id"))
+            }
+            return [sparse_row(m, fields, computed) for m in movements]
+        return [self._build_response(m, location_names) for m in movements]
     
     async def update_movement(self, movement_id: str, movement_data: StockMovementUpdate, user_email: str) -> Optional[StockMovementResponse]:
         """Update a movement"""
@@ -111,14 +143,16 @@ class StockMovementService:
         
         update_data["updated_at"] = datetime.utcnow()
         
-        result = await self.db.stock_movements.update_one(
+        before = await self.db.stock_movements.find_one_and_update(
             {"_id": ObjectId(movement_id), "organization_id": org_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
         )
         
-        if result.matched_count == 0:
+        if before is None:
             return None
         
+        await dashboard_service.record_movement_change(org_id, before, {**before, **update_data})
         return await self.get_movement_by_id(movement_id, user_email)
     
     async def execute_movement(self, movement_id: str, user_email: str) -> StockMovementResponse:
@@ -137,31 +171,50 @@ class StockMovementService:
         
         if movement["status"] == "done":
             raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="Movement already executed")
+        await valuation_service.ensure_not_revaluing(org_id)
         
         # Update product stock levels based on movement type
         for line in movement["lines"]:
             product_id = line["product_id"]
             quantity = line["quantity"]
             
-            if movement["type"] == "receipt":
-                # Increase stock for receipts
-                await self.db.products.update_one(
-                    {"_id": ObjectId(product_id)},
-                    {"$inc": {"current_stock": quantity}}
-                )
-            elif movement["type"] == "delivery":
-                # Decrease stock for deliveries
-                await self.db.products.update_one(
-                    {"_id": ObjectId(product_id)},
-                    {"$inc": {"current_stock": -quantity}}
+            if movement["type"] in ("receipt", "delivery"):
+                # Increase stock for receipts, decrease for deliveries
+                stock_change = quantity if movement["type"] == "receipt" else -quantity
+                product = await self.db.products.find_one_and_update(
+                    {"_id": ObjectId(product_id), "organization_id": org_id},
+                    stock_change_update(stock_change),
+                    return_document=ReturnDocument.AFTER
                 )
-            # Internal transfers don't change total stock
-            
-            # Create ledger entry with location tracking
-            product = await self.db.products.find_one({
-                "_id": ObjectId(product_id),
-                "organization_id": org_id
-            })
+                value_change = 0.0
+                if product:
+                    before = {**product, "current_stock": product["current_stock"] - stock_change}
+                    await dashboard_service.record_product_change(org_id, before, product)
+                    product_categories_cache.invalidate(org_id)
+                    if movement["type"] == "receipt":
+                        value_change = await valuation_service.receive(
+                            org_id, product, movement.get("destination_location_id"), quantity,
+                            line.get("unit_cost"), movement["reference"]
+                        )
+                    else:
+                        value_change = -await valuation_service.issue(
+                            org_id, product, movement.get("source_location_id"), quantity
+                        )
+            else:
+                # Internal transfers don't change total stock; the value moves at its issued cost
+                product = await self.db.products.find_one({
+                    "_id": ObjectId(product_id),
+                    "organization_id": org_id
+                })
+                transfer_value = 0.0
+                if product and movement.get("source_location_id") and movement.get("destination_location_id"):
+                    transfer_value = await valuation_service.issue(
+                        org_id, product, movement["source_location_id"], quantity
+                    )
+                    await valuation_service.receive(
+                        org_id, product, movement["destination_location_id"], quantity,
+                        transfer_value / quantity if quantity else 0.0, movement["reference"], transfer=True
+                    )
             
             # Determine quantity change and location_id for ledger
             quantity_change = 0
@@ -189,12 +242,15 @@ class StockMovementService:
                         "location_to": movement.get("destination_location_id"),
                         "quantity": quantity,
                         "quantity_change": -quantity,
+                        "unit_cost": _unit_cost(transfer_value, quantity),
+                        "value_change": -transfer_value,
                         "balance_after": product["current_stock"] if product else 0,
                         "organization_id": org_id,
                         "timestamp": datetime.utcnow(),
                         "created_by": movement["created_by"]
                     }
                     await self.db.stock_ledger.insert_one(ledger_entry_out)
+                    await stock_rollup_service.record_ledger_entry(ledger_entry_out)
                 
                 # 2. Increase in destination
                 dest_location_id = movement.get("destination_location_id")
@@ -210,12 +266,15 @@ class StockMovementService:
                         "location_to": dest_location_id,
                         "quantity": quantity,
                         "quantity_change": quantity,
+                        "unit_cost": _unit_cost(transfer_value, quantity),
+                        "value_change": transfer_value,
                         "balance_after": product["current_stock"] if product else 0,
                         "organization_id": org_id,
                         "timestamp": datetime.utcnow(),
                         "created_by": movement["created_by"]
                     }
                     await self.db.stock_ledger.insert_one(ledger_entry_in)
+                    await stock_rollup_service.record_ledger_entry(ledger_entry_in)
                 continue  # Skip the regular ledger entry below
             
             # Regular ledger entry for receipt/delivery
@@ -230,15 +289,18 @@ class StockMovementService:
                 "location_to": movement.get("destination_location_id"),
                 "quantity": quantity,
                 "quantity_change": quantity_change,
+                "unit_cost": _unit_cost(value_change, quantity),
+                "value_change": value_change,
                 "balance_after": product["current_stock"] if product else 0,
                 "organization_id": org_id,
                 "timestamp": datetime.utcnow(),
                 "created_by": movement["created_by"]
             }
             await self.db.stock_ledger.insert_one(ledger_entry)
+            await stock_rollup_service.record_ledger_entry(ledger_entry)
         
         # Mark movement as done
-        await self.db.stock_movements.update_one(
+        before = await self.db.stock_movements.find_one_and_update(
             {"_id": ObjectId(movement_id), "organization_id": org_id},
             {
                 "$set": {
@@ -246,8 +308,13 @@ class StockMovementService:
                     "executed_at": datetime.utcnow(),
                     "updated_at": datetime.utcnow()
                 }
-            }
+            },
+            return_document=ReturnDocument.BEFORE
         )
+        await dashboard_service.record_movement_change(org_id, before, {**before, "status": "done"})
+        # Stock levels and values of the moved products changed
+        await collection_version_service.bump(org_id, "products")
+        await change_log_service.record(org_id, [(SyncKind.PRODUCT, line["product_id"]) for line in movement["lines"]])
         
         return await self.get_movement_by_id(movement_id, user_email)
     
@@ -264,6 +331,7 @@ class StockMovementService:
         })
         if not product:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Product not found")
+        await valuation_service.ensure_not_revaluing(org_id)
         
         # Get current stock at the specific location from ledger
         pipeline = [
@@ -285,14 +353,20 @@ class StockMovementService:
         difference = adjustment.counted_quantity - current_location_stock
         
         # Update product total stock by the difference
-        await self.db.products.update_one(
+        updated_product = await self.db.products.find_one_and_update(
             {"_id": ObjectId(adjustment.product_id)},
-            {"$inc": {"current_stock": difference}}
+            stock_change_update(difference),
+            return_document=ReturnDocument.AFTER
         )
-        
-        # Get new total stock
-        updated_product = await self.db.products.find_one({"_id": ObjectId(adjustment.product_id)})
         new_total_stock = updated_product.get("current_stock", 0)
+        await dashboard_service.record_product_change(
+            org_id, {**updated_product, "current_stock": new_total_stock - difference}, updated_product
+        )
+        product_categories_cache.invalidate(org_id)
+        if difference > 0:
+            value_change = await valuation_service.receive(org_id, updated_product, adjustment.location_id, difference)
+        else:
+            value_change = -await valuation_service.issue(org_id, updated_product, adjustment.location_id, -difference)
         
         # Create adjustment movement record
         movement_dict = {
@@ -330,12 +404,17 @@ class StockMovementService:
             "location_to": adjustment.location_id,
             "quantity": abs(difference),
             "quantity_change": difference,
+            "unit_cost": _unit_cost(value_change, difference),
+            "value_change": value_change,
             "balance_after": new_total_stock,
             "organization_id": org_id,
             "timestamp": datetime.utcnow(),
             "created_by": user_email
         }
         await self.db.stock_ledger.insert_one(ledger_entry)
+        await stock_rollup_service.record_ledger_entry(ledger_entry)
+        await collection_version_service.bump(org_id, "products")
+        await change_log_service.record(org_id, [(SyncKind.PRODUCT, adjustment.product_id)])
         
         return {
             "message": "Inventory adjusted successfully",
@@ -365,31 +444,43 @@ class StockMovementService:
         cursor = self.db.stock_ledger.find(query).skip(skip).limit(limit).sort("timestamp", -1)
         entries = await cursor.to_list(length=limit)
         
-        # Use async comprehension to handle product lookups
-        results = []
-        for entry in entries:
-            result = await self._ledger_to_response(entry)
-            results.append(result)
-        return results
+        # One lookup each for location names and legacy entries without product_name/sku
+        location_names = await self._location_names(
+            id_ for entry in entries for id_ in (entry.get("location_from"), entry.get("location_to"))
+        )
+        legacy_ids = {
+            entry["product_id"] for entry in entries
+            if not entry.get("product_name") or not entry.get("product_sku")
+        }
+        products = {}
+        if legacy_ids:
+            cursor = self.db.products.find(
+                {"_id": {"$in": [ObjectId(id_) for id_ in legacy_ids if ObjectId.is_valid(id_)]}},
+                {"name": 1, "sku": 1}
+            )
+            products = {str(p["_id"]): p async for p in cursor}
+        return [self._build_ledger_entry(entry, location_names, products) for entry in entries]
+    
+    async def _location_names(self, location_ids) -> dict:
+        """Map location id -> name in a single query"""
+        object_ids = {ObjectId(id_) for id_ in location_ids if id_ and ObjectId.is_valid(id_)}
+        if not object_ids:
+            return {}
+        cursor = self.db.locations.find({"_id": {"$in": list(object_ids)}}, {"name": 1})
+        return {str(location["_id"]): location.get("name") async for location in cursor}
     
     async def _to_response(self, movement: dict) -> StockMovementResponse:
         """Convert database document to response model"""
-        # Fetch location names if location IDs exist
-        source_location_name = None
-        dest_location_name = None
-        
+        location_names = await self._location_names(
+            [movement.get("source_location_id"), movement.get("destination_location_id")]
+        )
+        return self._build_response(movement, location_names)
+    
+    def _build_response(self, movement: dict, location_names: dict) -> StockMovementResponse:
         source_location_id = movement.get("source_location_id")
         destination_location_id = movement.get("destination_location_id")
-        
-        if source_location_id and ObjectId.is_valid(source_location_id):
-            source_location = await self.db.locations.find_one({"_id": ObjectId(source_location_id)})
-            if source_location:
-                source_location_name = source_location.get("name")
-        
-        if destination_location_id and ObjectId.is_valid(destination_location_id):
-            dest_location = await self.db.locations.find_one({"_id": ObjectId(destination_location_id)})
-            if dest_location:
-                dest_location_name = dest_location.get("name")
+        source_location_name = location_names.get(source_location_id)
+        dest_location_name = location_names.get(destination_location_id)
         
         return StockMovementResponse(
             id=str(movement["_id"]),
@@ -409,15 +500,14 @@ class StockMovementService:
             created_by=movement["created_by"]
         )
     
-    async def _ledger_to_response(self, entry: dict) -> StockLedgerEntry:
-        """Convert ledger entry to response"""
+    def _build_ledger_entry(self, entry: dict, location_names: dict, products: dict) -> StockLedgerEntry:
+        """Convert ledger entry to response, using prefetched location names and legacy products"""
         # Handle legacy entries without product_name/sku
         product_name = entry.get("product_name")
         product_sku = entry.get("product_sku")
         
         if not product_name or not product_sku:
-            # Fetch product details
-            product = await self.db.products.find_one({"_id": ObjectId(entry["product_id"])})
+            product = products.get(entry["product_id"])
             if product:
                 product_name = product.get("name", "Unknown")
                 product_sku = product.get("sku", "N/A")
@@ -425,23 +515,12 @@ class StockMovementService:
                 product_name = "Unknown Product"
                 product_sku = "N/A"
         
-        # Fetch location names
         location_from_id = entry.get("location_from")
         location_to_id = entry.get("location_to")
-        location_from_name = None
-        location_to_name = None
+        location_from_name = location_names.get(location_from_id)
+        location_to_name = location_names.get(location_to_id)
         display_location = None
         
-        if location_from_id and ObjectId.is_valid(location_from_id):
-            location_from_doc = await self.db.locations.find_one({"_id": ObjectId(location_from_id)})
-            if location_from_doc:
-                location_from_name = location_from_doc.get("name")
-        
-        if location_to_id and ObjectId.is_valid(location_to_id):
-            location_to_doc = await self.db.locations.find_one({"_id": ObjectId(location_to_id)})
-            if location_to_doc:
-                location_to_name = location_to_doc.get("name")
-        
         # Format display location based on movement type
         movement_type = entry["movement_type"]
         if movement_type == "internal":
@@ -481,6 +560,8 @@ class StockMovementService:
             quantity=quantity,
             quantity_change=quantity_change,
             balance_after=entry.get("balance_after", 0),
+            unit_cost=entry.get("unit_cost"),
+            value_change=entry.get("value_change"),
             timestamp=entry.get("timestamp", entry.get("created_at", datetime.utcnow())),
             created_by=entry.get("created_by", "system")
         )
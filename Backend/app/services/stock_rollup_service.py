@@ -0,0 +1,256 @@
+import asyncio
+from typing import List, Optional
+from datetime import date, datetime, time, timedelta
+from fastapi import HTTPException, status
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.core.database import get_database
+from app.core.slow_queries import instrument_service
+from app.models.stock_trend import StockTrendPoint, StockTrends
+
+MAX_TREND_DAYS = 366
+
+def _day(value: datetime) -> datetime:
+    """Midnight (UTC) of the bucket a ledger timestamp belongs to"""
+    return datetime.combine(value.date(), time.min)
+
+@instrument_service
+class StockRollupService:
+    """Daily stock buckets per (organization, product, location) in `stock_daily`.
+    
+    A bucket holds the opening quantity of the day and the day's inflow, outflow and net change;
+    closing = opening + net. Buckets exist only for days with ledger activity. `stock_series` keeps
+    each series' running closing, so the stock at the start of a range is that closing minus the
+    net change since, without reading the buckets before the range.
+    """
+    
+    @property
+    def db(self):
+        return get_database()
+    
+    async def _get_user_org_id(self, user_email: str) -> str:
+        """Get organization_id for a user"""
+        user = await self.db.users.find_one({"email": user_email})
+        if not user or "organization_id" not in user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User organization not found"
+            )
+        return user["organization_id"]
+    
+    async def record_ledger_entry(self, entry: dict):
+        """Add a just-written stock_ledger entry to its daily bucket"""
+        change = entry.get("quantity_change", 0)
+        if not change:
+            return
+        key = {
+            "organization_id": entry["organization_id"],
+            "product_id": entry["product_id"],
+            "location_id": entry.get("location_id"),
+            "date": _day(entry.get("timestamp") or entry.get("created_at") or datetime.utcnow())
+        }
+        update = {
+            "$inc": {"inflow": max(change, 0), "outflow": max(-change, 0), "net": change},
+            "$set": {"updated_at": datetime.utcnow()}
+        }
+        await self.db.stock_series.update_one(
+            {"organization_id": key["organization_id"], "product_id": key["product_id"], "location_id": key["location_id"]},
+            {"$inc": {"closing": change}, "$set": {"updated_at": datetime.utcnow()}},
+            upsert=True
+        )
+        result = await self.db.stock_daily.update_one(key, update)
+        if result.matched_count:
+            return
+        
+        # First entry of the day: the bucket opens at the previous bucket's closing.
+        # Ledger entries are written with the current time, so there are no later buckets to shift.
+        previous = await self.db.stock_daily.find_one(
+            {**key, "date": {"$lt": key["date"]}},
+            sort=[("date", -1)]
+        )
+        opening = previous["opening"] + previous["net"] if previous else 0
+        try:
+            await self.db.stock_daily.update_one(key, {**update, "$setOnInsert": {"opening": opening}}, upsert=True)
+        except DuplicateKeyError:
+            # A concurrent write created the bucket first
+            await self.db.stock_daily.update_one(key, update)
+    
+    async def record_opening_entries(self, entries: List[dict]):
+        """Bucket many ledger entries that each start their (product, location) series, in one bulk write.
+        
+        Only for series without earlier buckets (e.g. initial stock of newly imported products): the
+        buckets open at 0 instead of looking up a previous closing.
+        """
+        operations, series = [], []
+        for entry in entries:
+            change = entry.get("quantity_change", 0)
+            if not change:
+                continue
+            series.append(UpdateOne(
+                {"organization_id": entry["organization_id"], "product_id": entry["product_id"], "location_id": entry.get("location_id")},
+                {"$inc": {"closing": change}, "$set": {"updated_at": datetime.utcnow()}},
+                upsert=True
+            ))
+            operations.append(UpdateOne(
+                {
+                    "organization_id": entry["organization_id"],
+                    "product_id": entry["product_id"],
+                    "location_id": entry.get("location_id"),
+                    "date": _day(entry.get("timestamp") or entry.get("created_at") or datetime.utcnow())
+                },
+                {
+                    "$inc": {"inflow": max(change, 0), "outflow": max(-change, 0), "net": change},
+                    "$set": {"updated_at": datetime.utcnow()},
+                    "$setOnInsert": {"opening": 0}
+                },
+                upsert=True
+            ))
+        if operations:
+            await self.db.stock_series.bulk_write(series, ordered=False)
+            await self.db.stock_daily.bulk_write(operations, ordered=False)
+    
+    async def get_trends(
+        self,
+        user_email: str,
+        start: date,
+        end: date,
+        product_id: Optional[str] = None,
+        location_id: Optional[str] = None,
+        warehouse_id: Optional[str] = None
+    ) -> StockTrends:
+        """Daily opening/inflow/outflow/closing between start and end (inclusive), summed over the matching buckets"""
+        if end < start:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="end must not be before start")
+        if (end - start).days + 1 > MAX_TREND_DAYS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Date range cannot exceed {MAX_TREND_DAYS} days"
+            )
+        
+        org_id = await self._get_user_org_id(user_email)
+        
+        match = {"organization_id": org_id}
+        if product_id:
+            match["product_id"] = product_id
+        if location_id:
+            match["location_id"] = location_id
+        elif warehouse_id:
+            locations = await self.db.locations.find(
+                {"organization_id": org_id, "warehouse_id": warehouse_id}, {"_id": 1}
+            ).to_list(length=None)
+            match["location_id"] = {"$in": [str(l["_id"]) for l in locations]}
+        
+        range_start = datetime.combine(start, time.min)
+        current, days = await asyncio.gather(
+            self._current_quantity(match),
+            self._daily_totals(match, range_start)
+        )
+        # Stock at the start of the range: today's closing minus everything that changed since
+        opening = current - sum(totals["net"] for totals in days.values())
+        
+        points = []
+        for offset in range((end - start).days + 1):
+            day = start + timedelta(days=offset)
+            totals = days.get(datetime.combine(day, time.min), {"inflow": 0, "outflow": 0, "net": 0})
+            closing = opening + totals["net"]
+            points.append(StockTrendPoint(
+                date=day,
+                opening=opening,
+                inflow=totals["inflow"],
+                outflow=totals["outflow"],
+                closing=closing
+            ))
+            opening = closing
+        
+        return StockTrends(
+            product_id=product_id,
+            location_id=location_id,
+            warehouse_id=warehouse_id,
+            start=start,
+            end=end,
+            points=points
+        )
+    
+    async def _current_quantity(self, match: dict) -> int:
+        """Running closing of every matching series, summed (one document per series)"""
+        pipeline = [
+            {"$match": match},
+            {"$group": {"_id": None, "total": {"$sum": "$closing"}}}
+        ]
+        result = await self.db.stock_series.aggregate(pipeline).to_list(1)
+        return result[0]["total"] if result else 0
+    
+    async def _daily_totals(self, match: dict, start: datetime) -> dict:
+        """Totals per day from `start` on, including days after the range (they set its opening)"""
+        pipeline = [
+            {"$match": {**match, "date": {"$gte": start}}},
+            {"$group": {
+                "_id": "$date",
+                "inflow": {"$sum": "$inflow"},
+                "outflow": {"$sum": "$outflow"},
+                "net": {"$sum": "$net"}
+            }}
+        ]
+        return {row["_id"]: row async for row in self.db.stock_daily.aggregate(pipeline)}
+    
+    async def backfill(self, org_id: Optional[str] = None):
+        """Rebuild the buckets of one organization (or all) from stock_ledger.
+        
+        Runs entirely in MongoDB ($setWindowFields, 5.0+) and replaces existing buckets and series
+        closings, so it is safe to re-run. Writes that land while it runs may be counted twice; run it
+        when stock is quiet.
+        """
+        match = {"quantity_change": {"$nin": [0, None]}}
+        if org_id:
+            match["organization_id"] = org_id
+        pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "organization_id": "$organization_id",
+                    "product_id": "$product_id",
+                    "location_id": {"$ifNull": ["$location_id", None]},
+                    "date": {"$dateTrunc": {"date": {"$ifNull": ["$timestamp", "$created_at"]}, "unit": "day"}}
+                },
+                "inflow": {"$sum": {"$max": ["$quantity_change", 0]}},
+                "outflow": {"$sum": {"$max": [{"$multiply": ["$quantity_change", -1]}, 0]}},
+                "net": {"$sum": "$quantity_change"}
+            }},
+            {"$replaceWith": {"$mergeObjects": ["$_id", {"inflow": "$inflow", "outflow": "$outflow", "net": "$net"}]}},
+            {"$setWindowFields": {
+                "partitionBy": {"organization_id": "$organization_id", "product_id": "$product_id", "location_id": "$location_id"},
+                "sortBy": {"date": 1},
+                "output": {"closing": {"$sum": "$net", "window": {"documents": ["unbounded", "current"]}}}
+            }},
+            {"$set": {"opening": {"$subtract": ["$closing", "$net"]}, "updated_at": "$$NOW"}},
+            {"$unset": "closing"},
+            {"$merge": {
+                "into": "stock_daily",
+                "on": ["organization_id", "product_id", "location_id", "date"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+        ]
+        await self.db.stock_ledger.aggregate(pipeline, allowDiskUse=True).to_list(length=None)
+        
+        series_pipeline = [
+            {"$match": match},
+            {"$group": {
+                "_id": {
+                    "organization_id": "$organization_id",
+                    "product_id": "$product_id",
+                    "location_id": {"$ifNull": ["$location_id", None]}
+                },
+                "closing": {"$sum": "$quantity_change"}
+            }},
+            {"$replaceWith": {"$mergeObjects": ["$_id", {"closing": "$closing", "updated_at": "$$NOW"}]}},
+            {"$merge": {
+                "into": "stock_series",
+                "on": ["organization_id", "product_id", "location_id"],
+                "whenMatched": "replace",
+                "whenNotMatched": "insert"
+            }}
+        ]
+        await self.db.stock_ledger.aggregate(series_pipeline, allowDiskUse=True).to_list(length=None)
+
+stock_rollup_service = StockRollupService()
@@ -0,0 +1,487 @@
+import asyncio
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Optional, List
+from datetime import datetime, timedelta
+from fastapi import HTTPException, status
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from app.core.config import settings
+from app.core.database import get_database
+from app.core.slow_queries import instrument_service
+from app.models.valuation import (
+    CostingMethod,
+    LocationValuation,
+    ProductValuation,
+    LocationValue,
+    OrganizationValuation,
+    RevaluationResult
+)
+from app.models.sync import SyncKind
+from app.services.dashboard_service import dashboard_service
+from app.services.collection_version_service import collection_version_service
+from app.services.change_log_service import change_log_service, balance_id
+
+REVALUE_BATCH_SIZE = 1000
+
+def _money(value: float) -> float:
+    return round(value, 4)
+
+def _fallback_cost(product: dict) -> float:
+    """Cost for stock that arrives without one (adjustments, receipts without unit_cost)"""
+    return product.get("last_unit_cost") or 0.0
+
+class _ReplayPosition:
+    """In-memory valuation of one product at one location, used by revaluation"""
+    
+    def __init__(self, method: str):
+        self.method = method
+        self.quantity = 0
+        self.value = 0.0
+        self.layers = deque()  # [remaining, unit_cost, received_at, reference] for FIFO
+    
+    def receive(self, quantity: int, unit_cost: float, received_at, reference):
+        self.quantity += quantity
+        self.value += quantity * unit_cost
+        if self.method == CostingMethod.FIFO:
+            self.layers.append([quantity, unit_cost, received_at, reference])
+    
+    def issue(self, quantity: int, fallback: float) -> float:
+        if self.method == CostingMethod.FIFO:
+            cost, remaining, last_cost = 0.0, quantity, fallback
+            while remaining and self.layers:
+                layer = self.layers[0]
+                take = min(remaining, layer[0])
+                cost += take * layer[1]
+                last_cost = layer[1]
+                layer[0] -= take
+                remaining -= take
+                if not layer[0]:
+                    self.layers.popleft()
+            cost += remaining * last_cost
+        else:
+            average = self.value / self.quantity if self.quantity > 0 else fallback
+            cost = quantity * average
+        self.quantity -= quantity
+        self.value -= cost
+        return cost
+
+@instrument_service
+class ValuationService:
+    """Inventory value maintained incrementally with every stock change.
+    
+    Per (product, location) a `stock_values` document holds quantity and value; FIFO products also
+    keep cost layers in `valuation_layers`. Products carry `stock_value`, `location_values` hold the
+    value per location and the organization total lives in dashboard_counters, so every level is a
+    single-document read.
+    """
+    
+    @property
+    def db(self):
+        return get_database()
+    
+    async def _get_user_org_id(self, user_email: str) -> str:
+        """Get organization_id for a user"""
+        user = await self.db.users.find_one({"email": user_email})
+        if not user or "organization_id" not in user:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="User organization not found"
+            )
+        return user["organization_id"]
+    
+    async def receive(
+        self,
+        org_id: str,
+        product: dict,
+        location_id: Optional[str],
+        quantity: int,
+        unit_cost: Optional[float] = None,
+        reference: Optional[str] = None,
+        transfer: bool = False
+    ) -> float:
+        """Stock arrived at a location. Returns the value added.
+        
+        Without unit_cost the product's last purchase cost is used. Transfers bring their issued
+        cost along and do not count as a purchase.
+        """
+        if not location_id or quantity <= 0:
+            return 0.0
+        purchase_cost = None if transfer else unit_cost
+        if unit_cost is None:
+            unit_cost = _fallback_cost(product)
+        value = _money(quantity * unit_cost)
+        
+        if product.get("costing_method", CostingMethod.AVERAGE) == CostingMethod.FIFO:
+            await self.db.valuation_layers.insert_one({
+                "organization_id": org_id,
+                "product_id": str(product["_id"]),
+                "location_id": location_id,
+                "unit_cost": unit_cost,
+                "quantity": quantity,
+                "quantity_remaining": quantity,
+                "reference": reference,
+                "received_at": datetime.utcnow()
+            })
+        await self._apply(org_id, product, location_id, quantity, value, purchase_cost)
+        return value
+    
+    async def record_initial_stock(self, org_id: str, receipts: List[dict]):
+        """Valuation positions for the initial stock of newly created products, written in bulk.
+        
+        Each receipt is {product_id, location_id, quantity, unit_cost, value, costing_method, reference}.
+        The products' stock_value and the dashboard counters are left to the caller, which wrote
+        the products itself.
+        """
+        if not receipts:
+            return
+        now = datetime.utcnow()
+        location_totals = defaultdict(float)
+        stock_values, layers = [], []
+        for receipt in receipts:
+            stock_values.append({
+                "organization_id": org_id,
+                "product_id": receipt["product_id"],
+                "location_id": receipt["location_id"],
+                "quantity": receipt["quantity"],
+                "value": receipt["value"],
+                "updated_at": now
+            })
+            if receipt["costing_method"] == CostingMethod.FIFO:
+                layers.append({
+                    "organization_id": org_id,
+                    "product_id": receipt["product_id"],
+                    "location_id": receipt["location_id"],
+                    "unit_cost": receipt["unit_cost"],
+                    "quantity": receipt["quantity"],
+                    "quantity_remaining": receipt["quantity"],
+                    "reference": receipt["reference"],
+                    "received_at": now
+                })
+            location_totals[receipt["location_id"]] += receipt["value"]
+        
+        await self.db.stock_values.insert_many(stock_values, ordered=False)
+        if layers:
+            await self.db.valuation_layers.insert_many(layers, ordered=False)
+        await self.db.location_values.bulk_write([
+            UpdateOne(
+                {"_id": location_id},
+                {"$inc": {"value": _money(value)}, "$set": {"organization_id": org_id, "updated_at": now}},
+                upsert=True
+            )
+            for location_id, value in location_totals.items()
+        ], ordered=False)
+        await change_log_service.record(
+            org_id, [(SyncKind.BALANCE, balance_id(r["product_id"], r["location_id"])) for r in receipts]
+        )
+    
+    async def issue(self, org_id: str, product: dict, location_id: Optional[str], quantity: int) -> float:
+        """Stock left a location. Returns the (positive) value removed"""
+        if not location_id or quantity <= 0:
+            return 0.0
+        product_id = str(product["_id"])
+        
+        if product.get("costing_method", CostingMethod.AVERAGE) == CostingMethod.FIFO:
+            cost = await self._consume_layers(org_id, product, location_id, quantity)
+        else:
+            position = await self.db.stock_values.find_one({
+                "organization_id": org_id,
+                "product_id": product_id,
+                "location_id": location_id
+            })
+            if position and position["quantity"] > 0:
+                average = position["value"] / position["quantity"]
+            else:
+                average = _fallback_cost(product)
+            cost = quantity * average
+        
+        cost = _money(cost)
+        await self._apply(org_id, product, location_id, -quantity, -cost)
+        return cost
+    
+    async def _consume_layers(self, org_id: str, product: dict, location_id: str, quantity: int) -> float:
+        """Take quantity from the oldest FIFO layers; shortfalls are valued at the last layer's cost"""
+        layer_filter = {
+            "organization_id": org_id,
+            "product_id": str(product["_id"]),
+            "location_id": location_id,
+            "quantity_remaining": {"$gt": 0}
+        }
+        cost, remaining, last_cost = 0.0, quantity, _fallback_cost(product)
+        while remaining > 0:
+            layer = await self.db.valuation_layers.find_one(layer_filter, sort=[("received_at", 1), ("_id", 1)])
+            if layer is None:
+                break
+            take = min(remaining, layer["quantity_remaining"])
+            # Guarded decrement: a concurrent issue may have consumed the layer in between
+            taken = await self.db.valuation_layers.find_one_and_update(
+                {"_id": layer["_id"], "quantity_remaining": {"$gte": take}},
+                {"$inc": {"quantity_remaining": -take}}
+            )
+            if taken is None:
+                continue
+            cost += take * layer["unit_cost"]
+            last_cost = layer["unit_cost"]
+            remaining -= take
+        return cost + remaining * last_cost
+    
+    async def _apply(
+        self,
+        org_id: str,
+        product: dict,
+        location_id: str,
+        quantity: int,
+        value: float,
+        purchase_cost: Optional[float] = None
+    ):
+        product_id = str(product["_id"])
+        now = datetime.utcnow()
+        product_update = {"$inc": {"stock_value": value}, "$set": {"updated_at": now}}
+        if purchase_cost is not None:
+            product_update["$set"]["last_unit_cost"] = purchase_cost
+        await asyncio.gather(
+            self.db.stock_values.update_one(
+                {"organization_id": org_id, "product_id": product_id, "location_id": location_id},
+                {"$inc": {"quantity": quantity, "value": value}, "$set": {"updated_at": now}},
+                upsert=True
+            ),
+            self.db.location_values.update_one(
+                {"_id": location_id},
+                {"$inc": {"value": value}, "$set": {"organization_id": org_id, "updated_at": now}},
+                upsert=True
+            ),
+            self.db.products.update_one({"_id": product["_id"]}, product_update),
+            dashboard_service.record_value_change(org_id, value)
+        )
+        # The product itself is recorded by the caller that changed its stock
+        await change_log_service.record(org_id, [(SyncKind.BALANCE, balance_id(product_id, location_id))])
+    
+    async def remove_product(self, org_id: str, product_id: str) -> List[str]:
+        """Drop a deleted product's positions and layers and take their value off its locations.
+        
+        The organization total follows the product's own stock_value (see delete_product).
+        Returns the locations the product was held at.
+        """
+        now = datetime.utcnow()
+        location_ids = []
+        # One position at a time, so a value is taken off its location exactly once
+        while True:
+            position = await self.db.stock_values.find_one_and_delete({"organization_id": org_id, "product_id": product_id})
+            if position is None:
+                break
+            location_ids.append(position["location_id"])
+            if position.get("value"):
+                await self.db.location_values.update_one(
+                    {"_id": position["location_id"]},
+                    {"$inc": {"value": -position["value"]}, "$set": {"updated_at": now}}
+                )
+        await self.db.valuation_layers.delete_many({"organization_id": org_id, "product_id": product_id})
+        return location_ids
+    
+    async def get_organization_valuation(self, user_email: str) -> OrganizationValuation:
+        """Total inventory value of the user's organization"""
+        org_id = await self._get_user_org_id(user_email)
+        kpis = await dashboard_service.get_organization_kpis(org_id)
+        return OrganizationValuation(total_value=kpis.total_inventory_value)
+    
+    async def get_product_valuation(self, product_id: str, user_email: str) -> Optional[ProductValuation]:
+        """Value of a product, in total and per location"""
+        if not ObjectId.is_valid(product_id):
+            return None
+        
+        org_id = await self._get_user_org_id(user_email)
+        product, positions = await asyncio.gather(
+            self.db.products.find_one({"_id": ObjectId(product_id), "organization_id": org_id}),
+            self.db.stock_values.find(
+                {"organization_id": org_id, "product_id": product_id, "quantity": {"$ne": 0}}
+            ).to_list(length=None)
+        )
+        if not product:
+            return None
+        
+        quantity = product.get("current_stock", 0)
+        value = product.get("stock_value", 0.0)
+        return ProductValuation(
+            product_id=product_id,
+            product_name=product["name"],
+            product_sku=product["sku"],
+            costing_method=product.get("costing_method", CostingMethod.AVERAGE),
+            quantity=quantity,
+            value=_money(value),
+            average_cost=_money(value / quantity) if quantity > 0 else 0.0,
+            last_unit_cost=product.get("last_unit_cost"),
+            locations=[
+                LocationValuation(
+                    location_id=p["location_id"],
+                    quantity=p["quantity"],
+                    value=_money(p["value"]),
+                    average_cost=_money(p["value"] / p["quantity"]) if p["quantity"] > 0 else 0.0
+                )
+                for p in positions
+            ]
+        )
+    
+    async def get_location_value(self, location_id: str, user_email: str) -> Optional[LocationValue]:
+        """Inventory value held at a location"""
+        org_id = await self._get_user_org_id(user_email)
+        location_value = await self.db.location_values.find_one({"_id": location_id, "organization_id": org_id})
+        if location_value is None:
+            if not ObjectId.is_valid(location_id):
+                return None
+            location = await self.db.locations.find_one({"_id": ObjectId(location_id), "organization_id": org_id})
+            return LocationValue(location_id=location_id, value=0.0) if location else None
+        return LocationValue(location_id=location_id, value=_money(location_value["value"]))
+    
+    async def ensure_not_revaluing(self, org_id: str):
+        """Reject a stock write while the organization's valuation is being rebuilt; call before writing"""
+        lock = await self.db.valuation_locks.find_one({"_id": org_id, "expires_at": {"$gt": datetime.utcnow()}}, {"_id": 1})
+        if lock:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Inventory is being revalued, try again shortly"
+            )
+    
+    @asynccontextmanager
+    async def _revaluation_lock(self, org_id: str):
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=settings.REVALUATION_LOCK_TIMEOUT_SECONDS)
+        try:
+            await self.db.valuation_locks.insert_one({"_id": org_id, "expires_at": expires_at})
+        except DuplicateKeyError:
+            # Take over the lock of a run that died
+            taken = await self.db.valuation_locks.update_one(
+                {"_id": org_id, "expires_at": {"$lte": now}}, {"$set": {"expires_at": expires_at}}
+            )
+            if not taken.matched_count:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="A revaluation of this organization is already running"
+                )
+        try:
+            yield
+        finally:
+            await self.db.valuation_locks.delete_one({"_id": org_id})
+    
+    async def revalue(self, org_id: str) -> RevaluationResult:
+        """Rebuild all valuation state of an organization by replaying its stock ledger.
+        
+        Uses each product's current costing_method, so it is also how a method change is applied
+        to existing stock. Stock writes are rejected (409) while it runs, so none lands between
+        the ledger replay and the rewrite of the valuation collections.
+        """
+        async with self._revaluation_lock(org_id):
+            # Writes that passed ensure_not_revaluing just before the lock was taken finish first
+            await asyncio.sleep(settings.REVALUATION_DRAIN_SECONDS)
+            return await self._replay(org_id)
+    
+    async def _replay(self, org_id: str) -> RevaluationResult:
+        products = {
+            str(p["_id"]): p
+            async for p in self.db.products.find(
+                {"organization_id": org_id}, {"costing_method": 1}
+            )
+        }
+        positions = {}
+        last_cost = defaultdict(float)
+        transfer_costs = {}
+        entries = 0
+        
+        cursor = self.db.stock_ledger.find(
+            {"organization_id": org_id, "quantity_change": {"$nin": [0, None]}},
+            {"product_id": 1, "location_id": 1, "quantity_change": 1, "unit_cost": 1,
+             "movement_type": 1, "reference": 1, "timestamp": 1, "created_at": 1}
+        ).sort([("timestamp", 1), ("_id", 1)])
+        async for entry in cursor:
+            product_id = entry["product_id"]
+            product = products.get(product_id)
+            location_id = entry.get("location_id")
+            if product is None or not location_id:
+                continue
+            entries += 1
+            key = (product_id, location_id)
+            if key not in positions:
+                positions[key] = _ReplayPosition(product.get("costing_method", CostingMethod.AVERAGE))
+            position = positions[key]
+            change = entry["quantity_change"]
+            transfer_key = (entry.get("reference"), product_id)
+            
+            if change > 0:
+                if entry.get("movement_type") == "internal" and transfer_key in transfer_costs:
+                    unit_cost = transfer_costs.pop(transfer_key)
+                elif entry.get("unit_cost") is not None:
+                    unit_cost = entry["unit_cost"]
+                else:
+                    unit_cost = last_cost[product_id]
+                position.receive(change, unit_cost, entry.get("timestamp") or entry.get("created_at"), entry.get("reference"))
+                last_cost[product_id] = unit_cost
+            else:
+                cost = position.issue(-change, last_cost[product_id])
+                if entry.get("movement_type") == "internal":
+                    transfer_costs[transfer_key] = cost / -change
+        
+        await asyncio.gather(
+            self.db.valuation_layers.delete_many({"organization_id": org_id}),
+            self.db.stock_values.delete_many({"organization_id": org_id}),
+            self.db.location_values.delete_many({"organization_id": org_id})
+        )
+        
+        now = datetime.utcnow()
+        layers, stock_values = [], []
+        location_totals = defaultdict(float)
+        product_totals = defaultdict(float)
+        for (product_id, location_id), position in positions.items():
+            stock_values.append({
+                "organization_id": org_id,
+                "product_id": product_id,
+                "location_id": location_id,
+                "quantity": position.quantity,
+                "value": _money(position.value),
+                "updated_at": now
+            })
+            for remaining, unit_cost, received_at, reference in position.layers:
+                layers.append({
+                    "organization_id": org_id,
+                    "product_id": product_id,
+                    "location_id": location_id,
+                    "unit_cost": unit_cost,
+                    "quantity": remaining,
+                    "quantity_remaining": remaining,
+                    "reference": reference,
+                    "received_at": received_at or now
+                })
+            location_totals[location_id] += position.value
+            product_totals[product_id] += position.value
+        
+        if stock_values:
+            await self.db.stock_values.insert_many(stock_values, ordered=False)
+        if layers:
+            await self.db.valuation_layers.insert_many(layers, ordered=False)
+        if location_totals:
+            await self.db.location_values.insert_many([
+                {"_id": location_id, "organization_id": org_id, "value": _money(value), "updated_at": now}
+                for location_id, value in location_totals.items()
+            ], ordered=False)
+        product_updates = []
+        for product_id in products:
+            update = {"stock_value": _money(product_totals.get(product_id, 0.0)), "updated_at": now}
+            if last_cost.get(product_id):
+                update["last_unit_cost"] = last_cost[product_id]
+            product_updates.append(UpdateOne({"_id": ObjectId(product_id)}, {"$set": update}))
+        for start in range(0, len(product_updates), REVALUE_BATCH_SIZE):
+            await self.db.products.bulk_write(product_updates[start:start + REVALUE_BATCH_SIZE], ordered=False)
+        
+        await dashboard_service.rebuild_counters(org_id)
+        await collection_version_service.bump(org_id, "products")
+        await change_log_service.record(
+            org_id,
+            [(SyncKind.PRODUCT, product_id) for product_id in products]
+            + [(SyncKind.BALANCE, balance_id(product_id, location_id)) for product_id, location_id in positions]
+        )
+        return RevaluationResult(
+            products=len(products),
+            ledger_entries=entries,
+            total_value=_money(sum(product_totals.values()))
+        )
+
+valuation_service = ValuationService()
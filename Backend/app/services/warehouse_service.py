@@ -3,6 +3,9 @@ from datetime import datetime
 from fastapi import HTTPException, status
 from bson import ObjectId
 from app.core.database import get_database
+from app.core.slow_queries import instrument_service
+from app.services.collection_version_service import collection_version_service
+from app.services.change_log_service import change_log_service
 from app.models.warehouse import (
     WarehouseCreate,
     WarehouseUpdate,
@@ -10,7 +13,9 @@ from app.models.warehouse import (
     LocationCreate,
     LocationResponse
 )
+from app.models.sync import SyncKind
 
+@instrument_service
 class WarehouseService:
     @property
     def db(self):
@@ -52,6 +57,8 @@ class WarehouseService:
         
         result = await self.db.warehouses.insert_one(warehouse_dict)
         warehouse_dict["_id"] = result.inserted_id
+        await collection_version_service.bump(org_id, "warehouses")
+        await change_log_service.record(org_id, [(SyncKind.WAREHOUSE, str(result.inserted_id))])
         
         return self._to_response(warehouse_dict)
     
@@ -83,6 +90,12 @@ class WarehouseService:
         
         return self._to_response(warehouse)
     
+    async def get_warehouses_by_ids(self, org_id: str, warehouse_ids: List[str]) -> List[WarehouseResponse]:
+        """Warehouses with the given ids (within the organization); unknown ids are skipped"""
+        ids = [ObjectId(warehouse_id) for warehouse_id in warehouse_ids if ObjectId.is_valid(warehouse_id)]
+        cursor = self.db.warehouses.find({"_id": {"$in": ids}, "organization_id": org_id})
+        return [self._to_response(w) async for w in cursor]
+    
     async def create_location(self, location_data: LocationCreate, user_email: str) -> LocationResponse:
         """Create a new location"""
         org_id = await self._get_user_org_id(user_email)
@@ -92,11 +105,14 @@ class WarehouseService:
             "warehouse_id": location_data.warehouse_id,
             "type": location_data.type,
             "organization_id": org_id,
-            "created_at": datetime.utcnow()
+            "created_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
         }
         
         result = await self.db.locations.insert_one(location_dict)
         location_dict["_id"] = result.inserted_id
+        await collection_version_service.bump(org_id, "locations")
+        await change_log_service.record(org_id, [(SyncKind.LOCATION, str(result.inserted_id))])
         
         return self._location_to_response(location_dict)
     
@@ -119,6 +135,12 @@ class WarehouseService:
         locations = await cursor.to_list(length=None)
         return [self._location_to_response(l) for l in locations]
     
+    async def get_locations_by_ids(self, org_id: str, location_ids: List[str]) -> List[LocationResponse]:
+        """Locations with the given ids (within the organization); unknown ids are skipped"""
+        ids = [ObjectId(location_id) for location_id in location_ids if ObjectId.is_valid(location_id)]
+        cursor = self.db.locations.find({"_id": {"$in": ids}, "organization_id": org_id})
+        return [self._location_to_response(l) async for l in cursor]
+    
     def _to_response(self, warehouse: dict) -> WarehouseResponse:
         """Convert warehouse document to response"""
         return WarehouseResponse(
@@ -127,7 +149,8 @@ class WarehouseService:
             code=warehouse["code"],
             address=warehouse.get("address"),
             is_active=warehouse["is_active"],
-            created_at=warehouse["created_at"]
+            created_at=warehouse["created_at"],
+            updated_at=warehouse.get("updated_at")
         )
     
     def _location_to_response(self, location: dict) -> LocationResponse:
@@ -0,0 +1,36 @@
+"""
+Compute the maintained low-stock fields (stock_gap, is_low_stock) for products that do not have
+them yet (created before they were introduced, or inserted outside the API).
+/products/low-stock only lists products that have them.
+
+Usage (from the Backend directory, same .env as the API; needs MongoDB 4.2+):
+    python backfill_low_stock.py                 # products without the fields
+    python backfill_low_stock.py --all           # recompute every product
+    python backfill_low_stock.py --org-id <id>
+"""
+import argparse
+import asyncio
+import time
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.product_service import STOCK_FLAGS_STAGE
+
+async def backfill(args):
+    await connect_to_mongo()
+    try:
+        started = time.perf_counter()
+        query = {} if args.all else {"is_low_stock": {"$exists": False}}
+        if args.org_id:
+            query["organization_id"] = {"$in": args.org_id}
+        result = await get_database().products.update_many(query, [STOCK_FLAGS_STAGE])
+        print(f"Updated {result.modified_count:,} products in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compute product low-stock fields")
+    parser.add_argument("--org-id", action="append", help="Organization to backfill (repeatable; default: all)")
+    parser.add_argument("--all", action="store_true", help="Recompute products that already have the fields")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(backfill(parse_args()))
@@ -0,0 +1,53 @@
+"""
+Compute the search fields (search_tokens, search_name, search_sku) of products that do not have
+them yet (created before the search index or in-database ranking, or inserted outside the API).
+/products/search only finds products that have tokens, and ranks the others on an ASCII-only
+lowercasing of their name and SKU.
+
+Usage (from the Backend directory, same .env as the API):
+    python backfill_search_tokens.py            # products without search fields
+    python backfill_search_tokens.py --all      # recompute every product (e.g. after changing app/core/search.py)
+"""
+import argparse
+import asyncio
+import time
+from pymongo import UpdateOne
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.core.search import search_fields
+
+BATCH_SIZE = 1000
+
+async def backfill(args):
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        started = time.perf_counter()
+        query = {} if args.all else {"search_name": {"$exists": False}}
+        if args.org_id:
+            query["organization_id"] = {"$in": args.org_id}
+        updated = 0
+        batch = []
+        async for product in db.products.find(query, {"name": 1, "sku": 1}):
+            batch.append(UpdateOne(
+                {"_id": product["_id"]},
+                {"$set": search_fields(product.get("name"), product.get("sku"))}
+            ))
+            if len(batch) == BATCH_SIZE:
+                await db.products.bulk_write(batch, ordered=False)
+                updated += len(batch)
+                batch = []
+        if batch:
+            await db.products.bulk_write(batch, ordered=False)
+            updated += len(batch)
+        print(f"Indexed {updated:,} products in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compute product search fields")
+    parser.add_argument("--org-id", action="append", help="Organization to backfill (repeatable; default: all)")
+    parser.add_argument("--all", action="store_true", help="Recompute products that already have tokens")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(backfill(parse_args()))
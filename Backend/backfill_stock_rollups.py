@@ -0,0 +1,35 @@
+"""
+Build the daily stock buckets (stock_daily) and per-series running closings (stock_series) behind
+/dashboard/trends from the full stock_ledger. New ledger entries keep both up to date; run this once
+after deploying (trend openings read stock_series, so existing data needs it), after bulk-loading
+data outside the API (e.g. generate_tenant_data.py), or to repair drift. Re-running is safe.
+
+Usage (from the Backend directory, same .env as the API; needs MongoDB 5.0+):
+    python backfill_stock_rollups.py
+    python backfill_stock_rollups.py --org-id <id>
+"""
+import argparse
+import asyncio
+import time
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.stock_rollup_service import stock_rollup_service
+
+async def backfill(args):
+    await connect_to_mongo()
+    try:
+        started = time.perf_counter()
+        for org_id in args.org_id or [None]:
+            await stock_rollup_service.backfill(org_id)
+            print(f"Backfilled {'organization ' + org_id if org_id else 'all organizations'}")
+        buckets = await get_database().stock_daily.estimated_document_count()
+        print(f"{buckets:,} daily buckets in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild daily stock rollups from the ledger")
+    parser.add_argument("--org-id", action="append", help="Organization to backfill (repeatable; default: all)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(backfill(parse_args()))
@@ -0,0 +1,72 @@
+"""
+Record every existing product, warehouse, location and per-location balance in the sync change log
+(entities written before /sync/changes existed, or inserted outside the API). A full sync
+(since=0) only returns entities that are in the log.
+
+Entities already in the log are recorded again under new sequence numbers, so clients pick them
+up once more on their next delta sync.
+
+Usage (from the Backend directory, same .env as the API):
+    python backfill_sync_changes.py
+    python backfill_sync_changes.py --org-id <id>
+"""
+import argparse
+import asyncio
+import time
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.models.sync import SyncKind
+from app.services.change_log_service import change_log_service, balance_id
+
+BATCH_SIZE = 10_000
+
+async def _record_all(org_id: str, kind: SyncKind, cursor, entity_id) -> int:
+    recorded = 0
+    batch = []
+    async for document in cursor:
+        batch.append((kind, entity_id(document)))
+        if len(batch) == BATCH_SIZE:
+            await change_log_service.record(org_id, batch)
+            recorded += len(batch)
+            batch = []
+    if batch:
+        await change_log_service.record(org_id, batch)
+        recorded += len(batch)
+    return recorded
+
+async def backfill(args):
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        started = time.perf_counter()
+        org_ids = args.org_id or sorted({
+            org_id
+            for collection in ("warehouses", "locations", "products")
+            for org_id in await db[collection].distinct("organization_id")
+        })
+        for org_id in org_ids:
+            query = {"organization_id": org_id}
+            counts = {
+                kind: await _record_all(org_id, kind, db[collection].find(query, {"_id": 1}), lambda d: str(d["_id"]))
+                for kind, collection in (
+                    (SyncKind.WAREHOUSE, "warehouses"),
+                    (SyncKind.LOCATION, "locations"),
+                    (SyncKind.PRODUCT, "products")
+                )
+            }
+            counts[SyncKind.BALANCE] = await _record_all(
+                org_id, SyncKind.BALANCE,
+                db.stock_values.find(query, {"product_id": 1, "location_id": 1}),
+                lambda d: balance_id(d["product_id"], d["location_id"])
+            )
+            print(f"{org_id}: " + ", ".join(f"{count:,} {kind.value}s" for kind, count in counts.items()))
+        print(f"Backfilled {len(org_ids):,} organizations in {time.perf_counter() - started:.1f}s")
+    finally:
+        await close_mongo_connection()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Record existing entities in the sync change log")
+    parser.add_argument("--org-id", action="append", help="Organization to backfill (repeatable; default: all)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(backfill(parse_args()))
@@ -0,0 +1,106 @@
+"""
+One benchmark case per service method. `setup` runs untimed before each iteration and
+returns the arguments for `run`.
+"""
+from datetime import datetime, timedelta
+from app.models.product import ProductCreate, ProductUpdate
+from app.models.stock_movement import StockMovementCreate, StockMovementLine, InventoryAdjustment
+from app.services.product_service import product_service
+from app.services.stock_movement_service import stock_movement_service
+from app.services.location_stock_service import location_stock_service
+from app.services.dashboard_service import dashboard_service
+from app.services.warehouse_service import warehouse_service
+from app.services.stock_rollup_service import stock_rollup_service
+
+class BenchmarkCase:
+    def __init__(self, name: str, run, setup=None, iterations: int = None):
+        self.name = name
+        self.run = run
+        self.setup = setup
+        self.iterations = iterations
+
+def _product(ctx):
+    return ctx["rng"].choice(ctx["product_ids"])
+
+def _location(ctx):
+    return ctx["rng"].choice(ctx["location_ids"])
+
+def _movement_payload(ctx, movement_type: str) -> StockMovementCreate:
+    index = ctx["rng"].randrange(len(ctx["product_ids"]))
+    return StockMovementCreate(
+        type=movement_type,
+        reference=f"BENCH-{datetime.utcnow().timestamp()}",
+        source_location_id=_location(ctx) if movement_type != "receipt" else None,
+        destination_location_id=_location(ctx) if movement_type != "delivery" else None,
+        lines=[StockMovementLine(
+            product_id=ctx["product_ids"][index],
+            product_name=f"Product {index}",
+            product_sku=ctx["product_skus"][index],
+            quantity=1,
+            unit_of_measure="Units"
+        )]
+    )
+
+async def _draft_movement(ctx, movement_type: str):
+    movement = await stock_movement_service.create_movement(_movement_payload(ctx, movement_type), ctx["user_email"])
+    return (movement.id, ctx["user_email"])
+
+def build_cases(ctx) -> list:
+    email = ctx["user_email"]
+    counter = {"n": 0}
+
+    def next_sku():
+        counter["n"] += 1
+        return f"BENCH-NEW-{counter['n']:06d}"
+
+    return [
+        # Products
+        BenchmarkCase("product.create_product", product_service.create_product,
+                      lambda: (ProductCreate(name="Bench product", sku=next_sku(), category="Bench", initial_stock=5,
+                                             location_id=_location(ctx)), email)),
+        BenchmarkCase("product.get_product_by_id", product_service.get_product_by_id, lambda: (_product(ctx), email)),
+        BenchmarkCase("product.get_all_products", product_service.get_all_products, lambda: (email, 0, 100)),
+        BenchmarkCase("product.update_product", product_service.update_product,
+                      lambda: (_product(ctx), ProductUpdate(reorder_level=ctx["rng"].randint(0, 50)), email)),
+        BenchmarkCase("product.get_low_stock_products", product_service.get_low_stock_products, lambda: (email,)),
+        BenchmarkCase("product.search_products", product_service.search_products,
+                      lambda: (ctx["rng"].choice(ctx["product_skus"])[-4:], email)),
+
+        # Stock movements
+        BenchmarkCase("stock_movement.create_movement", stock_movement_service.create_movement,
+                      lambda: (_movement_payload(ctx, "receipt"), email)),
+        BenchmarkCase("stock_movement.get_all_movements", stock_movement_service.get_all_movements, lambda: (email, 0, 100)),
+        BenchmarkCase("stock_movement.execute_movement.receipt", stock_movement_service.execute_movement,
+                      lambda: _draft_movement(ctx, "receipt")),
+        BenchmarkCase("stock_movement.execute_movement.internal", stock_movement_service.execute_movement,
+                      lambda: _draft_movement(ctx, "internal")),
+        BenchmarkCase("stock_movement.adjust_inventory", stock_movement_service.adjust_inventory,
+                      lambda: (InventoryAdjustment(product_id=_product(ctx), location_id=_location(ctx),
+                                                   counted_quantity=ctx["rng"].randint(0, 100)), email)),
+        BenchmarkCase("stock_movement.get_stock_ledger", stock_movement_service.get_stock_ledger, lambda: (email, 0, 100)),
+        BenchmarkCase("stock_movement.get_stock_ledger.product", stock_movement_service.get_stock_ledger,
+                      lambda: (email, 0, 100, _product(ctx))),
+
+        # Location stock
+        BenchmarkCase("location_stock.get_product_location_stock", location_stock_service.get_product_location_stock,
+                      lambda: (_product(ctx), email)),
+        BenchmarkCase("location_stock.get_location_stock_summary", location_stock_service.get_location_stock_summary,
+                      lambda: (_location(ctx), email)),
+        BenchmarkCase("location_stock.get_all_products_location_stock", location_stock_service.get_all_products_location_stock,
+                      lambda: (email,), iterations=3),
+        BenchmarkCase("location_stock.get_all_locations_stock_summary", location_stock_service.get_all_locations_stock_summary,
+                      lambda: (email,), iterations=3),
+
+        # Dashboard
+        BenchmarkCase("dashboard.get_dashboard_kpis", dashboard_service.get_dashboard_kpis, lambda: (email,)),
+        BenchmarkCase("stock_rollup.get_trends", stock_rollup_service.get_trends,
+                      lambda: (email, (ctx["now"] - timedelta(days=89)).date(), ctx["now"].date())),
+        BenchmarkCase("stock_rollup.get_trends.product", stock_rollup_service.get_trends,
+                      lambda: (email, (ctx["now"] - timedelta(days=89)).date(), ctx["now"].date(), _product(ctx))),
+
+        # Warehouses
+        BenchmarkCase("warehouse.get_all_warehouses", warehouse_service.get_all_warehouses, lambda: (email,)),
+        BenchmarkCase("warehouse.get_all_locations", warehouse_service.get_all_locations, lambda: (email,)),
+        BenchmarkCase("warehouse.get_locations_by_warehouse", warehouse_service.get_locations_by_warehouse,
+                      lambda: (ctx["rng"].choice(ctx["warehouse_ids"]), email)),
+    ]
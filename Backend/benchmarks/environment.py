@@ -0,0 +1,113 @@
+"""
+Throwaway MongoDB for benchmarks: a temporary local mongod when one is on PATH,
+otherwise an in-memory Motor-compatible fake (mongomock-motor)
+"""
+import asyncio
+import os
+import shutil
+import socket
+import subprocess
+import tempfile
+
+# The app reads its settings from the environment at import time
+BENCHMARK_ENV = {
+    "MONGO_URL": "mongodb://127.0.0.1:27017",
+    "DB_NAME": "stockmaster_bench",
+    "JWT_SECRET_KEY": "benchmark-secret",
+    "SMTP_HOST": "localhost",
+    "SMTP_PORT": "25",
+    "SMTP_USER": "benchmark",
+    "SMTP_PASSWORD": "benchmark",
+    "SMTP_SENDER": "benchmark@localhost",
+    "SLOW_QUERY_LOG_ENABLED": "false",
+}
+
+for key, value in BENCHMARK_ENV.items():
+    os.environ.setdefault(key, value)
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+class LocalMongo:
+    """Starts mongod on a free port with a temporary dbpath; removed on stop()"""
+
+    def __init__(self, mongod_path: str):
+        self.mongod_path = mongod_path
+        self.port = _free_port()
+        self.dbpath = tempfile.mkdtemp(prefix="stockmaster-bench-")
+        self.process = None
+
+    @property
+    def url(self) -> str:
+        return f"mongodb://127.0.0.1:{self.port}"
+
+    async def start(self):
+        self.process = subprocess.Popen(
+            [self.mongod_path, "--dbpath", self.dbpath, "--port", str(self.port), "--bind_ip", "127.0.0.1", "--quiet"],
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL
+        )
+        from motor.motor_asyncio import AsyncIOMotorClient
+        client = AsyncIOMotorClient(self.url, serverSelectionTimeoutMS=500)
+        for _ in range(60):
+            try:
+                await client.admin.command("ping")
+                client.close()
+                return
+            except Exception:
+                if self.process.poll() is not None:
+                    break
+                await asyncio.sleep(0.5)
+        client.close()
+        self.stop()
+        raise RuntimeError("mongod did not start")
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+        shutil.rmtree(self.dbpath, ignore_errors=True)
+
+async def open_database(mongo_url: str = None, use_fake: bool = False):
+    """Point app.core.database at a benchmark database. Returns (backend name, cleanup callable)"""
+    from app.core.config import settings
+    from app.core.database import db, connect_to_mongo, ensure_indexes
+
+    if mongo_url and not use_fake:
+        settings.MONGO_URL = mongo_url
+        await connect_to_mongo()
+        if set(await db.db.list_collection_names()) - {"slow_queries"}:
+            raise RuntimeError(f"Database {settings.DB_NAME} is not empty; benchmarks need an empty database")
+        return "external", db.client.close
+
+    mongod_path = shutil.which("mongod")
+    if mongod_path and not use_fake:
+        local = LocalMongo(mongod_path)
+        await local.start()
+        settings.MONGO_URL = local.url
+        await connect_to_mongo()
+
+        def cleanup():
+            db.client.close()
+            local.stop()
+        return "mongod", cleanup
+
+    try:
+        from mongomock_motor import AsyncMongoMockClient
+    except ImportError:
+        raise RuntimeError(
+            "No mongod on PATH and mongomock-motor is not installed "
+            "(pip install -r benchmarks/requirements.txt, or pass --mongo-url)"
+        )
+    db.client = AsyncMongoMockClient()
+    db.db = db.client[settings.DB_NAME]
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        print(f"Skipping indexes unsupported by the fake: {e}")
+    return "fake", lambda: None
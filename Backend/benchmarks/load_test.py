@@ -0,0 +1,240 @@
+"""
+HTTP load test with weighted workload mixes and per-endpoint latency percentiles
+
+In-process (ASGI, seeded throwaway database - see benchmarks/README.md):
+    python -m benchmarks.load_test --concurrency 50 --duration 30 --out load-results.json
+
+Against a running server (e.g. uvicorn main:app, data from generate_tenant_data.py):
+    python -m benchmarks.load_test --base-url http://127.0.0.1:8000 \\
+        --email user0@tenant0.example.com --password password123 --concurrency 50 --duration 60
+
+Fail when results regress past a stored baseline:
+    python -m benchmarks.load_test --baseline load-baseline.json --tolerance 0.2
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime
+
+import httpx
+
+DEFAULT_MIX = {"search": 40, "dashboard": 25, "ledger": 25, "execute": 10}
+API = "/api/v1"
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError:
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append((time.perf_counter() - started) * 1000)
+        if response.status_code >= 400:
+            self.errors[label] += 1
+            return None
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for label, values in sorted(self.latencies.items()):
+            endpoints[label] = {
+                "requests": len(values),
+                "errors": self.errors.get(label, 0),
+                "throughput_rps": round(len(values) / elapsed, 2),
+                "p50_ms": round(_percentile(values, 50), 2),
+                "p95_ms": round(_percentile(values, 95), 2),
+                "p99_ms": round(_percentile(values, 99), 2),
+            }
+        total = sum(len(v) for v in self.latencies.values())
+        return {
+            "total_requests": total,
+            "total_errors": sum(self.errors.values()),
+            "throughput_rps": round(total / elapsed, 2),
+            "endpoints": endpoints,
+        }
+
+class Workload:
+    """The scenarios of our traffic mix. Each one issues one or more requests"""
+
+    def __init__(self, ctx: dict, recorder: Recorder, rng: random.Random):
+        self.ctx = ctx
+        self.recorder = recorder
+        self.rng = rng
+
+    async def search(self, client):
+        # Scanner / typeahead lookups: a SKU fragment
+        sku = self.rng.choice(self.ctx["product_skus"])
+        await self.recorder.request(client, "GET /products/search", "GET", f"{API}/products/search", params={"q": sku[-5:]})
+
+    async def dashboard(self, client):
+        await self.recorder.request(client, "GET /dashboard/kpis", "GET", f"{API}/dashboard/kpis")
+
+    async def ledger(self, client):
+        params = {"skip": self.rng.choice([0, 0, 0, 100, 200]), "limit": 100}
+        if self.rng.random() < 0.3:
+            params["product_id"] = self.rng.choice(self.ctx["product_ids"])
+        await self.recorder.request(client, "GET /stock-movements/ledger/history", "GET", f"{API}/stock-movements/ledger/history", params=params)
+
+    async def execute(self, client):
+        index = self.rng.randrange(len(self.ctx["product_ids"]))
+        payload = {
+            "type": "receipt",
+            "reference": f"LOAD-{time.time_ns()}",
+            "destination_location_id": self.rng.choice(self.ctx["location_ids"]),
+            "lines": [{
+                "product_id": self.ctx["product_ids"][index],
+                "product_name": f"Product {index}",
+                "product_sku": self.ctx["product_skus"][index],
+                "quantity": self.rng.randint(1, 10),
+                "unit_of_measure": "Units"
+            }]
+        }
+        created = await self.recorder.request(client, "POST /stock-movements/", "POST", f"{API}/stock-movements/", json=payload)
+        if created is not None:
+            movement_id = created.json()["id"]
+            await self.recorder.request(client, "POST /stock-movements/{id}/execute", "POST", f"{API}/stock-movements/{movement_id}/execute")
+
+async def _worker(client, workload: Workload, scenarios, weights, deadline: float):
+    while time.perf_counter() < deadline:
+        scenario = workload.rng.choices(scenarios, weights)[0]
+        await getattr(workload, scenario)(client)
+
+async def run_load(client, ctx: dict, mix: dict, concurrency: int, duration: float, seed: int) -> dict:
+    recorder = Recorder()
+    scenarios, weights = zip(*mix.items())
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(client, Workload(ctx, recorder, random.Random(seed + n)), scenarios, weights, deadline)
+        for n in range(concurrency)
+    ])
+    return recorder.report(time.perf_counter() - started)
+
+async def _remote_context(client) -> dict:
+    products = (await client.get(f"{API}/products/", params={"limit": 100})).json()
+    locations = (await client.get(f"{API}/warehouses/locations/all")).json()
+    if not products or not locations:
+        raise RuntimeError("The tenant needs at least one product and one location")
+    return {
+        "product_ids": [p["id"] for p in products],
+        "product_skus": [p["sku"] for p in products],
+        "location_ids": [l["id"] for l in locations],
+    }
+
+async def main(args) -> dict:
+    if args.base_url:
+        async with httpx.AsyncClient(base_url=args.base_url, timeout=30) as client:
+            login = await client.post(f"{API}/auth/login", json={"email": args.email, "password": args.password})
+            login.raise_for_status()
+            client.headers["Authorization"] = f"Bearer {login.json()['access_token']}"
+            ctx = await _remote_context(client)
+            return await run_load(client, ctx, args.mix, args.concurrency, args.duration, args.seed)
+
+    from benchmarks import environment
+    from benchmarks.seed import SCALES, seed
+    backend, cleanup = await environment.open_database(args.mongo_url, args.fake)
+    try:
+        from main import app
+        from app.core.database import get_database
+        from app.core.security import create_access_token
+        ctx = await seed(get_database(), SCALES[args.scale], args.seed)
+        token = create_access_token(data={"sub": ctx["user_email"]})
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=30,
+                                     headers={"Authorization": f"Bearer {token}"}) as client:
+            return await run_load(client, ctx, args.mix, args.concurrency, args.duration, args.seed)
+    finally:
+        cleanup()
+
+def check_baseline(report: dict, baseline_path: str, tolerance: float) -> list:
+    """Endpoints whose p95/p99 grew, or throughput dropped, by more than `tolerance`"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]["endpoints"]
+    failures = []
+    for label, result in report["endpoints"].items():
+        before = baseline.get(label)
+        if not before:
+            continue
+        for metric in ("p95_ms", "p99_ms"):
+            if result[metric] > before[metric] * (1 + tolerance):
+                failures.append(f"{label}: {metric} {before[metric]} -> {result[metric]}")
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - tolerance):
+            failures.append(f"{label}: throughput {before['throughput_rps']} -> {result['throughput_rps']} req/s")
+        if result["errors"] > before["errors"]:
+            failures.append(f"{label}: errors {before['errors']} -> {result['errors']}")
+    return failures
+
+def _parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, weight = part.split("=")
+        if name not in DEFAULT_MIX:
+            raise argparse.ArgumentTypeError(f"Unknown scenario {name!r} (choose from {', '.join(DEFAULT_MIX)})")
+        mix[name] = float(weight)
+    return mix
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the StockMaster API")
+    parser.add_argument("--base-url", help="Target a running server instead of the in-process app")
+    parser.add_argument("--email", help="Login for --base-url")
+    parser.add_argument("--password", default="password123")
+    parser.add_argument("--scale", default="small", help="Seed scale for in-process runs")
+    parser.add_argument("--mongo-url", help="Empty MongoDB for in-process runs (default: temporary mongod)")
+    parser.add_argument("--fake", action="store_true")
+    parser.add_argument("--mix", type=_parse_mix, default=DEFAULT_MIX,
+                        help="Scenario weights, e.g. search=40,dashboard=25,ledger=25,execute=10")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=30, help="Seconds")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--out", default="load-results.json")
+    parser.add_argument("--baseline", help="Fail if results regress past this earlier run")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed regression vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args(argv)
+    if args.base_url and not args.email:
+        parser.error("--email is required with --base-url")
+    return args
+
+if __name__ == "__main__":
+    args = parse_args()
+    results = asyncio.run(main(args))
+    report = {
+        "meta": {
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "target": args.base_url or "in-process",
+            "mix": args.mix,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+
+    print(f"{'endpoint':40} {'req':>7} {'err':>5} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8}")
+    for label, r in results["endpoints"].items():
+        print(f"{label:40} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps']:>8.1f} "
+              f"{r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} {r['p99_ms']:>8.1f}")
+    print(f"Total: {results['total_requests']} requests, {results['throughput_rps']} req/s, {results['total_errors']} errors")
+
+    if args.baseline:
+        failures = check_baseline(results, args.baseline, args.tolerance)
+        if failures:
+            print("\nRegressions against baseline:")
+            for failure in failures:
+                print(f"  {failure}")
+            sys.exit(1)
+        print("\nWithin baseline tolerance")
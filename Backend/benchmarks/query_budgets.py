@@ -0,0 +1,171 @@
+"""
+Query-count budgets per route
+
+Every Mongo command issued while a request is handled is recorded (see app.core.query_stats);
+a request that issues more than its route's budget fails with the offending query list.
+getMore continuation batches are not counted: they grow with result size, not with code.
+
+Check all budgets against a seeded throwaway database (see benchmarks/README.md):
+    python -m benchmarks.query_budgets
+
+The same budgets run under pytest (tests/test_query_budgets.py) whenever mongod is available.
+
+From a test, with an httpx.AsyncClient on httpx.ASGITransport(app=app):
+    await assert_query_budget(client, "GET", "/api/v1/stock-movements/ledger/history", params={"limit": 100})
+"""
+import argparse
+import asyncio
+import sys
+from contextlib import contextmanager
+
+from benchmarks import environment  # noqa: F401 - app settings come from the environment
+from app.core.query_stats import RequestQueryStats, current_query_stats
+
+API = "/api/v1"
+
+class QueryBudget:
+    def __init__(self, route: str, max_queries: int, method: str = "GET", variants=({},)):
+        self.route = route
+        self.max_queries = max_queries
+        self.method = method
+        # Query parameter sets to check; page sizes must not change the count
+        self.variants = variants
+
+PAGES = ({"limit": 10}, {"limit": 100}, {"skip": 100, "limit": 100})
+
+# Every authenticated request starts with the user lookup (get_current_user) and, in the
+# services, the organization lookup
+QUERY_BUDGETS = [
+    QueryBudget("/products/", 3, variants=PAGES),
+    QueryBudget("/products/search", 3, variants=({"q": "T0-00001"},)),
+    QueryBudget("/products/low-stock", 3, variants=PAGES),
+    QueryBudget("/products/{product_id}", 3),
+    # Cold cache; a repeated scan of the same SKU needs 2
+    QueryBudget("/products/by-sku/{product_sku}", 4),
+    QueryBudget("/dashboard/kpis", 3),
+    QueryBudget("/dashboard/trends", 5, variants=({}, {"product_id": "{product_id}"}, {"warehouse_id": "{warehouse_id}"})),
+    QueryBudget("/stock-movements/", 4, variants=PAGES),
+    QueryBudget("/stock-movements/{movement_id}", 4),
+    QueryBudget("/stock-movements/ledger/history", 4, variants=PAGES + ({"limit": 100, "product_id": "{product_id}"},)),
+    QueryBudget("/location-stock/products/{product_id}", 5),
+    QueryBudget("/location-stock/locations/{location_id}", 6),
+    # Whole-organization lists: a fixed number of batched queries, however many products/locations
+    QueryBudget("/location-stock/products", 5),
+    QueryBudget("/location-stock/locations", 6),
+    QueryBudget("/warehouses/", 3),
+    QueryBudget("/warehouses/locations/all", 3),
+    QueryBudget("/warehouses/{warehouse_id}/locations", 3),
+]
+
+class QueryBudgetExceeded(AssertionError):
+    def __init__(self, method: str, url: str, budget: int, stats: RequestQueryStats):
+        self.stats = stats
+        queries = "\n".join(f"  {n}. {q!r}" for n, q in enumerate(_counted(stats), 1))
+        super().__init__(f"{method} {url} issued {len(_counted(stats))} queries (budget {budget}):\n{queries}")
+
+def _counted(stats: RequestQueryStats) -> list:
+    return [q for q in stats.queries if q.command != "getMore"]
+
+@contextmanager
+def record_queries():
+    """Record every Mongo command issued inside the block, including by in-process requests"""
+    stats = RequestQueryStats(capture_commands=True)
+    token = current_query_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_query_stats.reset(token)
+
+async def assert_query_budget(client, method: str, url: str, budget: int = None, **request_kwargs):
+    """Issue a request through an in-process client and fail if it exceeds the route's budget"""
+    if budget is None:
+        budget = _budget_for(method, url)
+    with record_queries() as stats:
+        response = await client.request(method, url, **request_kwargs)
+    if response.status_code >= 400:
+        raise AssertionError(f"{method} {url} returned {response.status_code}: {response.text}")
+    if len(_counted(stats)) > budget:
+        raise QueryBudgetExceeded(method, url, budget, stats)
+    return stats
+
+def _budget_for(method: str, url: str) -> int:
+    path = url.split("?")[0]
+    for budget in QUERY_BUDGETS:
+        if budget.method == method and _matches(API + budget.route, path):
+            return budget.max_queries
+    raise KeyError(f"No query budget declared for {method} {path}")
+
+def _matches(template: str, path: str) -> bool:
+    expected, actual = template.strip("/").split("/"), path.strip("/").split("/")
+    return len(expected) == len(actual) and all(
+        e == a or (e.startswith("{") and e.endswith("}")) for e, a in zip(expected, actual)
+    )
+
+def budget_cases():
+    """(budget, query parameter template) for every declared budget and variant"""
+    return [(budget, variant) for budget in QUERY_BUDGETS for variant in budget.variants]
+
+def request_for(budget: QueryBudget, variant: dict, ids: dict):
+    """URL and query parameters of a budget case, with the seeded ids filled in"""
+    url = API + budget.route.format(**ids)
+    params = {key: value.format(**ids) if isinstance(value, str) else value for key, value in variant.items()}
+    return url, params
+
+async def seeded_ids(db, ctx: dict) -> dict:
+    """Ids of seeded documents that the budget routes are called with"""
+    movement = await db.stock_movements.find_one({"organization_id": ctx["organization_id"]})
+    return {
+        "product_id": ctx["product_ids"][0],
+        "product_sku": ctx["product_skus"][0],
+        "location_id": ctx["location_ids"][0],
+        "warehouse_id": ctx["warehouse_ids"][0],
+        "movement_id": str(movement["_id"]),
+    }
+
+async def check_budgets(client, ids: dict) -> list:
+    """Run every declared budget; returns the failures"""
+    failures = []
+    for budget, variant in budget_cases():
+        url, params = request_for(budget, variant, ids)
+        try:
+            stats = await assert_query_budget(client, budget.method, url, budget.max_queries, params=params)
+            print(f"ok    {budget.method} {budget.route} {params or ''}: {len(_counted(stats))}/{budget.max_queries} queries")
+        except AssertionError as e:
+            print(f"FAIL  {e}")
+            failures.append(e)
+    return failures
+
+async def main(args) -> int:
+    import httpx
+    from benchmarks.seed import SCALES, seed
+
+    backend, cleanup = await environment.open_database(args.mongo_url, use_fake=False)
+    if backend == "fake":
+        raise SystemExit("Query budgets need a real MongoDB (mongod on PATH or --mongo-url): the fake has no command monitoring")
+    try:
+        from main import app
+        from app.core.database import get_database
+        from app.core.security import create_access_token
+        db = get_database()
+        ctx = await seed(db, SCALES[args.scale], args.seed)
+        ids = await seeded_ids(db, ctx)
+        token = create_access_token(data={"sub": ctx["user_email"]})
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://budgets",
+                                     headers={"Authorization": f"Bearer {token}"}) as client:
+            failures = await check_budgets(client, ids)
+    finally:
+        cleanup()
+
+    print(f"\n{len(failures)} budget(s) exceeded" if failures else "\nAll query budgets met")
+    return 1 if failures else 0
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check per-route Mongo query budgets")
+    parser.add_argument("--scale", default="small")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-url", help="Empty MongoDB to use (default: temporary mongod). "
+                                            "The in-memory fake has no command monitoring, so it cannot be used")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main(parse_args())))
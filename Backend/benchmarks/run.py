@@ -0,0 +1,142 @@
+"""
+Service-layer benchmarks against a throwaway MongoDB
+
+Usage (from the Backend directory):
+    python -m benchmarks.run --scale small --out bench-results.json
+    python -m benchmarks.run --scale large --compare bench-baseline.json
+"""
+import argparse
+import asyncio
+import inspect
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+from benchmarks import environment
+from benchmarks.seed import DEFAULT_NOW, SCALES, seed
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True).strip()
+    except Exception:
+        return "unknown"
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+async def run_case(case, iterations: int, warmup: int) -> dict:
+    from app.core.query_stats import RequestQueryStats, current_query_stats
+
+    latencies = []
+    round_trips = []
+    for i in range(warmup + iterations):
+        args = case.setup() if case.setup else ()
+        if inspect.isawaitable(args):
+            args = await args
+
+        stats = RequestQueryStats()
+        token = current_query_stats.set(stats)
+        started = time.perf_counter()
+        try:
+            await case.run(*args)
+        finally:
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            current_query_stats.reset(token)
+
+        if i >= warmup:
+            latencies.append(elapsed_ms)
+            round_trips.append(stats.count)
+
+    return {
+        "iterations": len(latencies),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+        "max_ms": round(max(latencies), 3),
+        "round_trips": round(statistics.fmean(round_trips), 1),
+    }
+
+def compare(results: dict, baseline_path: str) -> None:
+    with open(baseline_path) as f:
+        baseline = json.load(f)["results"]
+    print(f"\n{'case':55} {'p50 base':>10} {'p50 now':>10} {'delta':>8} {'trips':>12}")
+    for name, result in results.items():
+        before = baseline.get(name)
+        if not before:
+            print(f"{name:55} {'-':>10} {result['p50_ms']:>10.2f} {'new':>8}")
+            continue
+        delta = (result["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0.0
+        trips = f"{before['round_trips']:g} -> {result['round_trips']:g}"
+        print(f"{name:55} {before['p50_ms']:>10.2f} {result['p50_ms']:>10.2f} {delta:>7.1f}% {trips:>12}")
+
+async def main(args) -> dict:
+    scale = dict(SCALES[args.scale])
+    for key in scale:
+        override = getattr(args, key)
+        if override is not None:
+            scale[key] = override
+
+    backend, cleanup = await environment.open_database(args.mongo_url, args.fake)
+    try:
+        from app.core.database import get_database
+        ctx = await seed(get_database(), scale, args.seed, args.now)
+
+        from benchmarks.cases import build_cases
+        results = {}
+        for case in build_cases(ctx):
+            if args.only and not any(pattern in case.name for pattern in args.only):
+                continue
+            iterations = min(args.iterations, case.iterations or args.iterations)
+            results[case.name] = await run_case(case, iterations, args.warmup)
+            r = results[case.name]
+            print(f"{case.name:55} p50 {r['p50_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms  trips {r['round_trips']:g}")
+    finally:
+        cleanup()
+
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "timestamp": datetime.utcnow().isoformat() + "Z",
+            "backend": backend,
+            "scale": scale,
+            "seed": args.seed,
+            "now": args.now.isoformat(),
+            "python": platform.python_version(),
+        },
+        "results": results,
+    }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the StockMaster service layer")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--products", type=int)
+    parser.add_argument("--warehouses", type=int)
+    parser.add_argument("--locations", type=int)
+    parser.add_argument("--movements", type=int)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--warmup", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", type=datetime.fromisoformat, default=DEFAULT_NOW,
+                        help="End of the seeded history (ISO date)")
+    parser.add_argument("--only", nargs="*", help="Run only cases whose name contains one of these")
+    parser.add_argument("--mongo-url", help="Use an existing (empty) MongoDB instead of starting mongod")
+    parser.add_argument("--fake", action="store_true", help="Force the in-memory fake backend")
+    parser.add_argument("--out", default="bench-results.json")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"\nWrote {args.out}")
+    if args.compare:
+        compare(report["results"], args.compare)
+    sys.exit(0)
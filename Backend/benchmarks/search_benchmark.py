@@ -0,0 +1,102 @@
+"""
+Product search: the old unanchored case-insensitive regex against the search_tokens index
+
+Seeds one tenant (100k products by default), then times both query paths for the kinds of
+input the search box sees and, on a real MongoDB, reports documents examined per query.
+
+Usage (from the Backend directory):
+    python -m benchmarks.search_benchmark --products 100000 --out search-results.json
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+from benchmarks import environment
+from benchmarks.seed import seed
+
+def _percentile(values, pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+def _regex_filter(org_id: str, query: str) -> dict:
+    """What search_products ran before the token index"""
+    return {
+        "organization_id": org_id,
+        "$or": [
+            {"name": {"$regex": query, "$options": "i"}},
+            {"sku": {"$regex": query, "$options": "i"}}
+        ]
+    }
+
+async def _time(run, iterations: int) -> dict:
+    await run()
+    latencies = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        await run()
+        latencies.append((time.perf_counter() - started) * 1000)
+    return {
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "p50_ms": round(_percentile(latencies, 50), 3),
+        "p95_ms": round(_percentile(latencies, 95), 3),
+    }
+
+async def _docs_examined(db, filter_: dict) -> int:
+    explain = await db.command("explain", {"find": "products", "filter": filter_, "limit": 500}, verbosity="executionStats")
+    return explain["executionStats"]["totalDocsExamined"]
+
+async def main(args) -> dict:
+    backend, cleanup = await environment.open_database(args.mongo_url, args.fake)
+    try:
+        from app.core.database import get_database
+        from app.core.search import query_tokens
+        from app.services.product_service import product_service
+        db = get_database()
+        ctx = await seed(db, {"products": args.products, "warehouses": 1, "locations": 1, "movements": 0}, args.seed)
+        org_id, email = ctx["organization_id"], ctx["user_email"]
+        sku = ctx["product_skus"][len(ctx["product_skus"]) // 2]
+        name = (await db.products.find_one({"sku": sku}))["name"]
+
+        queries = {
+            "exact_sku": sku,
+            "sku_suffix": sku[-5:],
+            "name_word": name.split()[0],
+            "name_substring": name.split()[0][1:5],
+            "short_prefix": sku[:2],
+        }
+        results = {}
+        for label, query in queries.items():
+            regex = await _time(lambda: db.products.find(_regex_filter(org_id, query)).to_list(length=50), args.iterations)
+            indexed = await _time(lambda: product_service.search_products(query, email), args.iterations)
+            if backend != "fake":
+                regex["docs_examined"] = await _docs_examined(db, _regex_filter(org_id, query))
+                indexed["docs_examined"] = await _docs_examined(
+                    db, {"organization_id": org_id, "search_tokens": {"$all": query_tokens(query)}}
+                )
+            results[label] = {"query": query, "regex": regex, "indexed": indexed}
+            print(f"{label:15} {query!r:18} regex p50 {regex['p50_ms']:9.2f} ms  "
+                  f"indexed p50 {indexed['p50_ms']:9.2f} ms  "
+                  f"docs {regex.get('docs_examined', '-')} -> {indexed.get('docs_examined', '-')}")
+    finally:
+        cleanup()
+
+    return {"meta": {"backend": backend, "products": args.products, "seed": args.seed}, "results": results}
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare regex and token-index product search")
+    parser.add_argument("--products", type=int, default=100_000)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--mongo-url", help="Use an existing (empty) MongoDB instead of starting mongod")
+    parser.add_argument("--fake", action="store_true", help="Force the in-memory fake backend")
+    parser.add_argument("--out", default="search-results.json")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
@@ -0,0 +1,45 @@
+"""
+Seed one benchmark tenant through the synthetic tenant generator (generate_tenant_data.py)
+"""
+import random
+import time
+from datetime import datetime
+from typing import Optional
+from generate_tenant_data import BulkWriter, TenantConfig, generate_tenant
+
+# Roughly 2.2 ledger rows per movement (multi-line movements, two rows per internal transfer line)
+SCALES = {
+    "small": {"products": 1_000, "warehouses": 5, "locations": 50, "movements": 40_000},
+    "medium": {"products": 10_000, "warehouses": 20, "locations": 500, "movements": 460_000},
+    "large": {"products": 10_000, "warehouses": 20, "locations": 500, "movements": 2_300_000},
+}
+# End of the seeded history; fixed so that runs at the same commit and seed see identical data
+DEFAULT_NOW = datetime(2026, 1, 1)
+
+async def seed(db, scale: dict, seed: int = 42, now: Optional[datetime] = None) -> dict:
+    """Seed a single organization. Returns ids the benchmark cases need"""
+    started = time.perf_counter()
+    config = TenantConfig(
+        users=1,
+        warehouses=scale["warehouses"],
+        locations_per_warehouse=max(1, scale["locations"] // scale["warehouses"]),
+        products=scale["products"],
+        movements=scale["movements"],
+        now=now or DEFAULT_NOW
+    )
+    writer = BulkWriter(db)
+    tenant = await generate_tenant(db, writer, config, random.Random(seed), 0, hashed_password="")
+    await writer.flush()
+
+    ledger_rows = await db.stock_ledger.count_documents({})
+    print(f"Seeded {scale} ({ledger_rows:,} ledger rows) in {time.perf_counter() - started:.1f}s")
+    return {
+        "user_email": tenant["user_emails"][0],
+        "organization_id": tenant["organization_id"],
+        "now": tenant["now"],
+        "product_ids": tenant["product_ids"],
+        "product_skus": tenant["product_skus"],
+        "location_ids": tenant["location_ids"],
+        "warehouse_ids": tenant["warehouse_ids"],
+        "rng": random.Random(seed)
+    }
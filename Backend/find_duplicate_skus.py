@@ -0,0 +1,36 @@
+"""
+Report products that share a SKU within their organization. The API refuses to start while any
+exist and the unique (organization_id, sku) index is not built yet; rename or merge the listed
+products (keeping their stock history in mind), then start the API again.
+
+Usage (from the Backend directory, same .env as the API):
+    python find_duplicate_skus.py
+    python find_duplicate_skus.py --org-id <id>
+Exits with status 1 if duplicates were found.
+"""
+import argparse
+import asyncio
+import sys
+from app.core.database import connect_to_mongo, close_mongo_connection, find_duplicate_skus
+
+async def report(args) -> int:
+    # Indexes are not created: the unique SKU index is what fails while duplicates exist
+    await connect_to_mongo(create_indexes=False)
+    try:
+        duplicates = await find_duplicate_skus(args.org_id)
+        for duplicate in duplicates:
+            print(f"Organization {duplicate['_id']['organization_id']}, SKU {duplicate['_id']['sku']!r}:")
+            for product in sorted(duplicate["products"], key=lambda p: str(p.get("created_at"))):
+                print(f"  {product['_id']}  {product.get('name')!r}  created {product.get('created_at')}")
+        print(f"{len(duplicates)} duplicated SKUs")
+        return 1 if duplicates else 0
+    finally:
+        await close_mongo_connection()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="List SKUs used by more than one product of an organization")
+    parser.add_argument("--org-id", action="append", help="Organization to check (repeatable; default: all)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(report(parse_args())))
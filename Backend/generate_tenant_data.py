@@ -0,0 +1,532 @@
+"""
+Synthetic tenant data generator
+
+Builds realistic tenants (users, organization, warehouses, locations, products and years of
+receipts, deliveries, internal transfers and adjustments) with stock ledger rows shaped exactly
+like the ones execute_movement and adjust_inventory write. Everything is written with unordered
+bulk inserts, several batches in flight at once.
+
+The collections the API maintains next to every write (valuation, dashboard counters, daily stock
+buckets, collection versions and the sync change log) are then built from the generated ledger
+with the same services the backfill scripts use, so the app's .env must be loadable.
+
+Usage (from the Backend directory):
+    python generate_tenant_data.py --tenants 8 --processes 4 --products 10000 --movements 500000 --years 3 --skew 1.1
+"""
+import argparse
+import asyncio
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from itertools import accumulate
+from typing import Dict, List, Optional
+
+import bcrypt
+from bson import ObjectId
+from motor.motor_asyncio import AsyncIOMotorClient
+
+from app.core import database
+from app.core.search import search_fields
+from app.models.sync import SyncKind
+from app.services.change_log_service import change_log_service
+from app.services.collection_version_service import collection_version_service
+from app.services.stock_rollup_service import stock_rollup_service
+from app.services.valuation_service import valuation_service
+
+DEFAULT_PASSWORD = "password123"
+CATEGORIES = ["Electronics", "Hardware", "Furniture", "Packaging", "Food", "Apparel", "Tools", "Chemicals", "Office", "Medical"]
+UNITS = ["Units", "Boxes", "Kg", "Liters", "Pallets"]
+LOCATION_TYPES = ["receiving", "storage", "storage", "storage", "shipping"]
+PARTNERS = ["Acme Corp", "Globex", "Initech", "Umbrella", "Stark Industries", "Wayne Enterprises", "Hooli", "Vandelay"]
+PENDING_STATUSES = ["draft", "waiting", "ready"]
+
+class TenantConfig:
+    def __init__(
+        self,
+        users: int = 5,
+        warehouses: int = 3,
+        locations_per_warehouse: int = 10,
+        products: int = 1000,
+        movements: int = 10000,
+        years: float = 2.0,
+        max_lines: int = 4,
+        pending_share: float = 0.02,
+        skew: float = 1.0,
+        mix: Optional[Dict[str, float]] = None,
+        now: Optional[datetime] = None
+    ):
+        self.users = users
+        self.warehouses = warehouses
+        self.locations_per_warehouse = locations_per_warehouse
+        self.products = products
+        self.movements = movements
+        self.years = years
+        self.max_lines = max_lines
+        self.pending_share = pending_share
+        self.skew = skew
+        self.mix = mix or {"receipt": 0.35, "delivery": 0.35, "internal": 0.2, "adjustment": 0.1}
+        # End of the generated history (default: the current time)
+        self.now = now
+
+class BulkWriter:
+    """Buffers documents per collection and writes them with unordered insert_many, `concurrency` batches in flight"""
+
+    def __init__(self, db, batch_size: int = 10_000, concurrency: int = 4):
+        self.db = db
+        self.batch_size = batch_size
+        self._buffers: Dict[str, list] = {}
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._tasks = set()
+        self.inserted = 0
+
+    def add(self, collection: str, document: dict):
+        """Buffer a document; call drain() regularly to write full batches"""
+        self._buffers.setdefault(collection, []).append(document)
+
+    async def drain(self):
+        for collection, buffer in self._buffers.items():
+            if len(buffer) >= self.batch_size:
+                self._buffers[collection] = []
+                await self._schedule(collection, buffer)
+
+    async def _schedule(self, collection: str, documents: list):
+        await self._semaphore.acquire()
+        task = asyncio.create_task(self._insert(collection, documents))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _insert(self, collection: str, documents: list):
+        try:
+            await self.db[collection].insert_many(documents, ordered=False)
+            self.inserted += len(documents)
+        finally:
+            self._semaphore.release()
+
+    async def flush(self):
+        for collection, buffer in list(self._buffers.items()):
+            if buffer:
+                self._buffers[collection] = []
+                await self._schedule(collection, buffer)
+        if self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+class PopularitySampler:
+    """Zipf-like product popularity: weight of rank r is 1 / r^skew (skew 0 = uniform)"""
+
+    def __init__(self, size: int, skew: float, rng: random.Random):
+        ranks = list(range(size))
+        rng.shuffle(ranks)
+        self._cumulative = list(accumulate(1.0 / (rank + 1) ** skew for rank in ranks))
+        self._total = self._cumulative[-1]
+        self._rng = rng
+
+    def sample(self) -> int:
+        return bisect_right(self._cumulative, self._rng.random() * self._total)
+
+class SeededObjectIds:
+    """ObjectIds laid out like the driver's (timestamp, 5 random bytes, counter), drawn from a seeded rng.
+    
+    Ids stay ascending in generation order, as the driver's would for inserts made in that order.
+    """
+    def __init__(self, rng: random.Random):
+        self._random = rng.getrandbits(40).to_bytes(5, "big")
+        self._counter = rng.getrandbits(24)
+
+    def __call__(self, at: datetime) -> ObjectId:
+        self._counter = (self._counter + 1) % 0x1000000
+        seconds = int(at.replace(tzinfo=timezone.utc).timestamp())
+        return ObjectId(seconds.to_bytes(4, "big") + self._random + self._counter.to_bytes(3, "big"))
+
+def _ledger_entry(entry_id, org_id, product, movement, location_id, quantity, quantity_change, balance_after, timestamp, created_by, unit_cost=None):
+    return {
+        "_id": entry_id,
+        "product_id": product["id"],
+        "product_name": product["name"],
+        "product_sku": product["sku"],
+        "movement_type": movement["type"],
+        "reference": movement["reference"],
+        "location_id": location_id,
+        "location_from": movement.get("source_location_id"),
+        "location_to": movement.get("destination_location_id"),
+        "quantity": quantity,
+        "quantity_change": quantity_change,
+        "unit_cost": unit_cost,
+        "balance_after": balance_after,
+        "organization_id": org_id,
+        "timestamp": timestamp,
+        "created_by": created_by
+    }
+
+async def generate_tenant(db, writer: BulkWriter, config: TenantConfig, rng: random.Random, tenant_index: int, hashed_password: str) -> dict:
+    """Generate one tenant. Returns the ids and keys callers (e.g. benchmarks) need.
+    
+    The same rng seed and config (with a fixed `now`) produce identical documents, ids included.
+    """
+    now = config.now or datetime.utcnow()
+    start = now - timedelta(days=365 * config.years)
+    new_id = SeededObjectIds(rng)
+
+    # Users and organization (same shape as AuthService.create_user / OrganizationService)
+    org_id = new_id(start)
+    org = str(org_id)
+    users = []
+    for u in range(config.users):
+        users.append({
+            "_id": new_id(start),
+            "email": f"user{u}@tenant{tenant_index}.example.com",
+            "full_name": f"Tenant {tenant_index} User {u}",
+            "hashed_password": hashed_password,
+            "organization_id": org,
+            "is_active": True,
+            "is_verified": True,
+            "created_at": start,
+            "updated_at": start
+        })
+    await db.users.insert_many(users, ordered=False)
+    owner = users[0]
+    await db.organizations.insert_one({
+        "_id": org_id,
+        "name": f"Tenant {tenant_index} Organization",
+        "description": "Generated tenant",
+        "owner_id": str(owner["_id"]),
+        "members": [{
+            "user_id": str(u["_id"]),
+            "user_email": u["email"],
+            "user_name": u["full_name"],
+            "role": "owner" if u is owner else rng.choice(["member", "member", "admin"]),
+            "joined_at": start
+        } for u in users],
+        "created_at": start,
+        "updated_at": start
+    })
+    user_emails = [u["email"] for u in users]
+
+    warehouses = [{
+        "_id": new_id(start),
+        "name": f"Warehouse {w}",
+        "code": f"WH{w:03d}",
+        "address": f"{rng.randint(1, 999)} Industrial Way",
+        "is_active": True,
+        "organization_id": org,
+        "created_at": start,
+        "updated_at": start
+    } for w in range(config.warehouses)]
+    await db.warehouses.insert_many(warehouses, ordered=False)
+
+    locations = []
+    for warehouse in warehouses:
+        for l in range(config.locations_per_warehouse):
+            locations.append({
+                "_id": new_id(start),
+                "name": f"{warehouse['code']}/{LOCATION_TYPES[l % len(LOCATION_TYPES)].upper()}-{l:03d}",
+                "warehouse_id": str(warehouse["_id"]),
+                "type": LOCATION_TYPES[l % len(LOCATION_TYPES)],
+                "organization_id": org,
+                "created_at": start
+            })
+    await db.locations.insert_many(locations, ordered=False)
+    location_ids = [str(l["_id"]) for l in locations]
+
+    products = [{
+        "_id": new_id(start),
+        "name": f"{rng.choice(CATEGORIES)} Item {p}",
+        "sku": f"T{tenant_index}-{p:07d}",
+        "category": rng.choice(CATEGORIES),
+        "unit_of_measure": rng.choice(UNITS),
+        "description": None,
+        "current_stock": 0,
+        "reorder_level": rng.randint(0, 50),
+        "organization_id": org,
+        "created_at": start,
+        "updated_at": start,
+        "created_by": owner["email"]
+    } for p in range(config.products)]
+    for product in products:
+        product.update(search_fields(product["name"], product["sku"]))
+    # Purchase price each receipt varies around (valuation replays the receipts' unit costs)
+    base_costs = [round(rng.uniform(1, 200), 2) for _ in products]
+
+    # String ids are needed for every ledger row; convert once (removed again before insert)
+    for product in products:
+        product["id"] = str(product["_id"])
+
+    popularity = PopularitySampler(len(products), config.skew, rng)
+    # product index -> {location_id: quantity}
+    stock: List[Dict[str, int]] = [dict() for _ in products]
+    totals = [0] * len(products)
+    types, weights = zip(*config.mix.items())
+    cumulative_mix = list(accumulate(weights))
+    step = (now - start) / max(1, config.movements)
+    pending_from = int(config.movements * (1 - config.pending_share))
+
+    for n in range(config.movements):
+        if n % 1000 == 0:
+            await writer.drain()
+        timestamp = start + step * n
+        created_by = rng.choice(user_emails)
+        movement_type = types[bisect_right(cumulative_mix, rng.random() * cumulative_mix[-1])]
+        pending = n >= pending_from and movement_type != "adjustment"
+
+        if movement_type == "adjustment":
+            p = popularity.sample()
+            product = products[p]
+            location_id = rng.choice(list(stock[p])) if stock[p] else rng.choice(location_ids)
+            current = stock[p].get(location_id, 0)
+            counted = max(0, current + rng.randint(-5, 5))
+            difference = counted - current
+            stock[p][location_id] = counted
+            totals[p] += difference
+            movement = {
+                "_id": new_id(timestamp),
+                "type": "adjustment",
+                "status": "done",
+                "reference": f"ADJ-{timestamp.strftime('%Y%m%d-%H%M%S')}",
+                "source_location_id": location_id,
+                "destination_location_id": location_id,
+                "notes": "Cycle count",
+                "lines": [{
+                    "product_id": product["id"],
+                    "product_name": product["name"],
+                    "product_sku": product["sku"],
+                    "quantity": abs(difference),
+                    "unit_of_measure": product["unit_of_measure"]
+                }],
+                "organization_id": org,
+                "created_at": timestamp,
+                "updated_at": timestamp,
+                "created_by": created_by,
+                "executed_at": timestamp
+            }
+            writer.add("stock_movements", movement)
+            writer.add("stock_ledger", _ledger_entry(
+                new_id(timestamp), org, product, movement, location_id, abs(difference), difference, totals[p], timestamp, created_by
+            ))
+            continue
+
+        executed_outbound = movement_type != "receipt" and not pending
+        source = rng.choice(location_ids) if movement_type != "receipt" and not executed_outbound else None
+
+        lines = []
+        seen = set()
+        unit_costs = {}
+        for _ in range(rng.randint(1, config.max_lines)):
+            p = popularity.sample()
+            if p in seen:
+                continue
+            seen.add(p)
+            quantity = rng.randint(1, 50)
+            if executed_outbound:
+                # Only ship/move what is on hand: the first line picks a source holding the product
+                if not lines:
+                    if not stock[p]:
+                        continue
+                    source = rng.choice(list(stock[p]))
+                available = stock[p].get(source, 0)
+                if available <= 0:
+                    continue
+                quantity = min(quantity, available)
+            if movement_type == "receipt":
+                unit_costs[p] = round(base_costs[p] * rng.uniform(0.9, 1.1), 2)
+            lines.append((p, quantity))
+        if not lines:
+            continue
+
+        destination = None
+        if movement_type != "delivery":
+            destination = rng.choice(location_ids)
+            while movement_type == "internal" and destination == source and len(location_ids) > 1:
+                destination = rng.choice(location_ids)
+
+        movement = {
+            "_id": new_id(timestamp),
+            "type": movement_type,
+            "status": rng.choice(PENDING_STATUSES) if pending else "done",
+            "reference": f"{movement_type[:3].upper()}-{tenant_index}-{n:08d}",
+            "partner_name": rng.choice(PARTNERS) if movement_type != "internal" else None,
+            "source_location_id": source,
+            "destination_location_id": destination,
+            "scheduled_date": timestamp,
+            "notes": None,
+            "lines": [{
+                "product_id": products[p]["id"],
+                "product_name": products[p]["name"],
+                "product_sku": products[p]["sku"],
+                "quantity": quantity,
+                "unit_of_measure": products[p]["unit_of_measure"],
+                "unit_cost": unit_costs.get(p)
+            } for p, quantity in lines],
+            "organization_id": org,
+            "created_at": timestamp,
+            "updated_at": timestamp,
+            "created_by": created_by,
+            "executed_at": None if pending else timestamp
+        }
+        writer.add("stock_movements", movement)
+        if pending:
+            continue
+
+        # Ledger rows exactly as StockMovementService.execute_movement writes them
+        for p, quantity in lines:
+            product = products[p]
+            if movement_type == "receipt":
+                stock[p][destination] = stock[p].get(destination, 0) + quantity
+                totals[p] += quantity
+                writer.add("stock_ledger", _ledger_entry(
+                    new_id(timestamp), org, product, movement, destination, quantity, quantity, totals[p], timestamp, created_by, unit_costs[p]
+                ))
+            elif movement_type == "delivery":
+                stock[p][source] -= quantity
+                if not stock[p][source]:
+                    del stock[p][source]
+                totals[p] -= quantity
+                writer.add("stock_ledger", _ledger_entry(
+                    new_id(timestamp), org, product, movement, source, quantity, -quantity, totals[p], timestamp, created_by
+                ))
+            else:
+                stock[p][source] -= quantity
+                if not stock[p][source]:
+                    del stock[p][source]
+                stock[p][destination] = stock[p].get(destination, 0) + quantity
+                writer.add("stock_ledger", _ledger_entry(
+                    new_id(timestamp), org, product, movement, source, quantity, -quantity, totals[p], timestamp, created_by
+                ))
+                writer.add("stock_ledger", _ledger_entry(
+                    new_id(timestamp), org, product, movement, destination, quantity, quantity, totals[p], timestamp, created_by
+                ))
+
+    for product, total in zip(products, totals):
+        del product["id"]
+        product["current_stock"] = total
+        product["stock_gap"] = total - product["reorder_level"]
+        product["is_low_stock"] = total <= product["reorder_level"]
+        writer.add("products", product)
+    await writer.drain()
+
+    return {
+        "organization_id": org,
+        "now": now,
+        "user_emails": user_emails,
+        "product_ids": [str(p["_id"]) for p in products],
+        "product_skus": [p["sku"] for p in products],
+        "location_ids": location_ids,
+        "warehouse_ids": [str(w["_id"]) for w in warehouses]
+    }
+
+async def build_derived_collections(tenant: dict):
+    """Build a generated tenant's write-maintained collections from its ledger (the ledger must be flushed).
+    
+    revalue rebuilds stock_values, valuation_layers, location_values and dashboard_counters, bumps
+    the products version and records products and balances in the sync change log; warehouses and
+    locations are recorded here.
+    """
+    org_id = tenant["organization_id"]
+    await valuation_service.revalue(org_id)
+    await stock_rollup_service.backfill(org_id)
+    await collection_version_service.bump(org_id, "warehouses", "locations")
+    await change_log_service.record(
+        org_id,
+        [(SyncKind.WAREHOUSE, warehouse_id) for warehouse_id in tenant["warehouse_ids"]]
+        + [(SyncKind.LOCATION, location_id) for location_id in tenant["location_ids"]]
+    )
+
+async def generate_tenants(args, tenant_indexes: List[int], hashed_password: str) -> int:
+    """Generate the given tenants. Returns the number of documents inserted"""
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    # The services that build the derived collections read app.core.database
+    database.db.client = client
+    database.db.db = db
+    await database.ensure_indexes()
+    config = TenantConfig(
+        users=args.users,
+        warehouses=args.warehouses,
+        locations_per_warehouse=args.locations_per_warehouse,
+        products=args.products,
+        movements=args.movements,
+        years=args.years,
+        max_lines=args.max_lines,
+        pending_share=args.pending_share,
+        skew=args.skew,
+        now=args.now
+    )
+    writer = BulkWriter(db, args.batch_size, args.concurrency)
+
+    tenants = []
+    for tenant_index in tenant_indexes:
+        # Seeded per tenant so output does not depend on how tenants are split across processes
+        rng = random.Random(f"{args.seed}-{tenant_index}")
+        tenant = await generate_tenant(db, writer, config, rng, tenant_index, hashed_password)
+        tenants.append(tenant)
+        print(f"Tenant {tenant_index}: organization {tenant['organization_id']}, login {tenant['user_emails'][0]} / {args.password}")
+    await writer.flush()
+    for tenant_index, tenant in zip(tenant_indexes, tenants):
+        started = time.perf_counter()
+        await build_derived_collections(tenant)
+        print(f"Tenant {tenant_index}: derived collections built in {time.perf_counter() - started:.1f}s")
+    client.close()
+    return writer.inserted
+
+def _generate_in_process(args, tenant_indexes: List[int], hashed_password: str) -> int:
+    return asyncio.run(generate_tenants(args, tenant_indexes, hashed_password))
+
+async def generate(args):
+    if args.drop:
+        client = AsyncIOMotorClient(args.mongo_url)
+        await client.drop_database(args.db_name)
+        client.close()
+
+    # bcrypt is slow by design, so every generated user shares one hash
+    hashed_password = bcrypt.hashpw(args.password.encode("utf-8"), bcrypt.gensalt(12)).decode("utf-8")
+    tenant_indexes = list(range(args.first_tenant, args.first_tenant + args.tenants))
+
+    started = time.perf_counter()
+    if args.processes > 1:
+        chunks = [tenant_indexes[i::args.processes] for i in range(args.processes)]
+        loop = asyncio.get_running_loop()
+        with ProcessPoolExecutor(args.processes) as pool:
+            counts = await asyncio.gather(*[
+                loop.run_in_executor(pool, _generate_in_process, args, chunk, hashed_password)
+                for chunk in chunks if chunk
+            ])
+        inserted = sum(counts)
+    else:
+        inserted = await generate_tenants(args, tenant_indexes, hashed_password)
+    elapsed = time.perf_counter() - started
+
+    client = AsyncIOMotorClient(args.mongo_url)
+    db = client[args.db_name]
+    print("=" * 60)
+    print(f"Inserted {inserted:,} documents and built the derived collections in {elapsed:.1f}s ({inserted / elapsed:,.0f} docs/s)")
+    for name in ("products", "stock_movements", "stock_ledger", "stock_values", "valuation_layers", "stock_daily", "stock_series", "sync_changes"):
+        print(f"  {name}: {await db[name].estimated_document_count():,}")
+    client.close()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic StockMaster tenants")
+    parser.add_argument("--mongo-url", default="mongodb://localhost:27017")
+    parser.add_argument("--db-name", default="stock_master")
+    parser.add_argument("--drop", action="store_true", help="Drop the database first")
+    parser.add_argument("--tenants", type=int, default=1)
+    parser.add_argument("--first-tenant", type=int, default=0, help="Index of the first tenant (keeps emails/SKUs unique across runs)")
+    parser.add_argument("--users", type=int, default=5, help="Users per tenant")
+    parser.add_argument("--warehouses", type=int, default=3)
+    parser.add_argument("--locations-per-warehouse", type=int, default=10)
+    parser.add_argument("--products", type=int, default=1000)
+    parser.add_argument("--movements", type=int, default=10000, help="Stock movements per tenant")
+    parser.add_argument("--years", type=float, default=2.0, help="History length")
+    parser.add_argument("--max-lines", type=int, default=4, help="Maximum lines per movement")
+    parser.add_argument("--pending-share", type=float, default=0.02, help="Share of the most recent movements left pending")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for product popularity (0 = uniform)")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--now", type=datetime.fromisoformat,
+                        help="End of the generated history, e.g. 2026-01-01 (default: now); fix it with --seed for identical data")
+    parser.add_argument("--password", default=DEFAULT_PASSWORD)
+    parser.add_argument("--batch-size", type=int, default=10_000)
+    parser.add_argument("--concurrency", type=int, default=4, help="insert_many batches in flight per process")
+    parser.add_argument("--processes", type=int, default=1, help="Generate tenants in parallel worker processes")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(generate(parse_args()))
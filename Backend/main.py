@@ -1,16 +1,38 @@
-from fastapi import FastAPI
+import asyncio
+import logging
+import time
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 from app.core.config import settings
+from app.core.query_stats import RequestQueryStats, current_query_stats
+from app.core.metrics import (
+    metrics,
+    route_template,
+    monitor_event_loop_lag,
+    http_requests_total,
+    http_request_duration,
+    http_request_db_queries,
+    http_requests_in_flight
+)
 from app.core.database import connect_to_mongo, close_mongo_connection
+from app.core.dependencies import get_metrics_reader
+from app.core.slow_queries import slow_query_logger
 from app.api.v1.router import api_router
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     await connect_to_mongo()
+    lag_monitor = asyncio.create_task(monitor_event_loop_lag()) if settings.METRICS_ENABLED else None
+    if settings.SLOW_QUERY_LOG_ENABLED:
+        slow_query_logger.start()
     yield
     # Shutdown
+    slow_query_logger.stop()
+    if lag_monitor:
+        lag_monitor.cancel()
     await close_mongo_connection()
 
 app = FastAPI(
@@ -20,6 +42,43 @@ app = FastAPI(
     lifespan=lifespan
 )
 
+logger = logging.getLogger("stockmaster.requests")
+
+@app.middleware("http")
+async def request_instrumentation_middleware(request: Request, call_next):
+    """Attribute Mongo commands to the request, report them via Server-Timing and record route metrics"""
+    # Reuse stats installed by the caller (query budget checks drive the app in-process)
+    stats = current_query_stats.get() or RequestQueryStats()
+    token = current_query_stats.set(stats)
+    http_requests_in_flight.inc()
+    start = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+    finally:
+        current_query_stats.reset(token)
+        http_requests_in_flight.dec()
+        if settings.METRICS_ENABLED:
+            elapsed = time.perf_counter() - start
+            route = route_template(request)
+            http_requests_total.inc(request.method, route, str(status_code))
+            http_request_duration.observe(request.method, route, value=elapsed)
+            http_request_db_queries.observe(request.method, route, value=stats.count)
+    total_ms = (time.perf_counter() - start) * 1000
+    
+    response.headers["Server-Timing"] = (
+        f'db;dur={stats.duration_ms:.1f};desc="{stats.count} queries", total;dur={total_ms:.1f}'
+    )
+    
+    if stats.count > settings.REQUEST_QUERY_BUDGET or total_ms > settings.REQUEST_LATENCY_BUDGET_MS:
+        logger.warning(
+            "%s %s -> %s took %.1f ms with %d queries (%.1f ms in db, %d docs): %s",
+            request.method, request.url.path, response.status_code, total_ms,
+            stats.count, stats.duration_ms, stats.docs_returned, stats.summary()
+        )
+    return response
+
 # CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -39,3 +98,9 @@ async def root():
 @app.get("/health")
 async def health_check():
     return {"status": "healthy"}
+
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False, dependencies=[Depends(get_metrics_reader)])
+    async def get_metrics():
+        """Metrics in Prometheus text exposition format"""
+        return PlainTextResponse(metrics.expose(), media_type="text/plain; version=0.0.4")
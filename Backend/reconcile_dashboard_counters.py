@@ -0,0 +1,49 @@
+"""
+Rebuild the incrementally maintained dashboard_counters from products and stock movements.
+Counters are updated with $inc next to every stock write; run this if they ever drift
+(e.g. after a write failed half-way or data was changed outside the API).
+
+Usage (from the Backend directory, same .env as the API):
+    python reconcile_dashboard_counters.py                 # every organization
+    python reconcile_dashboard_counters.py --org-id <id>   # one organization
+    python reconcile_dashboard_counters.py --dry-run       # report drift only
+"""
+import argparse
+import asyncio
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.dashboard_service import dashboard_service, COUNTER_FIELDS
+
+async def reconcile(args):
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        org_ids = args.org_id or [str(org["_id"]) async for org in db.organizations.find({}, {"_id": 1})]
+        drifted = 0
+        for org_id in org_ids:
+            stored = await db.dashboard_counters.find_one({"_id": org_id}) or {}
+            actual = await dashboard_service.compute_counters(org_id)
+            drift = {
+                field: (stored.get(field), actual[field])
+                for field in COUNTER_FIELDS if stored.get(field) != actual[field]
+            }
+            if not drift:
+                continue
+            drifted += 1
+            details = ", ".join(f"{field} {before} -> {after}" for field, (before, after) in drift.items())
+            print(f"Organization {org_id}: {details}")
+            if not args.dry_run:
+                await dashboard_service.rebuild_counters(org_id)
+
+        action = "would be rebuilt" if args.dry_run else "rebuilt"
+        print(f"Checked {len(org_ids)} organizations, {drifted} {action}")
+    finally:
+        await close_mongo_connection()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild dashboard counters that drifted")
+    parser.add_argument("--org-id", action="append", help="Organization to reconcile (repeatable; default: all)")
+    parser.add_argument("--dry-run", action="store_true", help="Only report drift")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(reconcile(parse_args()))
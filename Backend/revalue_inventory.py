@@ -0,0 +1,37 @@
+"""
+Rebuild inventory valuation (FIFO layers, per-location values, product stock_value and the
+organization total) by replaying the stock ledger.
+Valuation is maintained incrementally by every stock write; run this after changing a product's
+costing_method, after importing historical ledger entries, or if values ever drift.
+Stock writes of an organization are rejected (409) while it is being revalued.
+
+Usage (from the Backend directory, same .env as the API):
+    python revalue_inventory.py                 # every organization
+    python revalue_inventory.py --org-id <id>   # one organization
+"""
+import argparse
+import asyncio
+from app.core.database import connect_to_mongo, close_mongo_connection, get_database
+from app.services.valuation_service import valuation_service
+
+async def revalue(args):
+    await connect_to_mongo()
+    db = get_database()
+    try:
+        org_ids = args.org_id or [str(org["_id"]) async for org in db.organizations.find({}, {"_id": 1})]
+        for org_id in org_ids:
+            result = await valuation_service.revalue(org_id)
+            print(
+                f"Organization {org_id}: {result.products} products, "
+                f"{result.ledger_entries} ledger entries replayed, total value {result.total_value:.2f}"
+            )
+    finally:
+        await close_mongo_connection()
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Rebuild inventory valuation from the stock ledger")
+    parser.add_argument("--org-id", action="append", help="Organization to revalue (repeatable; default: all)")
+    return parser.parse_args(argv)
+
+if __name__ == "__main__":
+    asyncio.run(revalue(parse_args()))
@@ -0,0 +1,101 @@
+"""
+PrefixIndex slot reuse, long-prefix verification and the memory accounting behind index eviction
+(no MongoDB needed)
+"""
+import pytest
+
+from benchmarks import environment  # noqa: F401 - sets the environment the app's settings read
+
+from app.core.config import settings
+from app.services import autocomplete_service as autocomplete
+from app.services.autocomplete_service import MAX_KEY_LENGTH, AutocompleteService, PrefixIndex
+
+def _ids(suggestions) -> list:
+    return [s.id for s in suggestions]
+
+def _index(*products) -> PrefixIndex:
+    return PrefixIndex.build([{"_id": id_, "sku": sku, "name": name} for id_, sku, name in products])
+
+def test_remove_then_add_reuses_the_slot():
+    index = _index(("a", "BOLT-1", "Hex bolt"), ("b", "NUT-1", "Hex nut"))
+    index.remove("a")
+    assert index.products[0] is None and index.free_slots == [0]
+    assert _ids(index.suggest("bolt", 10)) == []
+    assert _ids(index.suggest("hex", 10)) == ["b"]
+
+    index.add("c", "WASHER-1", "Flat washer")
+    assert index.slots == {"b": 1, "c": 0}
+    assert index.free_slots == []
+    assert len(index.products) == 2
+    # The old entries of the slot are gone, so they do not resolve to the new product
+    assert _ids(index.suggest("bolt", 10)) == []
+    assert _ids(index.suggest("hex", 10)) == ["b"]
+    assert _ids(index.suggest("washer", 10)) == ["c"]
+
+    index.add("a", "BOLT-1", "Hex bolt")
+    assert index.slots["a"] == 2
+    assert _ids(index.suggest("hex", 10)) == ["a", "b"]
+
+def test_add_of_a_known_product_replaces_its_entries():
+    index = _index(("a", "BOLT-1", "Hex bolt"))
+    index.add("a", "SCREW-1", "Wood screw")
+    assert _ids(index.suggest("bolt", 10)) == []
+    assert _ids(index.suggest("screw", 10)) == ["a"]
+    assert len(index.sku_entries) == 1 and len(index.name_entries) == 2
+
+def test_prefixes_longer_than_the_keys_are_verified():
+    shared = "x" * MAX_KEY_LENGTH
+    index = _index(("a", f"{shared}-alpha", "Alpha"), ("b", f"{shared}-beta", "Beta"))
+    assert index.sku_entries[0].startswith(shared + autocomplete._SEP)
+    assert _ids(index.suggest(shared, 10)) == ["a", "b"]
+    assert _ids(index.suggest(f"{shared}-b", 10)) == ["b"]
+    assert _ids(index.suggest(f"{shared}-betamax", 10)) == []
+
+def test_long_name_words_are_verified():
+    long_word = "y" * MAX_KEY_LENGTH
+    index = _index(("a", "A-1", f"Big {long_word} one"), ("b", "B-1", f"Big {long_word} two"))
+    assert _ids(index.suggest(f"{long_word} t", 10)) == ["b"]
+    assert _ids(index.suggest(f"big {long_word} o", 10)) == ["a"]
+
+def test_size_accounting_returns_to_zero_and_matches_build():
+    products = [("a", "BOLT-1", "Hex bolt"), ("b", "NUT-1", "Hex nut large"), ("c", "W-1", "Washer")]
+    built = _index(*products)
+
+    incremental = PrefixIndex()
+    for product in products:
+        incremental.add(*product)
+    assert incremental.size_bytes == built.size_bytes > 0
+
+    incremental.add("b", "NUT-1", "Hex nut large")
+    assert incremental.size_bytes == built.size_bytes
+    for product_id, _, _ in products:
+        incremental.remove(product_id)
+    incremental.remove("missing")
+    assert incremental.size_bytes == 0
+
+def test_least_recently_used_indexes_are_evicted_within_the_budget(monkeypatch):
+    service = AutocompleteService()
+    indexes = {org: _index((f"{org}-1", f"{org.upper()}-1", f"{org} product")) for org in ("a", "b", "c")}
+    size = indexes["a"].size_bytes
+    monkeypatch.setattr(settings, "AUTOCOMPLETE_MEMORY_BUDGET_BYTES", size * 2)
+    evictions = autocomplete.autocomplete_evictions_total._values.get((), 0)
+
+    for org, index in indexes.items():
+        service._indexes[org] = index
+        service._evict()
+    assert list(service._indexes) == ["b", "c"]
+    assert autocomplete.autocomplete_evictions_total._values[()] == evictions + 1
+    assert autocomplete.autocomplete_bytes._values[()] == sum(i.size_bytes for i in service._indexes.values())
+    assert autocomplete.autocomplete_indexes._values[()] == 2
+
+    service.invalidate("b")
+    assert list(service._indexes) == ["c"]
+    assert autocomplete.autocomplete_bytes._values[()] == indexes["c"].size_bytes
+
+def test_the_most_recent_index_is_kept_over_budget(monkeypatch):
+    service = AutocompleteService()
+    monkeypatch.setattr(settings, "AUTOCOMPLETE_MEMORY_BUDGET_BYTES", 1)
+    service._indexes["a"] = _index(("a-1", "A-1", "Alpha"))
+    service._evict()
+    assert list(service._indexes) == ["a"]
+    assert autocomplete.autocomplete_bytes._values[()] == pytest.approx(service._indexes["a"].size_bytes)
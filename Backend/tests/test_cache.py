@@ -0,0 +1,29 @@
+"""
+TTLCache generations: a load that raced an invalidate of its key does not store its result
+"""
+from app.core.cache import TTLCache
+
+def test_set_after_a_racing_invalidate_is_dropped():
+    cache = TTLCache("test_racing_invalidate", 60)
+    generation = cache.generation("org")
+    cache.invalidate("org")
+    cache.set("org", "stale", generation=generation)
+    assert cache.get("org") is None
+
+    generation = cache.generation("org")
+    cache.invalidate("other")
+    cache.set("org", "fresh", generation=generation)
+    assert cache.get("org") == "fresh"
+
+def test_reset_generations_invalidate_outstanding_tokens():
+    cache = TTLCache("test_generation_reset", 60, max_entries=2)
+    generation = cache.generation("org")
+    for key in ("a", "b", "c"):
+        cache.invalidate(key)
+    cache.set("org", "stale", generation=generation)
+    assert cache.get("org") is None
+
+    generation = cache.generation("org")
+    cache.clear()
+    cache.set("org", "stale", generation=generation)
+    assert cache.get("org") is None
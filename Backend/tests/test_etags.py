@@ -0,0 +1,57 @@
+"""
+If-None-Match handling of the conditional GETs (no MongoDB needed)
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import Response
+from starlette.requests import Request
+
+from app.core.etags import conditional, document_etag, etag_matches, weak_etag
+
+ETAG = weak_etag("org", 7)
+
+def _request(if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers})
+
+def test_tags_are_weak_and_stable():
+    assert ETAG.startswith('W/"') and ETAG.endswith('"')
+    assert ETAG == weak_etag("org", 7)
+    assert ETAG != weak_etag("org", 8)
+    assert document_etag("p1", datetime(2026, 1, 1)) != document_etag("p1", datetime(2026, 1, 2))
+    assert document_etag("p1", None) == weak_etag("p1", "")
+
+@pytest.mark.parametrize("header", [
+    ETAG,
+    ETAG[2:],  # a strong tag with the same opaque value matches under weak comparison
+    f' W/"other", {ETAG} ',
+    f'"other",{ETAG[2:]}',
+    "*",
+    " * "
+])
+def test_matching_if_none_match(header):
+    assert etag_matches(_request(header), ETAG)
+
+@pytest.mark.parametrize("header", [
+    None,
+    "",
+    'W/"other"',
+    'W/"other", "another"',
+    ETAG[:-1],
+    f"W/{ETAG}"
+])
+def test_non_matching_if_none_match(header):
+    assert not etag_matches(_request(header), ETAG)
+
+def test_conditional_returns_304_with_the_tag():
+    response = conditional(_request(ETAG), Response(), ETAG)
+    assert response.status_code == 304
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == "private, no-cache"
+
+def test_conditional_tags_the_full_response():
+    response = Response()
+    assert conditional(_request('W/"other"'), response, ETAG) is None
+    assert response.headers["etag"] == ETAG
+    assert response.headers["cache-control"] == "private, no-cache"
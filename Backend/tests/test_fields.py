@@ -0,0 +1,61 @@
+"""
+Sparse fieldset parsing and the model_dump() include built from it (no MongoDB needed)
+"""
+from datetime import datetime
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.fields import model_include, parse_fields
+from app.models.stock_movement import StockMovementLine, StockMovementResponse
+
+def _movement() -> StockMovementResponse:
+    line = StockMovementLine(
+        product_id="p1", product_name="Bolt", product_sku="B-1", quantity=3, unit_of_measure="Units"
+    )
+    return StockMovementResponse(
+        id="m1", type="receipt", status="done", reference="REC-1", lines=[line, line], created_at=datetime(2026, 1, 1),
+        created_by="owner@example.com"
+    )
+
+def test_no_fields_selects_everything():
+    assert parse_fields(None, StockMovementResponse) is None
+    assert parse_fields("", StockMovementResponse) is None
+    assert parse_fields(" , ", StockMovementResponse) is None
+
+def test_fields_are_trimmed_and_deduplicated():
+    assert parse_fields(" id, reference ,id,", StockMovementResponse) == ["id", "reference"]
+
+def test_dotted_fields_select_part_of_a_nested_list():
+    selected = parse_fields("id,lines.product_sku,lines.quantity", StockMovementResponse)
+    assert selected == ["id", "lines.product_sku", "lines.quantity"]
+
+def test_a_whole_field_wins_over_its_parts():
+    assert parse_fields("lines.quantity,id,lines", StockMovementResponse) == ["id", "lines"]
+
+@pytest.mark.parametrize("fields", [
+    "id,nope",
+    "lines.nope",
+    "reference.length",
+    "nope.id"
+])
+def test_unknown_fields_are_rejected(fields):
+    with pytest.raises(HTTPException) as raised:
+        parse_fields(fields, StockMovementResponse)
+    assert raised.value.status_code == 400
+    assert raised.value.detail.startswith("Unknown field '")
+
+def test_model_include_keeps_only_the_selected_fields():
+    selected = parse_fields("reference,lines.product_sku,lines.quantity", StockMovementResponse)
+    dumped = _movement().model_dump(include=model_include(selected))
+    assert dumped == {
+        "reference": "REC-1",
+        "lines": [{"product_sku": "B-1", "quantity": 3}, {"product_sku": "B-1", "quantity": 3}]
+    }
+
+def test_model_include_whole_field_overrides_parts():
+    assert model_include(["lines", "lines.quantity"]) == {"lines": True}
+    assert model_include(["lines.quantity", "lines.unit_cost", "id"]) == {
+        "lines": {"__all__": {"quantity", "unit_cost"}},
+        "id": True
+    }
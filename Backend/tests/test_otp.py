@@ -0,0 +1,102 @@
+"""
+OTP hashing and the attempt limit of AuthService.verify_otp, against an in-memory stand-in for
+the password_reset_otps collection (no MongoDB needed)
+"""
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from fastapi import HTTPException
+
+from benchmarks import environment  # noqa: F401 - sets the environment the app's settings read
+
+from app.core.config import settings
+from app.core.security import hash_otp, normalize_email, verify_otp_hash
+from app.services import auth_service as auth_module
+from app.services.auth_service import auth_service
+
+EMAIL = "Reset.Me@Example.com"
+
+class OtpCollection:
+    """The find_one_and_update ($inc) and delete_one calls verify_otp makes, keyed by email"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, return_document=None):
+        doc = self.docs.get(query["email"])
+        if doc is None:
+            return None
+        for field, amount in update["$inc"].items():
+            doc[field] = doc.get(field, 0) + amount
+        return dict(doc)
+
+    async def delete_one(self, query):
+        for email, doc in list(self.docs.items()):
+            if all(doc.get(field) == value for field, value in query.items()):
+                del self.docs[email]
+                return
+
+class FakeDatabase:
+    def __init__(self):
+        self.password_reset_otps = OtpCollection()
+
+@pytest.fixture
+def otps(monkeypatch):
+    db = FakeDatabase()
+    monkeypatch.setattr(auth_module, "get_database", lambda: db)
+    return db.password_reset_otps
+
+def _issue(otps, otp: str = "123456", expires_in: timedelta = timedelta(minutes=10)):
+    email = normalize_email(EMAIL)
+    otps.docs[email] = {
+        "_id": "otp-1",
+        "email": email,
+        "otp_hash": hash_otp(EMAIL, otp),
+        "expires_at": datetime.utcnow() + expires_in,
+        "attempts": 0
+    }
+
+def _verify(email: str, otp: str) -> str:
+    """Detail of the HTTPException verify_otp raises, or "ok" """
+    try:
+        asyncio.run(auth_service.verify_otp(email, otp))
+    except HTTPException as e:
+        assert e.status_code == 400
+        return e.detail
+    return "ok"
+
+def test_hash_is_bound_to_the_normalized_email():
+    assert hash_otp(" Reset.Me@EXAMPLE.com ", "123456") == hash_otp("reset.me@example.com", "123456")
+    assert hash_otp("reset.me@example.com", "123456") != hash_otp("other@example.com", "123456")
+    assert verify_otp_hash("RESET.ME@example.com", "123456", hash_otp(EMAIL, "123456"))
+    assert not verify_otp_hash(EMAIL, "654321", hash_otp(EMAIL, "123456"))
+
+def test_hash_is_keyed_with_the_secret(monkeypatch):
+    before = hash_otp(EMAIL, "123456")
+    monkeypatch.setattr(settings, "JWT_SECRET_KEY", "another-secret")
+    assert hash_otp(EMAIL, "123456") != before
+
+def test_valid_otp_verifies_for_any_case_of_the_email(otps):
+    _issue(otps)
+    assert _verify("reset.me@example.com", "123456") == "ok"
+    assert _verify(" RESET.ME@EXAMPLE.COM", "123456") == "ok"
+
+def test_missing_otp(otps):
+    assert _verify(EMAIL, "123456") == "No OTP found. Please request a new one."
+
+def test_expired_otp_is_deleted(otps):
+    _issue(otps, expires_in=timedelta(seconds=-1))
+    assert _verify(EMAIL, "123456") == "OTP has expired. Please request a new one."
+    assert not otps.docs
+
+def test_every_attempt_counts_and_the_limit_deletes_the_otp(otps):
+    _issue(otps)
+    for _ in range(settings.OTP_MAX_ATTEMPTS - 1):
+        assert _verify(EMAIL, "000000") == "Invalid OTP"
+    # The last allowed attempt still succeeds with the right code
+    assert _verify(EMAIL, "123456") == "ok"
+    assert otps.docs[normalize_email(EMAIL)]["attempts"] == settings.OTP_MAX_ATTEMPTS
+
+    assert _verify(EMAIL, "123456") == "Too many invalid attempts. Please request a new OTP."
+    assert not otps.docs
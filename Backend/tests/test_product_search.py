@@ -0,0 +1,114 @@
+"""
+/products/search ranking against a throwaway MongoDB, for a query with more candidates than a page
+
+Needs a real MongoDB: mongod on PATH (a temporary instance is started) or MONGO_TEST_URL, where a
+separate <DB_NAME>_search database is used and dropped afterwards. The in-memory fake has no
+aggregation expressions, so without either the module is skipped.
+"""
+import asyncio
+import os
+import shutil
+from datetime import datetime
+from typing import Optional, Tuple
+
+import pytest
+from bson import ObjectId
+
+from benchmarks import environment
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+USER_EMAIL = "search@example.com"
+ORG_ID = "search-org"
+
+pytestmark = pytest.mark.skipif(
+    not MONGO_TEST_URL and not shutil.which("mongod"),
+    reason="search ranking needs a real MongoDB (mongod on PATH or MONGO_TEST_URL)"
+)
+
+def _rank(query: str, name: Optional[str], sku: Optional[str]) -> Optional[Tuple[int, int]]:
+    """Reference for rank_stages: sort key of a candidate (lower is better), or None if it does not match"""
+    from app.core.search import GRAM_SIZE, _WORD_SEPARATORS, normalize
+    text = normalize(query)
+    sku, name = normalize(sku), normalize(name)
+    if not text:
+        return None
+    if sku == text:
+        tier = 0
+    elif sku.startswith(text):
+        tier = 1
+    elif name == text:
+        tier = 2
+    elif name.startswith(text):
+        tier = 3
+    elif f" {text}" in f" {name}":
+        tier = 4
+    elif len(text) < GRAM_SIZE:
+        words = _WORD_SEPARATORS.split(f"{sku} {name}")
+        tier = 5 if any(word.startswith(text) for word in words if word) else None
+    elif text in sku:
+        tier = 5
+    elif text in name:
+        tier = 6
+    else:
+        tier = None
+    return None if tier is None else (tier, len(name))
+
+def _product(name: str, sku: str) -> dict:
+    from app.core.search import search_fields
+    now = datetime.utcnow()
+    return {
+        "_id": ObjectId(),
+        "name": name,
+        "sku": sku,
+        "category": "Hardware",
+        "unit_of_measure": "Units",
+        "current_stock": 0,
+        "reorder_level": 0,
+        "organization_id": ORG_ID,
+        "created_at": now,
+        "updated_at": now,
+        **search_fields(name, sku)
+    }
+
+@pytest.fixture(scope="module")
+def catalog():
+    """(event loop, products); 600 "bolt" candidates, the best matches inserted last"""
+    from app.core.config import settings
+    from app.core.database import get_database
+    loop = asyncio.new_event_loop()
+    db_name = settings.DB_NAME
+    settings.DB_NAME = f"{db_name}_search"
+
+    async def start():
+        _, cleanup = await environment.open_database(MONGO_TEST_URL, use_fake=False)
+        db = get_database()
+        products = [_product(f"Steel bolt {i:04d}", f"STB-{i:04d}") for i in range(600)]
+        products += [_product("Bolt", "HW-0001"), _product("Hex bolt", "BOLT"), _product("Bolt cutter", "BOLT-CUT")]
+        await db.users.insert_one({"email": USER_EMAIL, "organization_id": ORG_ID})
+        await db.products.insert_many(products)
+        return products, cleanup
+
+    products, cleanup = loop.run_until_complete(start())
+    try:
+        yield loop, products
+    finally:
+        loop.run_until_complete(get_database().client.drop_database(settings.DB_NAME))
+        cleanup()
+        loop.close()
+        settings.DB_NAME = db_name
+
+def test_best_matches_win_beyond_the_first_500_candidates(catalog):
+    from app.services.product_service import product_service
+    loop, _ = catalog
+    results = loop.run_until_complete(product_service.search_products("bolt", USER_EMAIL, limit=5))
+    assert [p.sku for p in results] == ["BOLT", "BOLT-CUT", "HW-0001", "STB-0000", "STB-0001"]
+
+def test_ranking_matches_the_reference_over_every_candidate(catalog):
+    from app.services.product_service import product_service
+    loop, products = catalog
+    expected = sorted(
+        (p for p in products if _rank("olt 00", p["name"], p["sku"]) is not None),
+        key=lambda p: (_rank("olt 00", p["name"], p["sku"]), p["_id"])
+    )[:20]
+    results = loop.run_until_complete(product_service.search_products("olt 00", USER_EMAIL, limit=20))
+    assert [p.id for p in results] == [str(p["_id"]) for p in expected]
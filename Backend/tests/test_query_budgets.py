@@ -0,0 +1,69 @@
+"""
+Every per-route query budget (benchmarks/query_budgets.py) against a seeded throwaway MongoDB
+
+Needs httpx and a real MongoDB: mongod on PATH (a temporary instance is started) or an empty
+database at MONGO_TEST_URL. The in-memory fake has no command monitoring, so without either the
+module is skipped.
+"""
+import asyncio
+import os
+import shutil
+
+import pytest
+
+from benchmarks import environment
+from benchmarks.query_budgets import QueryBudgetExceeded, assert_query_budget, budget_cases, request_for, seeded_ids
+
+httpx = pytest.importorskip("httpx")
+
+MONGO_TEST_URL = os.environ.get("MONGO_TEST_URL")
+
+pytestmark = pytest.mark.skipif(
+    not MONGO_TEST_URL and not shutil.which("mongod"),
+    reason="query budgets need a real MongoDB (mongod on PATH or MONGO_TEST_URL)"
+)
+
+@pytest.fixture(scope="module")
+def api():
+    """(event loop, authenticated client, seeded ids); Motor is bound to one loop, so all cases share it"""
+    loop = asyncio.new_event_loop()
+
+    async def start():
+        from benchmarks.seed import SCALES, seed
+        from main import app
+        from app.core.database import get_database
+        from app.core.security import create_access_token
+        _, cleanup = await environment.open_database(MONGO_TEST_URL, use_fake=False)
+        db = get_database()
+        ctx = await seed(db, SCALES["small"], 42)
+        client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=app),
+            base_url="http://budgets",
+            headers={"Authorization": f"Bearer {create_access_token(data={'sub': ctx['user_email']})}"}
+        )
+        return client, await seeded_ids(db, ctx), cleanup
+
+    client, ids, cleanup = loop.run_until_complete(start())
+    try:
+        yield loop, client, ids
+    finally:
+        loop.run_until_complete(client.aclose())
+        cleanup()
+        loop.close()
+
+@pytest.mark.parametrize(
+    "budget,variant",
+    budget_cases(),
+    ids=[f"{budget.method} {budget.route} {variant or ''}".strip() for budget, variant in budget_cases()]
+)
+def test_route_stays_within_query_budget(api, budget, variant):
+    loop, client, ids = api
+    url, params = request_for(budget, variant, ids)
+    loop.run_until_complete(assert_query_budget(client, budget.method, url, budget.max_queries, params=params))
+
+def test_exceeding_a_budget_fails(api):
+    loop, client, ids = api
+    budget, variant = budget_cases()[0]
+    url, params = request_for(budget, variant, ids)
+    with pytest.raises(QueryBudgetExceeded):
+        loop.run_until_complete(assert_query_budget(client, budget.method, url, 1, params=params))
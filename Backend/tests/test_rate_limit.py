@@ -0,0 +1,90 @@
+"""
+In-process token bucket and client address resolution behind the OTP rate limits (no MongoDB needed)
+"""
+import asyncio
+
+import pytest
+from starlette.requests import Request
+
+from benchmarks import environment  # noqa: F401 - sets the environment the app's settings read
+
+from app.core import rate_limit
+from app.core.rate_limit import InMemoryTokenBucket, client_ip
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(rate_limit.time, "monotonic", clock)
+    return clock
+
+def _request(peer: str, forwarded_for: str = None) -> Request:
+    headers = [(b"x-forwarded-for", forwarded_for.encode())] if forwarded_for else []
+    return Request({"type": "http", "method": "GET", "path": "/", "headers": headers, "client": (peer, 50000)})
+
+def test_bucket_allows_capacity_then_reports_the_wait(clock):
+    bucket = InMemoryTokenBucket("test", capacity=3, window_seconds=60)
+    assert [asyncio.run(bucket.hit("a")) for _ in range(3)] == [0.0, 0.0, 0.0]
+    # One token refills every 20 seconds
+    assert asyncio.run(bucket.hit("a")) == pytest.approx(20.0)
+    assert asyncio.run(bucket.hit("b")) == 0.0
+
+def test_bucket_refills_over_time_up_to_capacity(clock):
+    bucket = InMemoryTokenBucket("test", capacity=3, window_seconds=60)
+    for _ in range(3):
+        asyncio.run(bucket.hit("a"))
+    clock.now += 25
+    assert asyncio.run(bucket.hit("a")) == 0.0
+    assert asyncio.run(bucket.hit("a")) == pytest.approx(15.0)
+
+    clock.now += 3600
+    assert [asyncio.run(bucket.hit("a")) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert asyncio.run(bucket.hit("a")) > 0
+
+def test_rejected_hits_do_not_take_tokens(clock):
+    bucket = InMemoryTokenBucket("test", capacity=1, window_seconds=10)
+    asyncio.run(bucket.hit("a"))
+    clock.now += 5
+    assert asyncio.run(bucket.hit("a")) == pytest.approx(5.0)
+    assert asyncio.run(bucket.hit("a")) == pytest.approx(5.0)
+    clock.now += 5
+    assert asyncio.run(bucket.hit("a")) == 0.0
+
+def test_prune_drops_only_full_buckets(clock):
+    bucket = InMemoryTokenBucket("test", capacity=2, window_seconds=10, max_keys=2)
+    asyncio.run(bucket.hit("old"))
+    clock.now += 10
+    asyncio.run(bucket.hit("recent"))
+    asyncio.run(bucket.hit("new"))
+    assert set(bucket._buckets) == {"recent", "new"}
+
+def test_trusted_proxies_accept_addresses_and_networks():
+    networks = rate_limit._networks([" 10.0.0.0/8 ", "192.168.1.7", "", "2001:db8::/32", "172.16.5.9/16"])
+    assert [str(network) for network in networks] == ["10.0.0.0/8", "192.168.1.7/32", "2001:db8::/32", "172.16.0.0/16"]
+    with pytest.raises(ValueError):
+        rate_limit._networks(["not-an-ip"])
+
+def test_forwarded_for_is_ignored_without_trusted_proxies(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_trusted_proxies", [])
+    assert client_ip(_request("203.0.113.5", "198.51.100.1")) == "203.0.113.5"
+
+def test_forwarded_for_is_ignored_from_untrusted_peers(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_trusted_proxies", rate_limit._networks(["10.0.0.0/8"]))
+    assert client_ip(_request("203.0.113.5", "198.51.100.1")) == "203.0.113.5"
+
+def test_client_is_the_rightmost_untrusted_hop(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_trusted_proxies", rate_limit._networks(["10.0.0.0/8"]))
+    # The left-most hop was sent by the client and is not believed
+    assert client_ip(_request("10.0.0.2", "1.2.3.4, 198.51.100.1, 10.0.0.1")) == "198.51.100.1"
+    assert client_ip(_request("10.0.0.2", "garbage, 10.0.0.1")) == "garbage"
+
+def test_only_trusted_hops_fall_back_to_the_first(monkeypatch):
+    monkeypatch.setattr(rate_limit, "_trusted_proxies", rate_limit._networks(["10.0.0.0/8"]))
+    assert client_ip(_request("10.0.0.2", "10.0.0.9, 10.0.0.1")) == "10.0.0.9"
+    assert client_ip(_request("10.0.0.2")) == "10.0.0.2"